@@ -1,8 +1,10 @@
+import json
+
 import streamlit as st  
 import requests
 
 #  FastAPI endpoint
-API_URL = "http://127.0.0.1:8000/query"
+STREAM_URL = "http://127.0.0.1:8000/query/stream"
 
 st.set_page_config(
   page_title="Legal RAG Assistant",
@@ -13,27 +15,69 @@ st.title("Legal RAG Assistant")
 st.write("Ask questions related to IPC sections/Code of Criminal procedure crpc")
 
 
+def read_events(response):
+  "Parse a text/event-stream response into (event, data) pairs."
+  event, data = "message", []
+  for line in response.iter_lines(decode_unicode=True):
+    if line is None:
+      continue
+    if line == "":
+      if data:
+        yield event, json.loads("\n".join(data))
+      event, data = "message", []
+    elif line.startswith("event:"):
+      event = line[len("event:"):].strip()
+    elif line.startswith("data:"):
+      data.append(line[len("data:"):].strip())
+
+
+def show_citations(container, citations):
+  if citations:
+    with container.expander(f"Sources ({len(citations)})"):
+      for c in citations:
+        st.write(f"{c['law']} Section {c['section']} - {c['section_title']}")
+
+
 #intput box
 query = st.text_area(
   "Enter your legal question:",
   placeholder="e.g. What sections apply in a attempt to murder case?"
 )
+#section lookups ("IPC 302") come back as the statute text itself unless an explanation is asked for
+enrich = st.checkbox("Explain sections in plain language (slower)")
 
 if st.button("Ask"):
   if query.strip() == "":
     st.warning("Please enter a question.")
   else:
-    with st.spinner("Searching legal documents..."):
-       response = requests.post(
-         API_URL,
-         json={"query":query}
-       )
-       
-    if response.status_code==200:
-      answer = response.json()["answer"]
-      
-      st.subheader("Answer")
-      st.write(answer)
-    else:
-      st.error("Error connection to backend")
-    
\ No newline at end of file
+    status = st.empty()
+    status.info("Searching legal documents...")
+    sources = st.container()
+    st.subheader("Answer")
+    answer_box = st.empty()
+
+    try:
+      with requests.post(STREAM_URL, json={"query":query, "enrich":enrich}, stream=True, timeout=120) as response:
+        if response.status_code != 200:
+          status.error("Error connection to backend")
+        else:
+          text = ""
+          for event, data in read_events(response):
+            if event == "retrieval":
+              status.empty()
+              show_citations(sources, data["citations"])
+            elif event == "token":
+              text += data["text"]
+              answer_box.markdown(text + " ▌")
+            elif event == "done":
+              status.empty()
+              if data.get("verbatim"):
+                #statute text as written: keep its line breaks, no markdown
+                answer_box.text(data["answer"])
+                st.caption("Verbatim statute text")
+              else:
+                answer_box.write(data["answer"])
+            elif event == "error":
+              status.error(data["detail"])
+    except requests.RequestException:
+      status.error("Error connection to backend")
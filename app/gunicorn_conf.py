@@ -0,0 +1,44 @@
+"""
+Multi-worker serving with shared index memory:
+
+  gunicorn -c app/gunicorn_conf.py app.main:app
+
+- INDEX_MMAP=1: FAISS codes, BM25 arrays and the chunk table are mapped
+  read-only, so every worker reads the same page-cache pages
+- preload: the master loads the embedding model and indexes once and forks
+  the workers, which share those pages copy-on-write; each worker warms up
+  in its own lifespan
+- PROMETHEUS_MULTIPROC_DIR: workers write their metrics there, so /metrics
+  reports the whole server whichever worker answers the scrape
+"""
+import gc
+import os
+import shutil
+import tempfile
+
+os.environ.setdefault("INDEX_MMAP", "1")
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "legal-rag-metrics"))
+# metrics files of a previous run would be added to this one's
+shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+
+def on_starting(server):
+    from src.retrieval.engine import preload_engine
+
+    engine = preload_engine()
+    server.log.info("engine preloaded: %s chunks, shards %s", len(engine.chunks), engine.router.stats())
+    # keep the cyclic GC from writing to (and so un-sharing) every inherited object
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
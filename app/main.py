@@ -1,22 +1,144 @@
-from fastapi import FastAPI  
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import List
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from src.rag_service import generate_answer
+from src.config import DEBUG_TIMINGS, METRICS_ENABLED
+from src.rag_service import agenerate_answer, agenerate_answers_batch, astream_answer, get_answer_cache, get_section_answers
+from src.llm import get_gateway
+from src.retrieval.engine import RetrievalEngine, current_engine, set_engine
+from src.telemetry import collect_timings, format_timings, metrics_payload, record_request
+
+
+async def _load_engine(engine: RetrievalEngine):
+  try:
+    await asyncio.to_thread(engine.load)
+    await asyncio.to_thread(engine.warm_up)
+  except Exception as e:
+    engine.error = str(e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+  # Load model + indexes once per process, in the background so /ready can report progress.
+  # Under gunicorn --preload (app/gunicorn_conf.py) the master already loaded them before
+  # forking: reuse that engine, so this worker only warms up.
+  engine = current_engine() or RetrievalEngine()
+  set_engine(engine)
+  app.state.engine = engine
+  app.state.engine_task = asyncio.create_task(_load_engine(engine))
+  yield
+  app.state.engine_task.cancel()
+  set_engine(None)
+
 
 app=FastAPI(
   title="Legal RAG API",
-  version="1.0"
+  version="1.0",
+  lifespan=lifespan
 )
 
+#Request count/latency per endpoint; with DEBUG_TIMINGS, a request sending "X-Debug-Timings: 1"
+#gets its per-stage breakdown back in the X-Debug-Timings response header (Server-Timing syntax, ms).
+#Streamed answers only report what ran before the stream started.
+async def observe_requests(request: Request, call_next):
+  timings = collect_timings() if DEBUG_TIMINGS and request.headers.get("x-debug-timings") == "1" else None
+  start = time.perf_counter()
+  response = await call_next(request)
+  elapsed = time.perf_counter() - start
+  route = request.scope.get("route")
+  record_request(getattr(route, "path", "unmatched"), response.status_code, elapsed)
+  if timings is not None:
+    response.headers["X-Debug-Timings"] = format_timings(timings, elapsed)
+  return response
+
+#not installed at all when both are off, so a disabled setup pays nothing per request
+if METRICS_ENABLED or DEBUG_TIMINGS:
+  app.middleware("http")(observe_requests)
+
 class QueryRequest(BaseModel):
   query: str
   top_k: int=5
- 
+  bypass_cache: bool=False
+  #exact section lookups return the statute text verbatim (no LLM) unless enrich is set
+  enrich: bool=False
+
+
+def get_ready_engine(request: Request) -> RetrievalEngine:
+  engine = request.app.state.engine
+  if not engine.ready:
+    raise HTTPException(status_code=503, detail="Retrieval engine is still loading")
+  return engine
+
 #health check
 @app.get("/")
 def health():
   return {"status":"ok"}
 
+#readiness check: green only once model, indexes and BM25 are loaded and warm
+@app.get("/ready")
+def ready(request: Request):
+  engine = request.app.state.engine
+  status = engine.status()
+  if not engine.ready:
+    return JSONResponse(status_code=503, content={"status": "loading", **status})
+  return {"status": "ready", **status}
+
+#answer cache hit/miss/eviction counters (and precomputed section answer lookups) for this worker
+@app.get("/cache/stats")
+def cache_stats():
+  section_answers = get_section_answers()
+  return {**get_answer_cache().stats(), "section_answers": section_answers.stats() if section_answers is not None else None}
+
+#Prometheus metrics: per-stage latency histograms, request and LLM counters
+@app.get("/metrics")
+def metrics():
+  if not METRICS_ENABLED:
+    raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS_ENABLED=0)")
+  body, content_type = metrics_payload()
+  return Response(content=body, media_type=content_type)
+
+#LLM gateway counters for this worker: calls, retries, timeouts, in-flight, latency, tokens
+@app.get("/llm/stats")
+def llm_stats():
+  return get_gateway().stats()
+
 #Main RAG endpoint
+#async so one worker can hold many in-flight LLM calls without tying up threads
 @app.post("/query")
-def query_rag(req: QueryRequest):
-  return {"answer": generate_answer(req.query,req.top_k)}
\ No newline at end of file
+async def query_rag(req: QueryRequest, request: Request):
+  engine = get_ready_engine(request)
+  answer = await agenerate_answer(req.query,req.top_k, engine=engine, use_cache=not req.bypass_cache, enrich=req.enrich)
+  return {"answer": answer}
+
+#Bulk endpoint: batched retrieval, identical queries answered once, bounded LLM fan-out.
+#Results come back in input order; a failing item carries "error" instead of "answer".
+@app.post("/query/batch")
+async def query_rag_batch(reqs: List[QueryRequest], request: Request):
+  engine = get_ready_engine(request)
+  items = [(r.query, r.top_k, not r.bypass_cache, r.enrich) for r in reqs]
+  return {"results": await agenerate_answers_batch(items, engine=engine)}
+
+#Server-sent events: citations first, then LLM tokens, then the cleaned final answer
+@app.post("/query/stream")
+async def query_rag_stream(req: QueryRequest, request: Request):
+  engine = get_ready_engine(request)
+
+  async def events():
+    try:
+      async for event, data in astream_answer(
+        req.query, req.top_k, engine=engine, use_cache=not req.bypass_cache, enrich=req.enrich
+      ):
+        yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    except Exception as e:
+      yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+  return StreamingResponse(
+    events(),
+    media_type="text/event-stream",
+    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+  )
@@ -0,0 +1,111 @@
+"""
+Micro-benchmark: rank_bm25.BM25Okapi vs SparseBM25.
+
+Compares build time, per-query scoring + top-k latency and score parity on
+the IPC+CrPC chunk corpus and on a synthetic corpus N times larger
+(document lengths and tokens sampled from the real corpus).
+
+  python -m benchmarks.bm25_benchmark --scale 100
+"""
+import argparse
+import time
+from collections import Counter
+from typing import List
+
+import numpy as np
+from rank_bm25 import BM25Okapi
+
+from src.config import CHUNKS_DIR
+from src.retrieval.bm25 import SparseBM25, tokenize
+from src.retrieval.engine import load_all_chunks
+
+QUERIES = [
+    "punishment for murder",
+    "cheating and dishonestly inducing delivery of property",
+    "arrest without warrant by police officer",
+    "IPC section 420",
+    "theft in dwelling house",
+    "bail in non-bailable offence",
+    "defamation",
+    "criminal breach of trust by public servant",
+    "summons to produce document",
+    "attempt to murder",
+]
+
+
+def synthetic_corpus(docs: List[List[str]], scale: int, seed: int = 0) -> List[List[str]]:
+    rng = np.random.default_rng(seed)
+    freqs = Counter(t for d in docs for t in d)
+    terms = np.array(list(freqs))
+    probs = np.array(list(freqs.values()), dtype=np.float64)
+    probs /= probs.sum()
+    lengths = rng.choice([len(d) for d in docs], size=len(docs) * scale)
+    flat = terms[rng.choice(len(terms), size=int(lengths.sum()), p=probs)].tolist()
+
+    out, pos = [], 0
+    for n in lengths:
+        out.append(flat[pos:pos + n])
+        pos += n
+    return out
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def run(name: str, docs: List[List[str]], k: int, repeat: int):
+    print(f"\n== {name}: {len(docs)} docs ==")
+
+    okapi, okapi_build = timed(BM25Okapi, docs)
+    sparse_bm25, sparse_build = timed(SparseBM25.build, docs)
+    print(f"build     BM25Okapi {okapi_build:8.3f}s   SparseBM25 {sparse_build:8.3f}s")
+
+    queries = [tokenize(q) for q in QUERIES]
+
+    def okapi_query(tokens):
+        scores = okapi.get_scores(tokens)
+        return sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:k]
+
+    okapi_times, sparse_times, max_diff = [], [], 0.0
+    for _ in range(repeat):
+        for tokens in queries:
+            _, t = timed(okapi_query, tokens)
+            okapi_times.append(t)
+            _, t = timed(sparse_bm25.top_k, tokens, k)
+            sparse_times.append(t)
+
+    for tokens in queries:
+        diff = np.abs(okapi.get_scores(tokens) - sparse_bm25.get_scores(tokens)).max()
+        max_diff = max(max_diff, float(diff))
+
+    _, batch_time = timed(sparse_bm25.get_scores_batch, queries)
+
+    okapi_ms = np.median(okapi_times) * 1000
+    sparse_ms = np.median(sparse_times) * 1000
+    print(f"query p50 BM25Okapi {okapi_ms:8.3f}ms  SparseBM25 {sparse_ms:8.3f}ms  ({okapi_ms / sparse_ms:.1f}x)")
+    print(f"batch of {len(queries)} queries (SparseBM25.get_scores_batch): {batch_time * 1000:.3f}ms")
+    print(f"max |score diff| = {max_diff:.2e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks-dir", default=CHUNKS_DIR)
+    parser.add_argument("--scale", type=int, default=100, help="synthetic corpus size multiplier (0 to skip)")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    chunks = load_all_chunks(args.chunks_dir)
+    if not chunks:
+        raise SystemExit(f"No chunks found in {args.chunks_dir}. Run the chunker first.")
+    docs = [tokenize(c["text"]) for c in chunks]
+
+    run("IPC+CrPC", docs, args.top_k, args.repeat)
+    if args.scale > 0:
+        run(f"synthetic x{args.scale}", synthetic_corpus(docs, args.scale), args.top_k, max(1, args.repeat // 5))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark: resident memory of the chunk table, JSON dicts vs the mapped ChunkStore.
+
+Writes the chunks of --chunks-dir (repeated --scale times, with fresh ids)
+both as a chunk JSON file and as a binary chunk table, then loads each in a
+fresh process and reports RSS before loading, after loading and after
+--lookups random hit materializations (chunk_to_document), split into
+private (RssAnon) and file-backed (RssFile) pages. File-backed pages of the
+mapped table are shared by every process that maps it.
+
+  python -m benchmarks.chunk_store_benchmark --scale 50
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict
+
+from src.config import CHUNKS_DIR
+
+MODES = ("json", "store")
+
+
+def rss() -> Dict[str, int]:
+    "VmRSS / RssAnon / RssFile of this process in bytes (Linux); peak RSS elsewhere."
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            fields = dict(line.split(":", 1) for line in f)
+        return {k: int(fields[k].split()[0]) * 1024 for k in ("VmRSS", "RssAnon", "RssFile")}
+    except (OSError, KeyError):
+        import resource
+
+        return {"VmRSS": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024, "RssAnon": 0, "RssFile": 0}
+
+
+def child(mode: str, data_dir: str, lookups: int) -> None:
+    "Runs in a fresh interpreter; prints one JSON line."
+    from src.retrieval.chunk_store import ChunkStore, chunk_to_document
+    from src.retrieval.engine import load_all_chunks
+
+    chunk_to_document({"text": ""})  # imports langchain_core before the first reading
+    before = rss()
+    start = time.perf_counter()
+    if mode == "json":
+        # what the engine held before the chunk table: the list plus an id -> dict map
+        chunks = load_all_chunks(os.path.join(data_dir, "chunks"))
+        table = {chunk["chunk_id"]: chunk for chunk in chunks}
+        ids = list(table)
+    else:
+        table = ChunkStore.load(os.path.join(data_dir, "store"))
+        ids = table.ids.tolist()
+    load_s = time.perf_counter() - start
+    loaded = rss()
+
+    rng = random.Random(0)
+    picks = [rng.choice(ids) for _ in range(lookups)]
+    start = time.perf_counter()
+    for cid in picks:
+        chunk_to_document(table[cid])
+    lookup_s = time.perf_counter() - start
+
+    print(json.dumps({
+        "before": before, "loaded": loaded, "after": rss(),
+        "load_s": load_s, "lookup_us": lookup_s / max(lookups, 1) * 1e6,
+    }))
+
+
+def write_corpus(chunks_dir: str, scale: int, out_dir: str) -> int:
+    from src.retrieval.chunk_store import ChunkStore
+    from src.retrieval.engine import load_all_chunks
+
+    base = load_all_chunks(chunks_dir)
+    if not base:
+        raise SystemExit(f"No chunks in {chunks_dir}. Run the chunker first.")
+    chunks = [dict(chunk, chunk_id=i) for i, chunk in enumerate(base * scale)]
+
+    os.makedirs(os.path.join(out_dir, "chunks"))
+    with open(os.path.join(out_dir, "chunks", "all_chunks.json"), "w", encoding="utf-8") as f:
+        # the chunker writes indent=2
+        json.dump(chunks, f, indent=2, ensure_ascii=False)
+    ChunkStore.from_chunks(chunks).save(os.path.join(out_dir, "store"))
+    return len(chunks)
+
+
+def mb(n: int) -> str:
+    return f"{n / 2**20:9.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks-dir", default=CHUNKS_DIR)
+    parser.add_argument("--scale", type=int, default=50, help="copies of the corpus")
+    parser.add_argument("--lookups", type=int, default=2000, help="random hits materialized after loading")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.data_dir, args.lookups)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        n = write_corpus(args.chunks_dir, args.scale, tmp)
+        sizes = {
+            "json": os.path.getsize(os.path.join(tmp, "chunks", "all_chunks.json")),
+            "store": sum(os.path.getsize(os.path.join(tmp, "store", f)) for f in os.listdir(os.path.join(tmp, "store"))),
+        }
+        print(f"{n} chunks: JSON {sizes['json'] / 2**20:.1f} MB on disk, chunk table {sizes['store'] / 2**20:.1f} MB")
+        print(f"\n{'mode':<7}{'load s':>8}{'RSS +MB':>10}{'anon +MB':>10}{'file +MB':>10}{'after hits':>12}{'us/hit':>9}")
+        for mode in MODES:
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.chunk_store_benchmark", "--child", mode,
+                 "--data-dir", tmp, "--lookups", str(args.lookups)],
+                capture_output=True, text=True, check=True,
+            ).stdout.strip().splitlines()[-1]
+            r = json.loads(out)
+            grew = {k: r["loaded"][k] - r["before"][k] for k in r["before"]}
+            print(
+                f"{mode:<7}{r['load_s']:>8.3f}{mb(grew['VmRSS']):>10}{mb(grew['RssAnon']):>10}{mb(grew['RssFile']):>10}"
+                f"{mb(r['after']['VmRSS'] - r['before']['VmRSS']):>12}{r['lookup_us']:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
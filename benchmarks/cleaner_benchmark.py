@@ -0,0 +1,106 @@
+"""
+Benchmark + golden check: LegalTextCleaner vs the original multi-pass cleaner.
+
+The original implementation is kept below (LegacyLegalTextCleaner) as the
+golden reference: every extracted page must clean to exactly the same text.
+With --golden-dir, the output is also compared to a directory of previously
+cleaned files (<name>_cleaned.txt). Then pages/sec is reported for the
+legacy cleaner, the current cleaner, and clean_many() with --workers.
+
+  python -m benchmarks.cleaner_benchmark --workers 4 --repeat 5
+"""
+import argparse
+import os
+import re
+import time
+
+from src.preprocessing.cleaner import LegalTextCleaner, clean_many
+
+
+class LegacyLegalTextCleaner:
+    "LegalTextCleaner before the precompiled, keyword-guarded passes (golden reference)."
+
+    def __init__(self):
+        self.page_number_pattern = re.compile(r"\bPage\s+\d+\b", re.IGNORECASE)
+        self.header_footer_pattern = re.compile(
+            r"(THE\s+INDIAN\s+PENAL\s+CODE.*?|CODE\s+OF\s+CRIMINAL\s+PROCEDURE.*?1973)", re.IGNORECASE
+        )
+        self.multiple_spaces = re.compile(r"[ \t]{2,}")
+        self.multiple_newlines = re.compile(r"\n{3,}")
+
+    def clean_text(self, text: str) -> str:
+        if not text or not text.strip():
+            return ""
+        text = self.header_footer_pattern.sub("", text)
+        text = re.sub(r"ARRANGEMENT\s+OF\s+SECTIONS.*?(?=\n\s*\d+\.)", "", text, flags=re.IGNORECASE | re.DOTALL)
+        text = self.page_number_pattern.sub("", text)
+        text = re.sub(r"(?:^|\n)\s*\d+\s+(\d+[A-Z]*(?:\(\d+\))?)\.", r"\n\1.", text)
+        text = re.sub(r"\s+(\d+[A-Z]*(?:\(\d+\))?)\.", r"\n\1.", text)
+        text = self.multiple_spaces.sub(" ", text)
+        text = self.multiple_newlines.sub("\n\n", text)
+        return text.strip()
+
+
+def rate(pages: int, seconds: float) -> str:
+    return f"{pages / seconds:10.1f} pages/s  ({seconds:.3f}s)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input-dir", default=os.path.join("data", "extracted"))
+    parser.add_argument("--golden-dir", default=None, help="previously cleaned files to compare against")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=5, help="passes over the pages for the throughput numbers")
+    args = parser.parse_args()
+
+    names = sorted(n for n in os.listdir(args.input_dir) if n.endswith(".txt"))
+    if not names:
+        raise SystemExit(f"No extracted pages in {args.input_dir}. Run the loader first.")
+    paths = [os.path.join(args.input_dir, n) for n in names]
+    pages = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            pages.append(f.read())
+
+    legacy, cleaner = LegacyLegalTextCleaner(), LegalTextCleaner()
+    cleaned = [cleaner.clean_text(p) for p in pages]
+    mismatched = [n for n, page, out in zip(names, pages, cleaned) if legacy.clean_text(page) != out]
+    print(f"golden (legacy cleaner): {len(pages) - len(mismatched)}/{len(pages)} pages identical")
+    for name in mismatched[:10]:
+        print(f"  MISMATCH {name}")
+
+    if args.golden_dir:
+        differ = 0
+        for name, out in zip(names, cleaned):
+            with open(os.path.join(args.golden_dir, name.replace(".txt", "_cleaned.txt")), "r", encoding="utf-8") as f:
+                differ += f.read() != out
+        print(f"golden ({args.golden_dir}): {len(pages) - differ}/{len(pages)} files identical")
+
+    if clean_many(paths, workers=args.workers) != cleaned:
+        print(f"clean_many(workers={args.workers}) output differs from clean_text")
+
+    total = len(pages) * args.repeat
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for page in pages:
+            legacy.clean_text(page)
+    print(f"\nlegacy cleaner          {rate(total, time.perf_counter() - start)}")
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for page in pages:
+            cleaner.clean_text(page)
+    print(f"LegalTextCleaner        {rate(total, time.perf_counter() - start)}")
+
+    # includes reading the files and, for workers > 1, process start-up
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        clean_many(paths, workers=args.workers)
+    print(f"clean_many(workers={args.workers:<2})  {rate(total, time.perf_counter() - start)}")
+
+    if len(mismatched):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
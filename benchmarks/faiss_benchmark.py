@@ -0,0 +1,94 @@
+"""
+Benchmark: FAISS index types (src/retrieval/faiss_index.py).
+
+For every type reports build time, index size (serialized, ~RAM), recall@k
+against the exact flat index and p50/p99 single-query search latency, on the
+chunk vectors of the current vector store and on a synthetic corpus N times
+larger (real vectors plus Gaussian noise, renormalized). Queries are held-out
+perturbed corpus vectors, so no embedding model is needed.
+
+  python -m benchmarks.faiss_benchmark --scale 100
+"""
+import argparse
+import os
+import time
+from typing import List
+
+import numpy as np
+
+from src.config import VECTOR_STORE_PATH, INDEX_NAME
+from src.retrieval.faiss_index import INDEX_TYPES, build_index, index_bytes, load_index_meta, reconstruct_all
+
+
+def corpus_vectors(vector_store_path: str, checkpoint: str) -> np.ndarray:
+    "Vectors from the embedding checkpoint if there is one, else from the stored index."
+    import faiss
+
+    if os.path.exists(checkpoint):
+        return np.load(checkpoint, mmap_mode="r")
+    index = faiss.read_index(os.path.join(vector_store_path, f"{INDEX_NAME}.faiss"))
+    vectors = reconstruct_all(index, load_index_meta(vector_store_path)["type"])
+    if vectors is None:
+        raise SystemExit("The stored index keeps lossy codes only; pass --checkpoint with the embeddings .npy")
+    return vectors
+
+
+def perturb(base: np.ndarray, n: int, noise: float, rng) -> np.ndarray:
+    rows = base[rng.integers(0, len(base), size=n)]
+    out = rows + rng.standard_normal(rows.shape).astype(np.float32) * noise * rows.std()
+    out /= np.linalg.norm(out, axis=1, keepdims=True)
+    return out.astype(np.float32)
+
+
+def percentile_ms(times: List[float], q: float) -> float:
+    return float(np.percentile(times, q)) * 1000
+
+
+def run(name: str, vectors: np.ndarray, queries: np.ndarray, k: int, types: List[str]):
+    print(f"\n== {name}: {len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries ==")
+    print(f"{'type':<10}{'build s':>9}{'size MB':>10}{'recall@' + str(k):>11}{'p50 ms':>9}{'p99 ms':>9}")
+
+    exact = build_index("flat", vectors)
+    _, truth = exact.search(queries, k)
+
+    for kind in types:
+        start = time.perf_counter()
+        index = exact if kind == "flat" else build_index(kind, vectors)
+        build = time.perf_counter() - start
+
+        times, hits = [], 0
+        for i, q in enumerate(queries):
+            start = time.perf_counter()
+            _, ids = index.search(q[None, :], k)
+            times.append(time.perf_counter() - start)
+            hits += len(set(ids[0].tolist()) & set(truth[i].tolist()))
+
+        print(
+            f"{kind:<10}{build:>9.2f}{index_bytes(index) / 2**20:>10.2f}{hits / (k * len(queries)):>11.3f}"
+            f"{percentile_ms(times, 50):>9.3f}{percentile_ms(times, 99):>9.3f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vector-store", default=VECTOR_STORE_PATH)
+    parser.add_argument("--checkpoint", default=os.path.join(VECTOR_STORE_PATH, "embeddings.npy"))
+    parser.add_argument("--scale", type=int, default=100, help="synthetic corpus size multiplier (0 to skip)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--types", default=",".join(INDEX_TYPES))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    types = args.types.split(",")
+    vectors = np.ascontiguousarray(corpus_vectors(args.vector_store, args.checkpoint), dtype=np.float32)
+    queries = perturb(vectors, args.queries, 0.05, rng)
+
+    run("IPC+CrPC", vectors, queries, args.top_k, types)
+    if args.scale > 0:
+        synthetic = perturb(vectors, len(vectors) * args.scale, 0.5, rng)
+        run(f"synthetic x{args.scale}", synthetic, perturb(synthetic, args.queries, 0.05, rng), args.top_k, types)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+End-to-end benchmark: hybrid_retrieve, generate_answer and chat.ask against the real index.
+
+Runs a fixed query set (section lookups, topical questions, law mismatches)
+through each workload with the LLM gateway on the fake backend, which
+returns canned answers after --llm-latency-ms. It reports per-stage
+p50/p95/p99 from the telemetry spans (src/telemetry.py), throughput and peak
+RSS. The answer cache is memory-only and bypassed, so every generate_answer
+call does the full work and no stub answer reaches data/cache.
+
+--json writes the results. --compare checks them against an earlier run and
+exits 1 when a stage p50/p95 or the throughput of a workload got worse by
+more than --threshold.
+
+  python -m benchmarks.pipeline_benchmark --repeat 20 --json before.json
+  python -m benchmarks.pipeline_benchmark --repeat 20 --compare before.json --json after.json
+  python -m benchmarks.pipeline_benchmark --llm-latency-ms 300 --concurrency 8
+"""
+import argparse
+import contextvars
+import json
+import os
+import platform
+import resource
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+WORKLOADS = ("retrieve", "generate", "chat")
+
+# fixed so runs stay comparable: change it and earlier JSON files stop being a baseline
+QUERIES: List[Tuple[str, str]] = [
+    ("section", "IPC 302"),
+    ("section", "Explain IPC section 420"),
+    ("section", "What does section 379 of IPC say?"),
+    ("section", "CrPC section 438"),
+    ("section", "explain crpc section 154"),
+    ("section", "IPC 376"),
+    ("topical", "punishment for theft"),
+    ("topical", "arrest without warrant"),
+    ("topical", "bail in non-bailable offences"),
+    ("topical", "punishment for defamation"),
+    ("topical", "right of private defence of body"),
+    ("topical", "cheating and dishonestly inducing delivery of property"),
+    ("topical", "maintenance of wives, children and parents"),
+    ("topical", "information to the police in cognizable cases"),
+    # IPC-only / CrPC-only sections asked under the other law
+    ("mismatch", "CrPC section 506"),
+    ("mismatch", "CrPC section 498A"),
+    ("mismatch", "IPC section 41A"),
+    ("mismatch", "IPC section 265B"),
+]
+
+
+def peak_rss() -> int:
+    "Peak resident set size of this process in bytes (VmHWM; ru_maxrss where there is no /proc)."
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def reset_peak_rss() -> bool:
+    "Restart the peak from the current RSS (Linux); False if the peak keeps counting from process start."
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def percentiles(values_ms: List[float]) -> Dict[str, float]:
+    p50, p95, p99 = np.percentile(values_ms, [50, 95, 99])
+    return {
+        "count": len(values_ms),
+        "mean": float(np.mean(values_ms)),
+        "p50": float(p50),
+        "p95": float(p95),
+        "p99": float(p99),
+    }
+
+
+def workload_fn(name: str, engine, top_k: int, enrich: bool) -> Callable[[str], object]:
+    from src.chatbot.chat import ask
+    from src.rag_service import generate_answer
+    from src.retrieval.retriever import hybrid_retrieve
+
+    if name == "retrieve":
+        return lambda q: hybrid_retrieve(q, top_k=top_k, engine=engine)
+    if name == "generate":
+        return lambda q: generate_answer(q, top_k=top_k, engine=engine, use_cache=False, enrich=enrich)
+    return lambda q: ask(q, top_k=top_k, engine=engine)
+
+
+def run_workload(name: str, engine, repeat: int, concurrency: int, top_k: int, enrich: bool) -> Dict:
+    from src.telemetry import collect_timings
+
+    fn = workload_fn(name, engine, top_k, enrich)
+
+    def one(category: str, query: str) -> Tuple[str, Dict[str, float]]:
+        timings = collect_timings()
+        start = time.perf_counter()
+        fn(query)
+        return category, dict(timings, total=time.perf_counter() - start)
+
+    def isolated(item):
+        # every call gets its own timings, also on a reused pool thread
+        return contextvars.copy_context().run(one, *item)
+
+    items = QUERIES * repeat
+    peak_reset = reset_peak_rss()
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(isolated, items))
+    else:
+        samples = [isolated(item) for item in items]
+    wall = time.perf_counter() - start
+
+    stages: Dict[str, List[float]] = {}
+    by_category: Dict[str, List[float]] = {}
+    for category, timings in samples:
+        for stage, seconds in timings.items():
+            stages.setdefault(stage, []).append(seconds * 1000)
+        by_category.setdefault(category, []).append(timings["total"] * 1000)
+    return {
+        "queries": len(items),
+        "seconds": wall,
+        "throughput_qps": len(items) / wall,
+        "peak_rss_mb": peak_rss() / 2**20,
+        "peak_rss_since": "workload start" if peak_reset else "process start",
+        # a stage that did not run for a query (e.g. embed on a section lookup) has fewer samples
+        "stages": {stage: percentiles(values) for stage, values in stages.items()},
+        "by_category": {category: percentiles(values) for category, values in by_category.items()},
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float, min_delta_ms: float) -> List[str]:
+    "Regressions of current against baseline; tiny absolute changes of fast stages are ignored as noise."
+    flagged = []
+    for name, result in current["workloads"].items():
+        base = baseline.get("workloads", {}).get(name)
+        if base is None:
+            continue
+        if result["throughput_qps"] < base["throughput_qps"] * (1 - threshold):
+            flagged.append(f"{name}: throughput {base['throughput_qps']:.1f} -> {result['throughput_qps']:.1f} q/s")
+        for stage, stats in result["stages"].items():
+            before = base["stages"].get(stage)
+            if before is None:
+                continue
+            for p in ("p50", "p95"):
+                if stats[p] > before[p] * (1 + threshold) and stats[p] - before[p] > min_delta_ms:
+                    flagged.append(f"{name}: {stage} {p} {before[p]:.3f} -> {stats[p]:.3f} ms")
+    return flagged
+
+
+# options that change what is measured; the rest (output paths, thresholds) do not
+SETTINGS = ("workloads", "repeat", "concurrency", "top_k", "llm_latency_ms", "enrich", "cold_embeddings")
+
+
+def settings_diff(current: Dict, baseline: Dict) -> List[str]:
+    before = baseline.get("meta", {}).get("args", {})
+    now = current["meta"]["args"]
+    return [f"{key}={before.get(key)!r} -> {now.get(key)!r}" for key in SETTINGS if before.get(key) != now.get(key)]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def print_workload(name: str, result: Dict) -> None:
+    from src.telemetry import STAGES
+
+    print(f"\n{name}: {result['queries']} queries in {result['seconds']:.2f}s, "
+          f"{result['throughput_qps']:.1f} q/s, peak RSS {result['peak_rss_mb']:.0f} MB")
+    print(f"  {'stage':<14}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    order = [s for s in STAGES if s in result["stages"]] + ["total"]
+    for stage in order:
+        s = result["stages"][stage]
+        print(f"  {stage:<14}{s['count']:>6}{s['p50']:>10.3f}{s['p95']:>10.3f}{s['p99']:>10.3f}")
+    for category, s in result["by_category"].items():
+        print(f"  {'total/' + category:<14}{s['count']:>6}{s['p50']:>10.3f}{s['p95']:>10.3f}{s['p99']:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument("--repeat", type=int, default=10, help="passes over the query set per workload")
+    parser.add_argument("--concurrency", type=int, default=1, help="threads issuing queries")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="stub LLM delay per call")
+    parser.add_argument("--enrich", action="store_true", help="generate: send section lookups to the LLM too")
+    parser.add_argument("--cold-embeddings", action="store_true", help="disable the query embedding cache")
+    parser.add_argument("--json", help="write the results here")
+    parser.add_argument("--compare", help="results of an earlier run to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown flagged as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="ignore smaller absolute slowdowns")
+    args = parser.parse_args()
+
+    # before src.config is imported: memory-only answer cache, optionally no embedding cache
+    os.environ["ANSWER_CACHE_PATH"] = ""
+    if args.cold_embeddings:
+        os.environ["QUERY_EMBED_CACHE_SIZE"] = "0"
+
+    from src.config import CONTEXT_TOKEN_BUDGET, FUSION_METHOD
+    from src.llm import FakeBackend, LLMGateway, set_gateway
+    from src.retrieval.engine import RetrievalEngine
+
+    set_gateway(LLMGateway(FakeBackend(args.llm_latency_ms)))
+    start = time.perf_counter()
+    engine = RetrievalEngine().load().warm_up()
+    print(f"engine ready in {time.perf_counter() - start:.1f}s: {len(engine.chunks)} chunks, "
+          f"peak RSS {peak_rss() / 2**20:.0f} MB")
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "index_version": engine.index_version,
+            "chunks": len(engine.chunks),
+            "fusion": FUSION_METHOD,
+            "context_token_budget": CONTEXT_TOKEN_BUDGET,
+            "args": vars(args),
+        },
+        "workloads": {},
+    }
+    for name in args.workloads:
+        # one untimed pass: first-call costs (imports, lazy clients) are not what is measured
+        run_workload(name, engine, 1, 1, args.top_k, args.enrich)
+        result = run_workload(name, engine, args.repeat, args.concurrency, args.top_k, args.enrich)
+        results["workloads"][name] = result
+        print_workload(name, result)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        flagged = compare(results, baseline, args.threshold, args.min_delta_ms)
+        changed = settings_diff(results, baseline)
+        if changed:
+            print(f"\nwarning: the baseline ran with other settings ({', '.join(changed)})")
+        print(f"\nvs {args.compare} (commit {baseline.get('meta', {}).get('commit') or '?'}): "
+              f"{len(flagged)} regression(s) over {args.threshold:.0%}")
+        for line in flagged:
+            print(f"  REGRESSION {line}")
+        if flagged:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: single-pass section scanner vs the original DOTALL/lookahead regex.
+
+Checks that chunker1.extract_sections returns exactly what the original
+implementation (kept below as extract_sections_regex) returns, on every
+cleaned page and on each act concatenated into one text, then reports
+throughput on the whole-act text repeated --repeat times.
+
+  python -m benchmarks.section_split_benchmark --repeat 20
+"""
+import argparse
+import contextlib
+import io
+import os
+import re
+import time
+from typing import Dict, List
+
+from src.preprocessing.chunker1 import CLEANED_DIR, detect_law, extract_sections
+
+
+def extract_sections_regex(text: str, law: str) -> List[Dict]:
+    "extract_sections as it was before the single-pass scanner (reference for parity)."
+    sections = []
+    text = re.sub(r"[ \t]+", " ", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    text = re.sub(
+        r"^\s*\d+\.\s+(Subs\.|Ins\.|Amended|Omitted|Added).*?$",
+        "",
+        text,
+        flags=re.MULTILINE | re.IGNORECASE
+    )
+    pattern = re.compile(
+        r"^\s*(\d+[A-Z]*(?:\(\d+\))?)\.\s*(.*?)\n"
+        r"(.*?)(?=^\s*\d+[A-Z]*(?:\(\d+\))?\.|\Z)",
+        re.MULTILINE | re.DOTALL
+    )
+    for m in pattern.finditer(text):
+        section_no = m.group(1).strip()
+        title = m.group(2).strip()
+        body = m.group(3).strip()
+        if len(body) < 40:
+            continue
+        sections.append({
+            "section": section_no,
+            "section_title": title if title else f"Section {section_no}",
+            "text": f"{law} Section {section_no}. {title}: {body}".strip()
+        })
+    return sections
+
+
+def quiet(fn, *args):
+    # extract_sections prints a marker line for IPC 420
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = quiet(fn, *args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cleaned-dir", default=CLEANED_DIR)
+    parser.add_argument("--repeat", type=int, default=20, help="copies of each act in the throughput text")
+    args = parser.parse_args()
+
+    acts: Dict[str, List[str]] = {}
+    for name in sorted(os.listdir(args.cleaned_dir)):
+        law = detect_law(name)
+        if law and name.endswith(".txt"):
+            with open(os.path.join(args.cleaned_dir, name), "r", encoding="utf-8") as f:
+                acts.setdefault(law, []).append(f.read())
+    if not acts:
+        raise SystemExit(f"No cleaned pages in {args.cleaned_dir}. Run the cleaner first.")
+
+    mismatches = 0
+    for law, pages in acts.items():
+        for page in pages:
+            mismatches += quiet(extract_sections, page, law) != quiet(extract_sections_regex, page, law)
+        whole = "\n".join(pages)
+        mismatches += quiet(extract_sections, whole, law) != quiet(extract_sections_regex, whole, law)
+    print(f"parity: {sum(map(len, acts.values()))} pages + {len(acts)} whole acts, {mismatches} mismatches")
+
+    print(f"\n{'act':<8}{'MB':>8}{'sections':>10}{'regex s':>10}{'scan s':>10}{'regex MB/s':>12}{'scan MB/s':>11}")
+    for law, pages in acts.items():
+        text = "\n".join(pages * args.repeat)
+        mb = len(text.encode("utf-8")) / 2**20
+        old, old_s = timed(extract_sections_regex, text, law)
+        new, new_s = timed(extract_sections, text, law)
+        assert old == new
+        print(f"{law:<8}{mb:>8.1f}{len(new):>10}{old_s:>10.3f}{new_s:>10.3f}{mb / old_s:>12.1f}{mb / new_s:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
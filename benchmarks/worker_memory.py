@@ -0,0 +1,147 @@
+"""
+Benchmark: per-worker memory of the API for 1, 2, 4 and 8 workers (Linux).
+
+Starts the API the two ways it can be scaled out and reads
+/proc/<pid>/smaps_rollup of every server process once it is ready:
+
+  private  uvicorn app.main:app --workers N, INDEX_MMAP=0: every worker loads
+           its own model and indexes
+  shared   gunicorn -c app/gunicorn_conf.py app.main:app: model and indexes
+           loaded once before fork (preload), indexes memory-mapped
+
+RSS counts shared pages in full for every process; PSS splits them between
+the processes that share them, so total PSS is what the server really costs.
+Run from the project root with a built vector store.
+
+  python -m benchmarks.worker_memory --workers 1 2 4 8
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List
+
+MODES = ("private", "shared")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_command(mode: str, workers: int, port: int) -> List[str]:
+    if mode == "private":
+        return [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+                "--port", str(port), "--workers", str(workers)]
+    return [sys.executable, "-m", "gunicorn", "-c", "app/gunicorn_conf.py", "app.main:app",
+            "--bind", f"127.0.0.1:{port}", "--workers", str(workers)]
+
+
+def descendants(pid: int) -> List[int]:
+    found = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        try:
+            with open(f"/proc/{pid}/task/{task}/children", "r") as f:
+                children = [int(c) for c in f.read().split()]
+        except OSError:
+            continue
+        for child in children:
+            found += [child] + descendants(child)
+    return found
+
+
+def memory(pid: int) -> Dict[str, int]:
+    "Rss / Pss / Pss_Anon / Pss_File of one process, in bytes."
+    out = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss", "Pss_Anon", "Pss_File"):
+                out[key] = int(value.split()[0]) * 1024
+    return out
+
+
+def is_worker(pid: int) -> bool:
+    with open(f"/proc/{pid}/cmdline", "rb") as f:
+        return b"resource_tracker" not in f.read()
+
+
+def wait_ready(port: int, workers: int, timeout: float) -> None:
+    "Requests land on random workers: wait until enough /ready calls in a row say ready."
+    url = f"http://127.0.0.1:{port}/ready"
+    deadline = time.monotonic() + timeout
+    streak = 0
+    while streak < 4 * workers:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"server not ready after {timeout:.0f}s")
+        try:
+            with urllib.request.urlopen(url, timeout=5) as r:
+                streak = streak + 1 if r.status == 200 else 0
+        except (urllib.error.URLError, ConnectionError, OSError):
+            streak = 0
+            time.sleep(0.5)
+
+
+def measure(mode: str, workers: int, timeout: float, settle: float) -> Dict:
+    port = free_port()
+    env = dict(os.environ, INDEX_MMAP="1" if mode == "shared" else "0")
+    server = subprocess.Popen(server_command(mode, workers, port), env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port, workers, timeout)
+        time.sleep(settle)
+        pids = [p for p in descendants(server.pid) if is_worker(p)]
+        procs = {"master": memory(server.pid), **{str(p): memory(p) for p in pids}}
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    # uvicorn with one worker serves from the main process itself
+    worker_mem = [m for name, m in procs.items() if name != "master"] or [procs["master"]]
+    return {
+        "mode": mode,
+        "workers": len(worker_mem),
+        "worker_rss": sum(m["Rss"] for m in worker_mem) / max(len(worker_mem), 1),
+        "worker_pss": sum(m["Pss"] for m in worker_mem) / max(len(worker_mem), 1),
+        "total_rss": sum(m["Rss"] for m in procs.values()),
+        "total_pss": sum(m["Pss"] for m in procs.values()),
+        "processes": procs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--timeout", type=float, default=600, help="seconds to wait for every worker to be ready")
+    parser.add_argument("--settle", type=float, default=2, help="seconds to wait after ready before reading memory")
+    parser.add_argument("--json", help="also write the per-process numbers here")
+    args = parser.parse_args()
+
+    mb = 2 ** 20
+    results = []
+    print(f"{'mode':<9}{'workers':>8}{'RSS/worker MB':>15}{'PSS/worker MB':>15}{'total RSS MB':>14}{'total PSS MB':>14}")
+    for mode in args.modes:
+        for n in args.workers:
+            r = measure(mode, n, args.timeout, args.settle)
+            results.append(r)
+            print(f"{mode:<9}{r['workers']:>8}{r['worker_rss'] / mb:>15.1f}{r['worker_pss'] / mb:>15.1f}"
+                  f"{r['total_rss'] / mb:>14.1f}{r['total_pss'] / mb:>14.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
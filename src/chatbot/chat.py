@@ -1,21 +1,15 @@
-import os
-from dotenv import load_dotenv
-from langchain_groq import ChatGroq
-from langchain_core.documents import Document
-
-from src.retrieval.retriever import hybrid_retrieve
+from __future__ import annotations
 
+from typing import TYPE_CHECKING
 
-load_dotenv()
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+from src.llm import get_gateway
+from src.retrieval.context import group_by_section, pack_context
+from src.retrieval.engine import RetrievalEngine
+from src.retrieval.retriever import hybrid_retrieve
 
-# ------------------ LLM 
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
 
-llm = ChatGroq(
-    model_name="llama-3.1-8b-instant",
-    groq_api_key=GROQ_API_KEY,
-    temperature=0.0   
-)
 
 # ------------------ SYSTEM PROMPT ------------------
 
@@ -53,8 +47,8 @@ def filter_relevant_docs(query: str, docs: list[Document]) -> list[Document]:
 
 # ------------------ MAIN ASK FUNCTION ------------------
 
-def ask(query: str, top_k: int = 5) -> dict:
-    retrieved_docs = hybrid_retrieve(query, top_k=top_k)
+def ask(query: str, top_k: int = 5, engine: RetrievalEngine | None = None) -> dict:
+    retrieved_docs = hybrid_retrieve(query, top_k=top_k, engine=engine)
     retrieved_docs = filter_relevant_docs(query, retrieved_docs)
 
     if not retrieved_docs:
@@ -67,7 +61,9 @@ def ask(query: str, top_k: int = 5) -> dict:
     citations = []
     seen_sections = set()
 
-    for doc in retrieved_docs[:2]:  # 🔒 limit context
+    # 🔒 limit context: best chunks within the token budget, one block per section
+    for run in group_by_section(pack_context(retrieved_docs)):
+        doc = run[0]
         citation = {
             "law": doc.metadata.get("law"),
             "section": doc.metadata.get("section"),
@@ -83,7 +79,7 @@ def ask(query: str, top_k: int = 5) -> dict:
 
         context_blocks.append(
             f"[Law: {citation['law']}, Section: {citation['section']}]\n"
-            f"{doc.page_content}"
+            + "\n".join(d.page_content for d in run)
         )
 
     context = "\n\n---\n\n".join(context_blocks)
@@ -108,7 +104,8 @@ USER QUESTION:
 ANSWER:
 """
 
-    response = llm.invoke(prompt)
+    # shared gateway: pooled client, timeout, retries, process-wide in-flight cap
+    response = get_gateway().invoke(prompt)
     answer_text = response.content.strip()
     filtered_citations = [
         c for c in citations
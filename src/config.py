@@ -0,0 +1,82 @@
+import os
+
+# Paths are relative to the project root, like the rest of the pipeline
+DATA_DIR = "data"
+CHUNKS_DIR = os.path.join(DATA_DIR, "chunks_v2")
+VECTOR_STORE_PATH = os.path.join(DATA_DIR, "vector_store")
+INDEX_NAME = "legal"
+
+EMBED_MODEL = "all-MiniLM-L6-v2"
+
+# Offline index build: sentences per SentenceTransformer.encode batch
+EMBED_BUILD_BATCH_SIZE = int(os.getenv("EMBED_BUILD_BATCH_SIZE", "64"))
+
+# Index layout for new builds: "combined" (one store) or "sharded" (one FAISS + BM25 per law)
+INDEX_LAYOUT = os.getenv("INDEX_LAYOUT", "combined")
+
+# Serving: memory-map the FAISS codes and BM25 arrays read-only so API worker processes
+# share them through the page cache (the chunk table is always mapped); app/gunicorn_conf.py sets it
+INDEX_MMAP = os.getenv("INDEX_MMAP", "0") == "1"
+
+# FAISS index type for new builds: flat | hnsw | ivf_flat | ivf_pq | sq8 (see src/retrieval/faiss_index.py)
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+FAISS_IVF_NLIST = int(os.getenv("FAISS_IVF_NLIST", "0"))  # 0 = sized from the corpus
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", "0"))  # 0 = dim / 8 sub-quantizers
+FAISS_PQ_BITS = int(os.getenv("FAISS_PQ_BITS", "8"))
+# search-time, applied when the store is loaded
+FAISS_HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))
+FAISS_IVF_NPROBE = int(os.getenv("FAISS_IVF_NPROBE", "8"))
+
+# Hybrid retrieval: how vector and BM25 hits are fused into one ranked pool (src/retrieval/fusion.py),
+# "weighted" (normalized score sum) or "rrf" (reciprocal rank); BM25 gets 1 - FUSION_VECTOR_WEIGHT
+FUSION_METHOD = os.getenv("FUSION_METHOD", "weighted")
+FUSION_VECTOR_WEIGHT = float(os.getenv("FUSION_VECTOR_WEIGHT", "0.5"))
+FUSION_RRF_K = int(os.getenv("FUSION_RRF_K", "60"))
+
+# Prompt context (src/retrieval/context.py): estimated token budget for retrieved text, and the
+# relevance (0-1, fusion.relevance) under which a retrieved chunk is left out: the better of its
+# cosine similarity and its BM25 score s as s / (s + CONTEXT_BM25_SCALE)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+CONTEXT_MIN_SCORE = float(os.getenv("CONTEXT_MIN_SCORE", "0.2"))
+CONTEXT_BM25_SCALE = float(os.getenv("CONTEXT_BM25_SCALE", "5.0"))
+
+# Query embeddings: LRU size, and micro-batching of concurrent encodes
+QUERY_EMBED_CACHE_SIZE = int(os.getenv("QUERY_EMBED_CACHE_SIZE", "4096"))
+EMBED_BATCH_MAX = int(os.getenv("EMBED_BATCH_MAX", "32"))
+EMBED_BATCH_WAIT_MS = float(os.getenv("EMBED_BATCH_WAIT_MS", "0"))
+
+# Answer cache: per-worker LRU (entries, seconds) in front of a shared SQLite file
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1024"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", os.path.join(DATA_DIR, "cache", "answers.sqlite"))
+ANSWER_CACHE_DISK_TTL = float(os.getenv("ANSWER_CACHE_DISK_TTL", str(7 * 24 * 3600)))
+
+# Precomputed per-section LLM explanations (python -m src.precompute_answers); kept next to
+# the index they were generated from. Empty disables the lookup at serve time
+SECTION_ANSWERS_PATH = os.getenv("SECTION_ANSWERS_PATH", os.path.join(VECTOR_STORE_PATH, "section_answers.sqlite"))
+
+# Exact section lookups ("IPC 302") are answered with the statute text itself, no LLM,
+# unless the request asks for enrich; 0 sends them through retrieval + LLM like any query
+SECTION_FAST_PATH = os.getenv("SECTION_FAST_PATH", "1") == "1"
+
+# LLM gateway (src/llm.py): "groq", or "fake" (canned answers after LLM_FAKE_LATENCY_MS) for tests
+# and benchmarks; timeout per attempt (s), retries on 429/5xx/timeouts with jittered backoff (s),
+# max calls in flight per process, keep-alive connections to the API
+LLM_BACKEND = os.getenv("LLM_BACKEND", "groq")
+LLM_MODEL = os.getenv("LLM_MODEL", "llama-3.1-8b-instant")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "32"))
+LLM_POOL_CONNECTIONS = int(os.getenv("LLM_POOL_CONNECTIONS", "32"))
+LLM_FAKE_LATENCY_MS = float(os.getenv("LLM_FAKE_LATENCY_MS", "0"))
+
+# Observability (src/telemetry.py): Prometheus metrics at /metrics with per-stage latency histograms;
+# DEBUG_TIMINGS=1 lets a request send "X-Debug-Timings: 1" to get its own stage breakdown back
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+DEBUG_TIMINGS = os.getenv("DEBUG_TIMINGS", "0") == "1"
+
+# /query/batch: max LLM calls in flight per batch
+LLM_BATCH_CONCURRENCY = int(os.getenv("LLM_BATCH_CONCURRENCY", "8"))
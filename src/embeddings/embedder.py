@@ -1,19 +1,30 @@
 import os
 import json 
+import time
 import pickle
-from typing import List,Dict
+import hashlib
+import argparse
+import tempfile
+from typing import List,Dict,Optional
 import numpy as np   
 from sentence_transformers import SentenceTransformer
 
 from langchain_huggingface.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
-CHUNKS_DIR = os.path.join("data","chunks_v2")
-VECTOR_DB_DIR = os.path.join("data","vector_store")
 
-os.makedirs(VECTOR_DB_DIR,exist_ok=True)
+from src.config import CHUNKS_DIR, EMBED_BUILD_BATCH_SIZE, EMBED_MODEL, INDEX_LAYOUT, VECTOR_STORE_PATH
+from src.retrieval.bm25 import bm25_path
+from src.retrieval.chunk_store import ChunkStore
+from src.retrieval.engine import build_bm25
+from src.retrieval.faiss_index import build_index, default_index_type, save_index_meta, save_vector_store
+from src.retrieval.section_index import build_section_index, save_section_index, section_index_path
+from src.retrieval.shards import save_shard_layout, shard_dir, store_dirs
 
-EMBED_MODEL = "all-MiniLM-L6-v2"
+os.makedirs(VECTOR_STORE_PATH,exist_ok=True)
+
+# vectors are written here as they are encoded, so an interrupted build resumes
+CHECKPOINT_PATH = os.path.join(VECTOR_STORE_PATH, "embeddings.npy")
 
 def load_all_chunks() ->List[Dict]:
   all_chunks = []
@@ -38,8 +49,176 @@ def load_all_chunks() ->List[Dict]:
   return all_chunks
 
 
-if __name__ == "__main__":
+def chunks_to_documents(chunks: List[Dict]) -> List[Document]:
+  return [
+    Document(
+      page_content=c["text"],
+      metadata={
+        "law": c["law"],
+        "section":c["section"],
+        "section_title":c["section_title"],
+        "source_file":c["source_file"],
+        "chunk_id":c["chunk_id"],
+      }
+    )
+    for c in chunks
+  ]
+
+
+def save_store(vector_db, chunks: List[Dict], out_dir: str, index_type: Optional[str] = None):
+  "One store: FAISS index + its type and the BM25 artifact (the combined index or one law's shard)."
+  os.makedirs(out_dir, exist_ok=True)
+  
+  #save in langchain format (swapped in atomically: running servers may have the old index mapped)
+  save_vector_store(vector_db, out_dir, "legal")
+  save_index_meta(index_type or default_index_type(), vector_db.index, out_dir)
+  
+  #sparse BM25 artifact so the API does not rebuild it at startup
+  build_bm25(chunks).save(bm25_path(out_dir))
+
+
+def save_lookup_artifacts(chunks: List[Dict], out_dir: str = VECTOR_STORE_PATH):
+  "Global for every layout: the section index and the binary chunk table."
+  #exact (law, section) -> chunk_ids lookup, stored next to the index
+  save_section_index(build_section_index(chunks), section_index_path(out_dir))
+  print("Section index created successfully")
+  
+  #chunk metadata columns + text blob, memory-mapped by the API
+  ChunkStore.from_chunks(chunks).save(out_dir)
+  print("Chunk table created successfully")
+
+
+def save_index_artifacts(vector_db, chunks: List[Dict], out_dir: str = VECTOR_STORE_PATH, index_type: Optional[str] = None):
+  "Everything the API loads from the vector store dir: FAISS index + its type, BM25, section index, chunk table."
+  save_store(vector_db, chunks, out_dir, index_type)
+  print("Vector Store and BM25 index created successfully")
+  
+  save_lookup_artifacts(chunks, out_dir)
+
+
+def save_shards(chunks: List[Dict], vectors, embedder, laws: List[str], out_dir: str = VECTOR_STORE_PATH, index_type: Optional[str] = None):
+  "(Re)build the shards of the given laws only; other shards are left as they are."
+  index_type = index_type or default_index_type()
+  vectors = np.asarray(vectors)
+  for law in laws:
+    rows = [i for i, c in enumerate(chunks) if c["law"] == law]
+    law_chunks = [chunks[i] for i in rows]
+    vector_db = vector_store_from_vectors(law_chunks, vectors[rows], embedder, index_type)
+    save_store(vector_db, law_chunks, shard_dir(out_dir, law), index_type)
+    print(f"{law} shard created successfully ({len(rows)} chunks)")
+
+
+def save_sharded_artifacts(chunks: List[Dict], vectors, embedder, out_dir: str = VECTOR_STORE_PATH, index_type: Optional[str] = None):
+  "One store per law under out_dir/shards/<law>; the section index and chunk table stay global."
+  index_type = index_type or default_index_type()
+  laws = sorted({c["law"] for c in chunks})
+  save_shards(chunks, vectors, embedder, laws, out_dir, index_type)
+  save_shard_layout(laws, index_type, out_dir)
+  
+  save_lookup_artifacts(chunks, out_dir)
+
+
+def vector_store_from_vectors(chunks: List[Dict], vectors, embedder, index_type: Optional[str] = None):
+  "FAISS store from precomputed vectors (row i belongs to chunks[i]); docstore ids are the chunk ids."
+  from langchain_community.docstore.in_memory import InMemoryDocstore
   
+  #untrained types (IVF / PQ / SQ) are trained on the whole matrix before the store adds to them
+  index = build_index(index_type or default_index_type(), np.asarray(vectors), add=False)
+  vector_db = FAISS(embedder, index, InMemoryDocstore(), {})
+  
+  documents = chunks_to_documents(chunks)
+  vector_db.add_embeddings(
+    text_embeddings=[(d.page_content, v) for d, v in zip(documents, vectors)],
+    metadatas=[d.metadata for d in documents],
+    ids=[str(c["chunk_id"]) for c in chunks],
+  )
+  return vector_db
+
+
+def checkpoint_key(chunks: List[Dict], model_name: str) -> str:
+  "A checkpoint is only reused for the same model and the same chunks in the same order."
+  h = hashlib.sha256(model_name.encode("utf-8"))
+  for c in chunks:
+    h.update(f"\0{c['chunk_id']}\0{c['text']}".encode("utf-8"))
+  return h.hexdigest()
+
+
+def encode_chunks(
+  chunks: List[Dict],
+  model_name: str = EMBED_MODEL,
+  batch_size: int = EMBED_BUILD_BATCH_SIZE,
+  workers: int = 1,
+  checkpoint_path: str = CHECKPOINT_PATH,
+  resume: bool = True,
+) -> np.ndarray:
+  """
+  Encode chunk texts into a float32 memmap at checkpoint_path, one block at a
+  time. Progress is stored next to it (<checkpoint>.json) after every block,
+  so a rerun continues where the last one stopped.
+  """
+  model = SentenceTransformer(model_name, device="cpu")
+  n, dim = len(chunks), model.get_sentence_embedding_dimension()
+  key = checkpoint_key(chunks, model_name)
+  state_path = checkpoint_path + ".json"
+
+  done = 0
+  if resume and os.path.exists(checkpoint_path) and os.path.exists(state_path):
+    with open(state_path, "r", encoding="utf-8") as f:
+      state = json.load(f)
+    if state.get("key") == key:
+      done = state["done"]
+  if done:
+    vectors = np.lib.format.open_memmap(checkpoint_path, mode="r+")
+    print(f"Resuming from checkpoint: {done}/{n} chunks already encoded")
+  else:
+    os.makedirs(os.path.dirname(checkpoint_path) or ".", exist_ok=True)
+    vectors = np.lib.format.open_memmap(checkpoint_path, mode="w+", dtype=np.float32, shape=(n, dim))
+
+  pool = model.start_multi_process_pool(["cpu"] * workers) if workers > 1 else None
+  # a few batches per worker between checkpoints
+  block = batch_size * max(workers, 1) * 4
+  start, encoded = time.perf_counter(), 0
+  try:
+    while done < n:
+      texts = [c["text"] for c in chunks[done:done + block]]
+      if pool is not None:
+        emb = model.encode_multi_process(texts, pool, batch_size=batch_size)
+      else:
+        emb = model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+      vectors[done:done + len(texts)] = emb
+      vectors.flush()
+
+      done += len(texts)
+      encoded += len(texts)
+      tmp = state_path + ".tmp"
+      with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"key": key, "model": model_name, "done": done, "total": n}, f)
+      os.replace(tmp, state_path)
+
+      elapsed = time.perf_counter() - start
+      print(f"  {done}/{n} chunks  {encoded / elapsed:.1f} chunks/s")
+  finally:
+    if pool is not None:
+      model.stop_multi_process_pool(pool)
+
+  elapsed = time.perf_counter() - start
+  if encoded:
+    print(f"Encoded {encoded} chunks in {elapsed:.2f}s ({encoded / elapsed:.1f} chunks/s, batch {batch_size}, workers {workers})")
+  return vectors
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Embed data/chunks_v2 and build the vector store")
+  parser.add_argument("--batch-size", type=int, default=EMBED_BUILD_BATCH_SIZE)
+  parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="encoding processes (1 = encode in this process)")
+  parser.add_argument("--limit", type=int, default=None, help="only encode the first N chunks and report throughput (no index is written)")
+  parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+  parser.add_argument("--no-resume", action="store_true", help="ignore an existing checkpoint")
+  parser.add_argument("--index-type", default=None, help="flat | hnsw | ivf_flat | ivf_pq | sq8 (default: FAISS_INDEX_TYPE)")
+  parser.add_argument("--layout", default=INDEX_LAYOUT, choices=["combined", "sharded"])
+  parser.add_argument("--law", default=None, help="only (re)build this law's shard of an existing sharded store, e.g. a newly added statute")
+  args = parser.parse_args()
+
   chunks = load_all_chunks()
   
   if not chunks:
@@ -48,31 +227,43 @@ if __name__ == "__main__":
   
   print(f"Loaded {len(chunks)} chunks")
   
+  if args.limit:
+    chunks = chunks[:args.limit]
+    # a throughput run: its vectors are thrown away with the temp dir
+    with tempfile.TemporaryDirectory() as tmp:
+      checkpoint = os.path.join(tmp, "embeddings.npy")
+      encode_chunks(chunks, batch_size=args.batch_size, workers=args.workers, checkpoint_path=checkpoint, resume=False)
+    exit()
   
-  #convert to langchain document
-  documents = []
-  
-  for c in chunks:
-    documents.append(
-      Document(
-        page_content=c["text"],
-        metadata={
-          "law": c["law"],
-          "section":c["section"],
-          "section_title":c["section_title"],
-          "source_file":c["source_file"],
-          "chunk_id":c["chunk_id"],
-        }
-      )
-    )
-   
+  all_chunks = chunks
+  if args.law:
+    law = args.law.upper()
+    if None in store_dirs(VECTOR_STORE_PATH):
+      print("--law needs a sharded vector store; build one with --layout sharded first")
+      exit(1)
+    chunks = [c for c in chunks if c["law"] == law]
+    args.checkpoint = args.checkpoint.replace(".npy", f".{law.lower()}.npy")
   
-  # Langchain embedding wrapper
-  embedder = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+  vectors = encode_chunks(
+    chunks,
+    batch_size=args.batch_size,
+    workers=args.workers,
+    checkpoint_path=args.checkpoint,
+    resume=not args.no_resume,
+  )
   
-  #create a Fiass DB using Langchain 
-  vector_db = FAISS.from_documents(documents,embedder)
+  # Langchain embedding wrapper, used by FAISS for query-time embeddings only
+  embedder = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
   
-  #save in langchain format
-  vector_db.save_local(folder_path=VECTOR_DB_DIR,index_name="legal")
-  print("Vector Store created successfully")
\ No newline at end of file
+  if args.law:
+    #one new / changed statute: build its shard and add it to the layout
+    index_type = args.index_type or default_index_type()
+    save_shards(chunks, vectors, embedder, [law], index_type=index_type)
+    save_shard_layout(set(store_dirs(VECTOR_STORE_PATH)) | {law}, index_type, VECTOR_STORE_PATH)
+    save_lookup_artifacts(all_chunks, VECTOR_STORE_PATH)
+  elif args.layout == "sharded":
+    save_sharded_artifacts(chunks, vectors, embedder, index_type=args.index_type)
+  else:
+    #create a Fiass DB from the encoded matrix
+    vector_db = vector_store_from_vectors(chunks, vectors, embedder, args.index_type)
+    save_index_artifacts(vector_db, chunks, index_type=args.index_type)
@@ -1,43 +1,124 @@
 import os
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
 from pypdf import PdfReader
 BASE_DIR = os.getcwd() #project root
 RAW_PDF_DIR = os.path.join(BASE_DIR,"data","raw_pdfs")
 EXTRACTED_DIR = os.path.join(BASE_DIR,"data","extracted")
+# pdf path -> content hash + pages written, so unchanged PDFs are skipped
+CACHE_FILE = os.path.join(EXTRACTED_DIR, ".extract_cache.json")
+
+
+def file_sha256(path: str) -> str:
+  h = hashlib.sha256()
+  with open(path, "rb") as f:
+    for block in iter(lambda: f.read(1 << 20), b""):
+      h.update(block)
+  return h.hexdigest()
+
+
+def load_cache() -> dict:
+  if not os.path.exists(CACHE_FILE):
+    return {}
+  with open(CACHE_FILE, "r", encoding="utf-8") as f:
+    return json.load(f)
+
+
+def save_cache(cache: dict):
+  with open(CACHE_FILE, "w", encoding="utf-8") as f:
+    json.dump(cache, f, indent=2)
 
 
-def extracted_pdf_pages(pdf_path: str, prefix:str):
+def extract_page_range(pdf_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+  "Extract pages [start, end) (0-based). Runs in a worker process, so it opens its own reader."
   reader = PdfReader(pdf_path)
-  
-  for page_num, page in enumerate(reader.pages,start=1):
-    text = page.extract_text()
-    
+  return [(i + 1, reader.pages[i].extract_text()) for i in range(start, end)]
+
+
+def page_ranges(num_pages: int, parts: int) -> List[Tuple[int, int]]:
+  size = max(1, -(-num_pages // parts))
+  return [(s, min(s + size, num_pages)) for s in range(0, num_pages, size)]
+
+
+def extracted_pdf_pages(pdf_path: str, prefix:str, pool: Optional[ProcessPoolExecutor] = None, workers: int = 1) -> List[str]:
+  "Write one .txt per non-empty page; returns the file names written."
+  if pool is None or workers <= 1:
+    reader = PdfReader(pdf_path)
+    pages = [(page_num, page.extract_text()) for page_num, page in enumerate(reader.pages, start=1)]
+  else:
+    num_pages = len(PdfReader(pdf_path).pages)
+    # a few ranges per worker keeps the pool busy when pages differ in cost
+    ranges = page_ranges(num_pages, workers * 4)
+    futures = [pool.submit(extract_page_range, pdf_path, s, e) for s, e in ranges]
+    pages = [page for fut in futures for page in fut.result()]
+
+  written = []
+  for page_num, text in pages:
     if not text or not text.strip():
       continue
-    
+
     file_name = f"{prefix}_page_{page_num:03}.txt"
     output_path = os.path.join(EXTRACTED_DIR, file_name)
-    
+
     with open(output_path, "w", encoding="utf-8") as f:
       f.write(text)
-      
+    written.append(file_name)
+  return written
+
 
-def run_loader():
+def run_loader(workers: int = 1, force: bool = False):
   os.makedirs(EXTRACTED_DIR,exist_ok=True)
-  
-  for law in ["ipc","crpc"]:
-    law_folder = os.path.join(RAW_PDF_DIR,law)
-    
-    if not os.path.exists(law_folder):
-      raise FileNotFoundError(f"Folder not found: {law_folder}")
-    
-    for file in os.listdir(law_folder):
-      if file.endswith(".pdf"):
-        pdf_path = os.path.join(law_folder, file)
-        print(f"loading:{pdf_path}")
-        extracted_pdf_pages(pdf_path, law)
-        
-        
-        
+  cache = {} if force else load_cache()
+  summary = []
+
+  pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+  try:
+    for law in ["ipc","crpc"]:
+      law_folder = os.path.join(RAW_PDF_DIR,law)
+
+      if not os.path.exists(law_folder):
+        raise FileNotFoundError(f"Folder not found: {law_folder}")
+
+      for file in sorted(os.listdir(law_folder)):
+        if file.endswith(".pdf"):
+          pdf_path = os.path.join(law_folder, file)
+          start = time.perf_counter()
+          digest = file_sha256(pdf_path)
+
+          entry = cache.get(pdf_path)
+          if entry and entry["sha256"] == digest and all(
+            os.path.exists(os.path.join(EXTRACTED_DIR, name)) for name in entry["pages"]
+          ):
+            summary.append((pdf_path, "cached", len(entry["pages"]), time.perf_counter() - start))
+            continue
+
+          print(f"loading:{pdf_path}")
+          written = extracted_pdf_pages(pdf_path, law, pool=pool, workers=workers)
+          cache[pdf_path] = {"sha256": digest, "pages": written}
+          save_cache(cache)
+          summary.append((pdf_path, "extracted", len(written), time.perf_counter() - start))
+  finally:
+    if pool is not None:
+      pool.shutdown()
+
+  print("\nfile                                      status      pages   seconds   pages/s")
+  for path, status, pages, seconds in summary:
+    rate = f"{pages / seconds:.1f}" if status == "extracted" and seconds > 0 else "-"
+    print(f"{os.path.relpath(path, BASE_DIR):<42}{status:<12}{pages:>5}{seconds:>10.2f}{rate:>10}")
+  return summary
+
+
+
 if __name__ == "__main__":
-  run_loader()
-  print("PDF loading completed")     
\ No newline at end of file
+  parser = argparse.ArgumentParser(description="Extract PDF pages to data/extracted")
+  parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes for page extraction (1 = serial)")
+  parser.add_argument("--force", action="store_true", help="ignore the content-hash cache and re-extract everything")
+  args = parser.parse_args()
+
+  run_loader(workers=args.workers, force=args.force)
+  print("PDF loading completed")
@@ -0,0 +1,384 @@
+"""
+LLM gateway: the one way the service talks to the LLM (rag_service, chat, batch jobs).
+
+  - one backend per process, built on first use (after any fork): Groq over
+    a pooled keep-alive HTTP client, or a local fake (LLM_BACKEND=fake) for
+    tests and benchmarks
+  - a timeout per attempt; 429, 5xx, timeouts and connection errors are
+    retried with jittered exponential backoff (Retry-After is honoured)
+  - at most LLM_MAX_IN_FLIGHT calls in flight per process, shared by sync
+    and async callers; the rest queue in arrival order
+  - per-call latency and token usage, summed in stats()
+
+invoke / ainvoke / astream mirror the LangChain chat model methods, so
+callers keep using response.content.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+from dotenv import load_dotenv
+
+from src.config import (
+    LLM_BACKEND,
+    LLM_MODEL,
+    LLM_TIMEOUT,
+    LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE,
+    LLM_BACKOFF_MAX,
+    LLM_MAX_IN_FLIGHT,
+    LLM_POOL_CONNECTIONS,
+    LLM_FAKE_LATENCY_MS,
+)
+from src.telemetry import observe, record_llm, record_llm_retry
+
+load_dotenv()
+
+# matched by class name anywhere in the MRO, so neither SDK has to be importable:
+# groq's APITimeoutError, httpx's TimeoutException (ReadTimeout, ConnectTimeout, PoolTimeout...)
+TIMEOUT_ERRORS = ("APITimeoutError", "TimeoutException")
+RETRYABLE_ERRORS = TIMEOUT_ERRORS + ("APIConnectionError", "TransportError")
+
+
+class GroqBackend:
+    "ChatGroq over shared httpx clients (keep-alive pool); retries are left to the gateway."
+
+    def __init__(self, model: str = LLM_MODEL, timeout: float = LLM_TIMEOUT, pool: int = LLM_POOL_CONNECTIONS):
+        import httpx
+        from langchain_groq import ChatGroq
+
+        limits = httpx.Limits(max_connections=pool, max_keepalive_connections=pool, keepalive_expiry=60)
+        self.model = ChatGroq(
+            model_name=model,
+            groq_api_key=os.getenv("GROQ_API_KEY"),
+            temperature=0.0,
+            request_timeout=timeout,
+            max_retries=0,
+            http_client=httpx.Client(limits=limits, timeout=timeout),
+            # bound to the event loop that first uses it: the API's, or a batch job's asyncio.run
+            http_async_client=httpx.AsyncClient(limits=limits, timeout=timeout),
+        )
+
+    def invoke(self, prompt: str):
+        return self.model.invoke(prompt)
+
+    async def ainvoke(self, prompt: str):
+        return await self.model.ainvoke(prompt)
+
+    def astream(self, prompt: str):
+        return self.model.astream(prompt)
+
+
+class FakeBackend:
+    """
+    Deterministic stand-in: after latency_ms it answers with the first section
+    header of the prompt's context and a hash of the prompt, and reports token
+    usage estimated from the text (4 characters a token).
+    """
+
+    def __init__(self, latency_ms: float = LLM_FAKE_LATENCY_MS):
+        self.latency = latency_ms / 1000
+
+    def _message(self, prompt: str, cls=None):
+        from langchain_core.messages import AIMessage
+
+        header = next((line for line in prompt.splitlines() if line.startswith("[")), "[no context]")
+        content = f"Based on {header.strip('[]')}: answer {hashlib.sha1(prompt.encode('utf-8')).hexdigest()[:8]}."
+        usage = {"input_tokens": len(prompt) // 4, "output_tokens": len(content) // 4}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        return (cls or AIMessage)(content=content, usage_metadata=usage)
+
+    def invoke(self, prompt: str):
+        time.sleep(self.latency)
+        return self._message(prompt)
+
+    async def ainvoke(self, prompt: str):
+        await asyncio.sleep(self.latency)
+        return self._message(prompt)
+
+    async def astream(self, prompt: str):
+        from langchain_core.messages import AIMessageChunk
+
+        await asyncio.sleep(self.latency)
+        yield self._message(prompt, AIMessageChunk)
+
+
+BACKENDS = {"groq": GroqBackend, "fake": FakeBackend}
+
+
+class ConcurrencyLimiter:
+    """
+    Counting semaphore shared by threads and event loops: sync callers block,
+    async callers await, and a freed slot goes to the longest waiter.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.in_use = 0
+        self._lock = threading.Lock()
+        self._waiters: deque = deque()  # threading.Event or (loop, future)
+
+    def acquire(self) -> None:
+        with self._lock:
+            if self.in_use < self.limit and not self._waiters:
+                self.in_use += 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()
+
+    async def aacquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.in_use < self.limit and not self._waiters:
+                self.in_use += 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                queued = waiter in self._waiters
+                if queued:
+                    self._waiters.remove(waiter)
+            if not queued and not waiter[1].cancelled():
+                # cancelled just after the slot was handed over: pass it on
+                self.release()
+            # (a cancelled future gets its slot passed on by _hand_over)
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            if not self._waiters:
+                self.in_use -= 1
+                return
+            # the slot passes straight to the next waiter; in_use is unchanged
+            waiter = self._waiters.popleft()
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+        else:
+            loop, future = waiter
+            loop.call_soon_threadsafe(self._hand_over, future)
+
+    def _hand_over(self, future: asyncio.Future) -> None:
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+
+async def _next(stream) -> Any:
+    "Next chunk of an async iterator, None at the end."
+    try:
+        return await stream.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    code = getattr(error, "status_code", None)
+    if code is None:
+        code = getattr(getattr(error, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def _error_names(error: BaseException) -> Set[str]:
+    return {cls.__name__ for cls in type(error).__mro__}
+
+
+def is_timeout(error: BaseException) -> bool:
+    "asyncio.wait_for on the async path, the HTTP client's own timeout on the sync one."
+    return isinstance(error, (TimeoutError, asyncio.TimeoutError)) or not _error_names(error).isdisjoint(TIMEOUT_ERRORS)
+
+
+def is_retryable(error: BaseException) -> bool:
+    code = status_code(error)
+    if code is not None:
+        return code == 429 or code >= 500
+    return (
+        is_timeout(error)
+        or isinstance(error, ConnectionError)
+        or not _error_names(error).isdisjoint(RETRYABLE_ERRORS)
+    )
+
+
+def retry_after(error: BaseException) -> float:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class LLMGateway:
+    """
+    Wraps a backend with the per-process limits and metrics. Create one per
+    process through get_gateway(); set_gateway() installs another (e.g. a
+    fake backend in a benchmark).
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        timeout: float = LLM_TIMEOUT,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_base: float = LLM_BACKOFF_BASE,
+        backoff_max: float = LLM_BACKOFF_MAX,
+        max_in_flight: int = LLM_MAX_IN_FLIGHT,
+    ):
+        self.backend = backend if backend is not None else BACKENDS[LLM_BACKEND]()
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiter = ConcurrencyLimiter(max_in_flight)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        "Full jitter: uniform in [0, base * 2^attempt], capped; at least what Retry-After asks for."
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return min(self.backoff_max, max(delay, retry_after(error)))
+
+    def _should_retry(self, attempt: int, error: BaseException) -> bool:
+        with self._lock:
+            if is_timeout(error):
+                self.timeouts += 1
+            retry = attempt < self.max_retries and is_retryable(error)
+            if retry:
+                self.retries += 1
+        if retry:
+            record_llm_retry()
+        return retry
+
+    def _record(self, start: float, usage: Optional[Dict[str, int]] = None, failed: bool = False) -> None:
+        latency = time.perf_counter() - start
+        usage = usage or {}
+        observe("llm", latency)
+        record_llm(usage, failed)
+        with self._lock:
+            self.calls += 1
+            self.failures += failed
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            self.input_tokens += usage.get("input_tokens", 0)
+            self.output_tokens += usage.get("output_tokens", 0)
+
+    def invoke(self, prompt: str):
+        start = time.perf_counter()
+        self.limiter.acquire()
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    # the HTTP client enforces the timeout on the sync path
+                    message = self.backend.invoke(prompt)
+                    break
+                except Exception as e:
+                    if not self._should_retry(attempt, e):
+                        raise
+                    time.sleep(self.backoff(attempt, e))
+        except Exception:
+            self._record(start, failed=True)
+            raise
+        finally:
+            self.limiter.release()
+        self._record(start, getattr(message, "usage_metadata", None))
+        return message
+
+    async def ainvoke(self, prompt: str):
+        start = time.perf_counter()
+        await self.limiter.aacquire()
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    message = await asyncio.wait_for(self.backend.ainvoke(prompt), self.timeout)
+                    break
+                except Exception as e:
+                    if not self._should_retry(attempt, e):
+                        raise
+                    await asyncio.sleep(self.backoff(attempt, e))
+        except Exception:
+            self._record(start, failed=True)
+            raise
+        finally:
+            self.limiter.release()
+        self._record(start, getattr(message, "usage_metadata", None))
+        return message
+
+    async def astream(self, prompt: str) -> AsyncIterator[Any]:
+        "Retried only until the first chunk arrives; the slot is held until the stream ends."
+        start = time.perf_counter()
+        usage: Dict[str, int] = {}
+        await self.limiter.aacquire()
+        try:
+            for attempt in range(self.max_retries + 1):
+                stream = self.backend.astream(prompt).__aiter__()
+                try:
+                    chunk = await asyncio.wait_for(_next(stream), self.timeout)
+                    break
+                except Exception as e:
+                    if not self._should_retry(attempt, e):
+                        raise
+                    await asyncio.sleep(self.backoff(attempt, e))
+            while chunk is not None:
+                for key, value in (getattr(chunk, "usage_metadata", None) or {}).items():
+                    usage[key] = usage.get(key, 0) + value
+                yield chunk
+                chunk = await _next(stream)
+        except Exception:
+            self._record(start, failed=True)
+            raise
+        finally:
+            self.limiter.release()
+        self._record(start, usage)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = self.calls
+            return {
+                "backend": type(self.backend).__name__,
+                "calls": calls,
+                "failures": self.failures,
+                "retries": self.retries,
+                "timeouts": self.timeouts,
+                "in_flight": self.limiter.in_use,
+                "max_in_flight": self.limiter.limit,
+                "latency_avg_ms": self.latency_total / calls * 1000 if calls else 0.0,
+                "latency_max_ms": self.latency_max * 1000,
+                "input_tokens": self.input_tokens,
+                "output_tokens": self.output_tokens,
+            }
+
+
+_GATEWAY: Optional[LLMGateway] = None
+_GATEWAY_LOCK = threading.Lock()
+
+
+def set_gateway(gateway: Optional[LLMGateway]) -> None:
+    "Install the process-wide gateway (None: build the configured one on next use)."
+    global _GATEWAY
+    with _GATEWAY_LOCK:
+        _GATEWAY = gateway
+
+
+def get_gateway() -> LLMGateway:
+    global _GATEWAY
+    with _GATEWAY_LOCK:
+        if _GATEWAY is None:
+            _GATEWAY = LLMGateway()
+        return _GATEWAY
@@ -0,0 +1,66 @@
+import os
+import json
+import hashlib
+from typing import Dict, List, Optional
+
+from src.config import VECTOR_STORE_PATH, INDEX_NAME
+
+MANIFEST_FILE = f"{INDEX_NAME}_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def manifest_path(vector_store_path: str = VECTOR_STORE_PATH) -> str:
+    return os.path.join(vector_store_path, MANIFEST_FILE)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class Manifest:
+    """
+    What the current index was built from, so a rebuild can skip work:
+
+      pdfs:   pdf path  -> {"sha256", "pages": [page file names]}
+      pages:  page file -> {"raw", "cleaned" (text hashes), "chunks": [chunk ids]}
+      chunks: chunk id  -> text hash
+    """
+
+    def __init__(self, pdfs: Optional[Dict] = None, pages: Optional[Dict] = None, chunks: Optional[Dict] = None):
+        self.pdfs: Dict[str, Dict] = pdfs or {}
+        self.pages: Dict[str, Dict] = pages or {}
+        self.chunks: Dict[str, str] = chunks or {}
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> Optional["Manifest"]:
+        path = path or manifest_path()
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != MANIFEST_VERSION:
+            return None
+        return cls(data["pdfs"], data["pages"], data["chunks"])
+
+    def save(self, path: Optional[str] = None) -> str:
+        path = path or manifest_path()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": MANIFEST_VERSION, "pdfs": self.pdfs, "pages": self.pages, "chunks": self.chunks},
+                f,
+                ensure_ascii=False,
+            )
+        return path
+
+    def record_page(self, file_name: str, raw_hash: str, cleaned_hash: str, chunks: List[Dict]) -> None:
+        self.pages[file_name] = {
+            "raw": raw_hash,
+            "cleaned": cleaned_hash,
+            "chunks": [ch["chunk_id"] for ch in chunks],
+        }
+        for ch in chunks:
+            self.chunks[str(ch["chunk_id"])] = text_hash(ch["text"])
+
+    def chunk_ids(self) -> List[int]:
+        return [cid for page in self.pages.values() for cid in page["chunks"]]
@@ -0,0 +1,476 @@
+"""
+Streaming ingestion: PDF -> pages -> clean -> sections -> chunks -> embeddings -> indexes.
+
+Pages flow through bounded queues between stage threads instead of being
+written to data/extracted and data/cleaned_text and read back. Chunk ids,
+source_file names and chunk order match the loader/cleaner/chunker path.
+
+With --incremental, a manifest of page/cleaned-text/chunk hashes from the
+previous build is used to skip unchanged PDFs and pages, embed only new
+chunks and apply adds/deletes to the existing FAISS index and BM25 artifact.
+
+  python -m src.pipeline [--incremental] [--workers N] [--debug-dir DIR] [--no-index]
+"""
+import os
+import json
+import time
+import queue
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.config import CHUNKS_DIR, VECTOR_STORE_PATH, INDEX_NAME, INDEX_LAYOUT, EMBED_MODEL
+from src.ingestion.loader import RAW_PDF_DIR, extract_page_range, file_sha256, page_ranges
+from src.manifest import Manifest, manifest_path, text_hash
+from src.preprocessing.cleaner import LegalTextCleaner
+from src.preprocessing.chunker1 import detect_law, chunk_page
+
+LAWS = ["ipc", "crpc"]
+_DONE = object()
+
+
+class StageStats:
+    def __init__(self, name: str, unit: str):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.busy = 0.0
+
+    def add(self, items: int, seconds: float):
+        self.items += items
+        self.busy += seconds
+
+    def report(self, wall: float) -> str:
+        rate = self.items / self.busy if self.busy else 0.0
+        return (
+            f"{self.name:<10}{self.items:>8} {self.unit:<11}"
+            f"busy {self.busy:8.2f}s  {rate:10.1f} {self.unit}/s  ({self.items / wall if wall else 0:.1f}/s wall)"
+        )
+
+
+def pdf_sources(raw_pdf_dir: str = RAW_PDF_DIR) -> List[Tuple[str, str]]:
+    "(law prefix, pdf path), in the order run_chunking sees the cleaned files (sorted by name)."
+    sources = []
+    for law in sorted(LAWS):
+        folder = os.path.join(raw_pdf_dir, law)
+        if not os.path.exists(folder):
+            raise FileNotFoundError(f"Folder not found: {folder}")
+        for file in sorted(os.listdir(folder)):
+            if file.endswith(".pdf"):
+                sources.append((law, os.path.join(folder, file)))
+    return sources
+
+
+def iter_pages(
+    sources: List[Tuple[str, str]],
+    pool: Optional[ProcessPoolExecutor] = None,
+    workers: int = 1,
+    known_pdfs: Optional[Dict[str, Dict]] = None,
+    pdf_log: Optional[Dict[str, Dict]] = None,
+) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Yield (cleaned file name, raw page text) for every non-empty page, in page order.
+    Pages of a PDF whose hash matches known_pdfs are not extracted; they are
+    yielded with text None. pdf_log receives {pdf path: {"sha256", "pages"}}.
+    """
+    from pypdf import PdfReader
+
+    for prefix, pdf_path in sources:
+        digest = file_sha256(pdf_path)
+        known = (known_pdfs or {}).get(pdf_path)
+        if known and known["sha256"] == digest:
+            if pdf_log is not None:
+                pdf_log[pdf_path] = known
+            for name in known["pages"]:
+                yield name, None
+            continue
+
+        reader = PdfReader(pdf_path)
+        if pool is None or workers <= 1:
+            ranges = ([(n, page.extract_text())] for n, page in enumerate(reader.pages, start=1))
+        else:
+            futures = [pool.submit(extract_page_range, pdf_path, s, e) for s, e in page_ranges(len(reader.pages), workers * 4)]
+            ranges = (f.result() for f in futures)
+
+        names = []
+        for pages in ranges:
+            for page_num, text in pages:
+                if not text or not text.strip():
+                    continue
+                # the file round trip in loader/cleaner normalizes newlines; do the same here
+                text = text.replace("\r\n", "\n").replace("\r", "\n")
+                name = f"{prefix}_page_{page_num:03}_cleaned.txt"
+                names.append(name)
+                yield name, text
+        if pdf_log is not None:
+            pdf_log[pdf_path] = {"sha256": digest, "pages": names}
+
+
+class Pipeline:
+    def __init__(
+        self,
+        workers: int = 1,
+        queue_size: int = 64,
+        embed_batch: int = 64,
+        debug_dir: Optional[str] = None,
+        build_index: bool = True,
+        incremental: bool = False,
+        chunks_dir: str = CHUNKS_DIR,
+        vector_store_path: str = VECTOR_STORE_PATH,
+    ):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.embed_batch = embed_batch
+        self.debug_dir = debug_dir
+        self.build_index = build_index
+        self.incremental = incremental
+        self.chunks_dir = chunks_dir
+        self.vector_store_path = vector_store_path
+
+        self.stats = {
+            "extract": StageStats("extract", "pages"),
+            "clean": StageStats("clean", "pages"),
+            "chunk": StageStats("chunk", "chunks"),
+            "embed": StageStats("embed", "embeddings"),
+        }
+        self.errors: List[BaseException] = []
+        self._failed = threading.Event()
+        self._embedder_instance = None
+
+        self.manifest = Manifest()
+        self.previous: Optional[Manifest] = None
+        self.previous_chunks: Dict[int, Dict] = {}
+        self.pages_reused = 0
+        self.pages_rechunked = 0
+
+    # ---- previous build
+    def _load_previous(self) -> None:
+        "Use the last build as a base only if its manifest, chunks and indexes are all present."
+        from src.retrieval.bm25 import bm25_path
+        from src.retrieval.engine import load_all_chunks
+        from src.retrieval.shards import store_dirs
+
+        previous = Manifest.load(manifest_path(self.vector_store_path))
+        if previous is None:
+            print("No manifest from a previous build: full rebuild")
+            return
+
+        chunks = {c["chunk_id"]: c for c in load_all_chunks(self.chunks_dir)}
+        index_files = [
+            path
+            for store in store_dirs(self.vector_store_path).values()
+            for path in (os.path.join(store, f"{INDEX_NAME}.faiss"), bm25_path(store))
+        ]
+        if any(cid not in chunks for cid in previous.chunk_ids()) or not all(map(os.path.exists, index_files)):
+            print("Previous build is incomplete: full rebuild")
+            return
+
+        self.previous = previous
+        self.previous_chunks = chunks
+
+    # ---- debug dumps
+    def _dump(self, kind: str, name: str, content):
+        if not self.debug_dir:
+            return
+        folder = os.path.join(self.debug_dir, kind)
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, name), "w", encoding="utf-8") as f:
+            if isinstance(content, str):
+                f.write(content)
+            else:
+                json.dump(content, f, indent=2, ensure_ascii=False)
+
+    # ---- stages
+    def _run_stage(self, fn, *args):
+        try:
+            fn(*args)
+        except BaseException as e:
+            self.errors.append(e)
+            self._failed.set()
+
+    def _put(self, q: "queue.Queue", item):
+        # never block forever on a full queue whose consumer has died
+        while True:
+            if self._failed.is_set() and item is not _DONE:
+                raise RuntimeError("pipeline aborted: a downstream stage failed")
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if self._failed.is_set():
+                    return
+
+    def _extract(self, out_q: "queue.Queue"):
+        pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        known = self.previous.pdfs if self.previous else None
+        try:
+            pages = iter_pages(pdf_sources(), pool, self.workers, known, self.manifest.pdfs)
+            while True:
+                start = time.perf_counter()
+                item = next(pages, None)
+                if item is None:
+                    break
+                if item[1] is not None:
+                    self.stats["extract"].add(1, time.perf_counter() - start)
+                    self._dump("extracted", item[0].replace("_cleaned", ""), item[1])
+                self._put(out_q, item)
+        finally:
+            self._put(out_q, _DONE)
+            if pool is not None:
+                pool.shutdown()
+
+    def _previous_page(self, file_name: str) -> Optional[Dict]:
+        return self.previous.pages.get(file_name) if self.previous else None
+
+    def _clean_and_chunk(self, in_q: "queue.Queue", out_q: "queue.Queue"):
+        cleaner = LegalTextCleaner()
+        try:
+            while (item := in_q.get()) is not _DONE:
+                file_name, raw = item
+                entry = self._previous_page(file_name)
+                raw_hash = entry["raw"] if raw is None else text_hash(raw)
+
+                if entry and entry["raw"] == raw_hash:
+                    # page text unchanged: reuse its chunks without cleaning or chunking
+                    cleaned_hash = entry["cleaned"]
+                    page_chunks = [dict(self.previous_chunks[cid]) for cid in entry["chunks"]]
+                    self.pages_reused += 1
+                else:
+                    start = time.perf_counter()
+                    text = cleaner.clean_text(raw)
+                    self.stats["clean"].add(1, time.perf_counter() - start)
+                    self._dump("cleaned", file_name, text)
+                    cleaned_hash = text_hash(text)
+
+                    if entry and entry["cleaned"] == cleaned_hash:
+                        page_chunks = [dict(self.previous_chunks[cid]) for cid in entry["chunks"]]
+                        self.pages_reused += 1
+                    else:
+                        law = detect_law(file_name)
+                        start = time.perf_counter()
+                        page_chunks = [c for c in chunk_page(text, law, file_name) if c["text"].strip()] if law else []
+                        self.stats["chunk"].add(len(page_chunks), time.perf_counter() - start)
+                        self._dump("chunks", file_name.replace(".txt", ".json"), page_chunks)
+                        self.pages_rechunked += 1
+
+                self.manifest.record_page(file_name, raw_hash, cleaned_hash, page_chunks)
+                for ch in page_chunks:
+                    self._put(out_q, ch)
+        finally:
+            self._put(out_q, _DONE)
+
+    def _embed(self, in_q: "queue.Queue", chunks: List[Dict], vectors: Dict[int, List[float]]):
+        batch: List[Dict] = []
+
+        def flush():
+            if not batch:
+                return
+            if self.build_index:
+                start = time.perf_counter()
+                embedded = self._embedder().embed_documents([c["text"] for c in batch])
+                vectors.update(zip((c["chunk_id"] for c in batch), embedded))
+                self.stats["embed"].add(len(batch), time.perf_counter() - start)
+            batch.clear()
+
+        while (item := in_q.get()) is not _DONE:
+            chunks.append(item)
+            # chunks already in the previous index keep their stored vectors
+            if item["chunk_id"] in self.previous_chunks:
+                continue
+            batch.append(item)
+            if len(batch) >= self.embed_batch:
+                flush()
+        flush()
+
+    def _embedder(self):
+        if self._embedder_instance is None:
+            from langchain_huggingface import HuggingFaceEmbeddings
+
+            self._embedder_instance = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
+        return self._embedder_instance
+
+    # ---- outputs
+    def _write_chunks(self, chunks: List[Dict]):
+        "Same layout run_chunking writes; the API still loads its chunk table from here."
+        for law in ("IPC", "CRPC"):
+            folder = os.path.join(self.chunks_dir, law.lower())
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, f"{law.lower()}_chunks.json"), "w", encoding="utf-8") as f:
+                json.dump([c for c in chunks if c["law"] == law], f, indent=2, ensure_ascii=False)
+
+    def _write_indexes(self, chunks: List[Dict], vectors: Dict[int, List[float]], index_type: Optional[str] = None):
+        from src.embeddings.embedder import save_index_artifacts, save_sharded_artifacts, vector_store_from_vectors
+
+        matrix = [vectors[c["chunk_id"]] for c in chunks]
+        if INDEX_LAYOUT == "sharded":
+            save_sharded_artifacts(chunks, matrix, self._embedder(), self.vector_store_path, index_type)
+            return
+        vector_db = vector_store_from_vectors(chunks, matrix, self._embedder(), index_type)
+        save_index_artifacts(vector_db, chunks, self.vector_store_path, index_type)
+
+    def _fill_from_store(self, vector_db, kind: str, chunks: List[Dict], vectors: Dict[int, List[float]]):
+        "Vectors for every chunk: reuse the stored ones where they are exact, re-embed the rest."
+        from src.retrieval.faiss_index import reconstruct_all
+
+        stored = reconstruct_all(vector_db.index, kind)
+        if stored is not None:
+            for pos, ds_id in vector_db.index_to_docstore_id.items():
+                doc = vector_db.docstore.search(ds_id)
+                if not isinstance(doc, str):
+                    vectors.setdefault(doc.metadata.get("chunk_id"), stored[pos])
+        missing = [c for c in chunks if c["chunk_id"] not in vectors]
+        if missing:
+            embedded = self._embedder().embed_documents([c["text"] for c in missing])
+            vectors.update(zip((c["chunk_id"] for c in missing), embedded))
+
+    def _update_store(
+        self,
+        store_dir: str,
+        chunks: List[Dict],
+        vectors: Dict[int, List[float]],
+        added: List[Dict],
+        removed: List[int],
+        new_index_type: Optional[str] = None,
+    ):
+        "Apply added/removed chunks to one store (the combined index or one law's shard)."
+        from src.embeddings.embedder import chunks_to_documents, save_store, vector_store_from_vectors
+        from src.retrieval.bm25 import SparseBM25, bm25_path, tokenize
+        from src.retrieval.engine import build_bm25, load_vector_store
+        from src.retrieval.faiss_index import REMOVE_SUPPORTED, load_index_meta, save_index_meta, save_vector_store
+
+        if not os.path.exists(os.path.join(store_dir, f"{INDEX_NAME}.faiss")):
+            # a statute without a shard yet: every chunk of it is new
+            print(f"new shard {store_dir}")
+            vector_db = vector_store_from_vectors(chunks, [vectors[c["chunk_id"]] for c in chunks], self._embedder(), new_index_type)
+            save_store(vector_db, chunks, store_dir, new_index_type)
+            return
+
+        vector_db = load_vector_store(self._embedder(), store_dir, INDEX_NAME)
+        kind = load_index_meta(store_dir)["type"]
+        if removed and kind not in REMOVE_SUPPORTED:
+            print(f"{kind} index cannot delete vectors: rebuilding {store_dir}")
+            self._fill_from_store(vector_db, kind, chunks, vectors)
+            vector_db = vector_store_from_vectors(chunks, [vectors[c["chunk_id"]] for c in chunks], self._embedder(), kind)
+            save_store(vector_db, chunks, store_dir, kind)
+            return
+
+        if removed:
+            # older stores use random docstore ids; map them through the chunk_id metadata
+            docstore_ids = {}
+            for ds_id in vector_db.index_to_docstore_id.values():
+                doc = vector_db.docstore.search(ds_id)
+                if not isinstance(doc, str):
+                    docstore_ids[doc.metadata.get("chunk_id")] = ds_id
+            vector_db.delete([docstore_ids[cid] for cid in removed if cid in docstore_ids])
+        if added:
+            docs = chunks_to_documents(added)
+            vector_db.add_embeddings(
+                text_embeddings=[(d.page_content, vectors[c["chunk_id"]]) for d, c in zip(docs, added)],
+                metadatas=[d.metadata for d in docs],
+                ids=[str(c["chunk_id"]) for c in added],
+            )
+        save_vector_store(vector_db, store_dir, INDEX_NAME)
+        save_index_meta(kind, vector_db.index, store_dir)
+
+        bm25 = SparseBM25.load(bm25_path(store_dir))
+        try:
+            bm25 = bm25.update([tokenize(c["text"]) for c in added], [c["chunk_id"] for c in added], removed)
+        except ValueError:
+            bm25 = build_bm25(chunks)
+        bm25.save(bm25_path(store_dir))
+
+    def _apply_changes(self, chunks: List[Dict], vectors: Dict[int, List[float]]) -> Tuple[int, int]:
+        "Apply added/removed chunks to the existing stores; with per-law shards only the changed laws are touched."
+        import shutil
+
+        from src.embeddings.embedder import save_lookup_artifacts
+        from src.retrieval.faiss_index import load_index_meta
+        from src.retrieval.shards import save_shard_layout, shard_dir, store_dirs
+
+        new_ids = {c["chunk_id"] for c in chunks}
+        added = [c for c in chunks if c["chunk_id"] not in self.previous_chunks]
+        removed = [cid for cid in self.previous_chunks if cid not in new_ids]
+        if not added and not removed:
+            return 0, 0
+
+        stores = store_dirs(self.vector_store_path)
+        if None in stores:
+            self._update_store(self.vector_store_path, chunks, vectors, added, removed)
+        else:
+            laws = {c["law"] for c in chunks}
+            kind = load_index_meta(self.vector_store_path)["type"]
+            for law in sorted(laws | set(stores)):
+                law_added = [c for c in added if c["law"] == law]
+                law_removed = [cid for cid in removed if self.previous_chunks[cid]["law"] == law]
+                if law not in laws:
+                    # the statute is gone entirely
+                    shutil.rmtree(shard_dir(self.vector_store_path, law), ignore_errors=True)
+                elif law_added or law_removed:
+                    law_chunks = [c for c in chunks if c["law"] == law]
+                    self._update_store(shard_dir(self.vector_store_path, law), law_chunks, vectors, law_added, law_removed, kind)
+            save_shard_layout(laws, kind, self.vector_store_path)
+
+        save_lookup_artifacts(chunks, self.vector_store_path)
+        return len(added), len(removed)
+
+    def run(self) -> List[Dict]:
+        if self.incremental and self.build_index:
+            self._load_previous()
+
+        pages_q: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        chunks_q: "queue.Queue" = queue.Queue(maxsize=self.queue_size * 4)
+        chunks: List[Dict] = []
+        vectors: Dict[int, List[float]] = {}
+
+        start = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._run_stage, args=(self._extract, pages_q), name="extract"),
+            threading.Thread(target=self._run_stage, args=(self._clean_and_chunk, pages_q, chunks_q), name="clean"),
+            threading.Thread(target=self._run_stage, args=(self._embed, chunks_q, chunks, vectors), name="embed"),
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if self.errors:
+            raise self.errors[0]
+
+        self._write_chunks(chunks)
+        if self.build_index:
+            if self.previous is not None:
+                added, removed = self._apply_changes(chunks, vectors)
+                print(f"Index updated: +{added} / -{removed} chunks, {len(chunks) - added} reused")
+            else:
+                self._write_indexes(chunks, vectors)
+            self.manifest.save(manifest_path(self.vector_store_path))
+        wall = time.perf_counter() - start
+
+        print(f"\n{len(chunks)} chunks in {wall:.2f}s ({self.pages_reused} pages reused, {self.pages_rechunked} re-chunked)")
+        for stats in self.stats.values():
+            print(stats.report(wall))
+        return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=1, help="processes for PDF page extraction")
+    parser.add_argument("--queue-size", type=int, default=64, help="max pages buffered between stages")
+    parser.add_argument("--embed-batch", type=int, default=64, help="chunks per embed_documents call")
+    parser.add_argument("--debug-dir", default=None, help="also dump extracted/cleaned pages and per-page chunks here")
+    parser.add_argument("--no-index", action="store_true", help="stop after writing chunks (no embeddings / indexes)")
+    parser.add_argument("--incremental", action="store_true", help="reuse the previous build: only re-chunk changed pages and embed new chunks")
+    args = parser.parse_args()
+
+    Pipeline(
+        workers=args.workers,
+        queue_size=args.queue_size,
+        embed_batch=args.embed_batch,
+        debug_dir=args.debug_dir,
+        build_index=not args.no_index,
+        incremental=args.incremental,
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
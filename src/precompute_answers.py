@@ -0,0 +1,120 @@
+"""
+Offline batch job: precompute the LLM explanation of every statute section.
+
+Walks the (law, section) set of the section index (built from the chunk
+files), builds the prompt generate_answer uses for "Explain <law> Section <s>"
+and writes the cleaned answer to the section answer store
+(src/section_answers.py), with at most --concurrency LLM calls in flight.
+Each answer is written as soon as it arrives, and sections whose stored
+answer came from the same prompt are skipped: an interrupted run resumes
+where it stopped, and a run after an index rebuild only regenerates the
+sections whose text changed. /query serves these answers for section lookups.
+
+  python -m src.precompute_answers --concurrency 8
+  python -m src.precompute_answers --law IPC --limit 50
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from src.config import LLM_BATCH_CONCURRENCY, SECTION_ANSWERS_PATH
+from src.llm import get_gateway
+from src.rag_service import PROMPT_VERSION, clean_text, prepare_answer
+from src.retrieval.engine import RetrievalEngine, index_fingerprint, load_chunks, load_sections
+from src.retrieval.retriever import direct_section_lookup
+from src.section_answers import SectionAnswerStore, prompt_hash, section_question
+
+
+def load_section_engine() -> RetrievalEngine:
+    "Only what direct_section_lookup reads (chunk table + section index): no model, FAISS or BM25."
+    engine = RetrievalEngine()
+    engine.chunks = load_chunks(engine.chunks_dir, engine.vector_store_path)
+    engine.section_index = load_sections(engine.chunks, engine.vector_store_path)
+    engine.index_version = index_fingerprint(engine.vector_store_path, engine.index_name, engine.chunks_dir)
+    return engine
+
+
+def pending_sections(
+    engine: RetrievalEngine,
+    store: SectionAnswerStore,
+    laws: Optional[List[str]] = None,
+    force: bool = False,
+) -> Tuple[List[Tuple[str, str, str, List[Dict]]], Dict[str, int]]:
+    "(law, section, prompt, citations) still to generate, and counts of the sections left out."
+    counts = {"fresh": 0, "no_prompt": 0}
+    todo = []
+    for law in sorted(laws or engine.section_index):
+        for section in engine.section_index.get(law, {}):
+            docs = direct_section_lookup(engine, law, section)
+            response, prompt, citations = prepare_answer(section_question(law, section), docs)
+            if response is not None:
+                # answered without the LLM at serve time too (e.g. no chunk carries this section)
+                counts["no_prompt"] += 1
+            elif not force and store.is_fresh(law, section, PROMPT_VERSION, prompt_hash(prompt)):
+                counts["fresh"] += 1
+            else:
+                todo.append((law, section, prompt, citations))
+    return todo, counts
+
+
+async def precompute(
+    engine: RetrievalEngine,
+    store: SectionAnswerStore,
+    todo: List[Tuple[str, str, str, List[Dict]]],
+    concurrency: int = LLM_BATCH_CONCURRENCY,
+) -> Dict[str, int]:
+    semaphore = asyncio.Semaphore(concurrency)
+    counts = {"generated": 0, "failed": 0}
+
+    async def generate(law, section, prompt, citations):
+        async with semaphore:
+            try:
+                response = await get_gateway().ainvoke(prompt)
+            except Exception as e:
+                counts["failed"] += 1
+                print(f"{law} {section}: {e}")
+                return
+        answer = {"answer": clean_text(response.content), "citations": citations}
+        await asyncio.to_thread(
+            store.put, law, section, PROMPT_VERSION, prompt_hash(prompt), answer, engine.index_version
+        )
+        counts["generated"] += 1
+        done = counts["generated"] + counts["failed"]
+        if done % 50 == 0:
+            print(f"{done}/{len(todo)}")
+
+    await asyncio.gather(*(generate(*item) for item in todo))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--law", action="append", choices=["IPC", "CRPC"], help="only this law (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=LLM_BATCH_CONCURRENCY, help="max LLM calls in flight")
+    parser.add_argument("--limit", type=int, default=0, help="generate at most this many sections (0 = all)")
+    parser.add_argument("--force", action="store_true", help="regenerate sections that already have a current answer")
+    parser.add_argument("--path", default=SECTION_ANSWERS_PATH, help="answer store (SQLite file)")
+    args = parser.parse_args()
+    if not args.path:
+        raise SystemExit("SECTION_ANSWERS_PATH is empty: nowhere to store the answers.")
+
+    start = time.perf_counter()
+    engine = load_section_engine()
+    store = SectionAnswerStore(args.path)
+    todo, skipped = pending_sections(engine, store, args.law, args.force)
+    if args.limit:
+        todo = todo[:args.limit]
+    print(f"{len(todo)} sections to generate, {skipped['fresh']} up to date, "
+          f"{skipped['no_prompt']} answered without the LLM (index {engine.index_version}, prompt {PROMPT_VERSION})")
+
+    counts = asyncio.run(precompute(engine, store, todo, args.concurrency))
+    print(f"{counts['generated']} generated, {counts['failed']} failed in {time.perf_counter() - start:.1f}s; "
+          f"{len(store)} answers in {args.path}")
+    if counts["failed"]:
+        # rerun to retry: finished sections are skipped
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import os
 import re
 import json
+import hashlib
+from collections import Counter
 from typing import Dict,Any,List
 
 
@@ -39,34 +41,63 @@ def is_section_index_page(text:str) ->bool:
     if re.match(r"\d+[A-Z]?(?:\(\d+\))?\.\s+[A-Za-z]", l)
   ]
   return len(section_lines) >=5 and len(text) <2500
+# Spacing normalization. Only runs that actually change are matched (a lone " "
+# is left alone), and "\n\n\n+" lets re use its literal-prefix fast path.
+_SPACE_RUNS = re.compile(r" [ \t]+|\t[ \t]*")
+_BLANK_LINES = re.compile(r"\n\n\n+")
+
+# Remove amendment footnotes like:
+# "1. Subs. by Act 25 of 2005..."
+_FOOTNOTE = re.compile(
+    r"^\s*\d+\.\s+(Subs\.|Ins\.|Amended|Omitted|Added).*?$",
+    re.MULTILINE | re.IGNORECASE
+)
+
+# LEGAL DELIMITER (IPC + CRPC safe). A header starts on its own line; the
+# title runs to the end of the (first non-blank) line after "NNN."
+_SECTION_HEADER = re.compile(
+    r"^[^\S\n]*(\d+[A-Z]*(?:\(\d+\))?)\.\s*(.*?)\n",
+    re.MULTILINE | re.DOTALL
+)
+# where a body stops: the next line that starts like a section number
+_SECTION_BOUNDARY = re.compile(r"^[^\S\n]*\d+[A-Z]*(?:\(\d+\))?\.", re.MULTILINE)
+
+
+def normalize_section_text(text: str) -> str:
+    text = _SPACE_RUNS.sub(" ", text)
+    text = _BLANK_LINES.sub("\n\n", text)
+    return _FOOTNOTE.sub("", text)
+
+
+def split_sections(text: str):
+    """
+    Yield (section_no, title, body) in one forward scan: find a header, then
+    the next boundary, and slice the body between them. Bodies come back
+    unstripped; surrounding whitespace is the only difference from a
+    lookahead-delimited regex match.
+    """
+    pos = 0
+    while True:
+        header = _SECTION_HEADER.search(text, pos)
+        if header is None:
+            return
+        boundary = _SECTION_BOUNDARY.search(text, header.end())
+        end = boundary.start() if boundary else len(text)
+        yield header.group(1), header.group(2), text[header.end():end]
+        pos = end
+
+
 #Extract sections 
 def  extract_sections(text:str, law:str) ->List[Dict]:
     sections = []
     
-    #Normalize spacing 
-    text = re.sub(r"[ \t]+", " ", text)
-    text = re.sub(r"\n{3,}", "\n\n", text)
-    
-    # Remove amendment footnotes like:
-    # "1. Subs. by Act 25 of 2005..."
-    text = re.sub(
-        r"^\s*\d+\.\s+(Subs\.|Ins\.|Amended|Omitted|Added).*?$",
-        "",
-        text,
-        flags=re.MULTILINE | re.IGNORECASE
-    )
-     # LEGAL DELIMITER REGEX (IPC + CRPC safe)
-    pattern = re.compile(
-        r"^\s*(\d+[A-Z]*(?:\(\d+\))?)\.\s*(.*?)\n"   # section header line
-        r"(.*?)(?=^\s*\d+[A-Z]*(?:\(\d+\))?\.|\Z)",  # stop at NEXT section
-        re.MULTILINE |re.DOTALL
-    )
-    matches = list(pattern.finditer(text))
-
-    for m in matches:
-        section_no = m.group(1).strip()
-        title = m.group(2).strip()
-        body = m.group(3).strip()
+    #Normalize spacing, drop amendment footnotes
+    text = normalize_section_text(text)
+
+    for section_no, title, body in split_sections(text):
+        section_no = section_no.strip()
+        title = title.strip()
+        body = body.strip()
 
         # Filter broken fragments
         if len(body) < 40:
@@ -126,10 +157,40 @@ def chunk_section(section: Dict, law: str, source_file: str) -> List[Dict]:
 
  
 
+def stable_chunk_id(chunk: Dict, occurrence: int = 0) -> int:
+    """
+    Content-derived chunk id: the same law/page/section/text always gets the
+    same id, so ids do not shift when something upstream changes.
+    52 bits, so it survives JSON clients that use doubles.
+    """
+    key = f"{chunk['law']}|{chunk['source_file']}|{chunk['section']}|{occurrence}|{chunk['text']}"
+    return int(hashlib.sha1(key.encode("utf-8")).hexdigest()[:13], 16)
+
+
+def assign_chunk_ids(page_chunks: List[Dict]) -> List[Dict]:
+    "Give one page's chunks stable ids; repeated identical chunks on a page stay distinct."
+    seen = Counter()
+    for ch in page_chunks:
+        key = (ch["section"], ch["text"])
+        ch["chunk_id"] = stable_chunk_id(ch, seen[key])
+        seen[key] += 1
+    return page_chunks
+
+
+def chunk_page(text: str, law: str, source_file: str) -> List[Dict]:
+    "All chunks of one cleaned page, with stable ids ([] for TOC / index pages)."
+    if is_structural_page(text) or is_section_index_page(text):
+        return []
+
+    page_chunks = []
+    for sec in extract_sections(text, law):
+        page_chunks.extend(chunk_section(sec, law, source_file))
+    return assign_chunk_ids(page_chunks)
+
+
 def run_chunking():
     os.makedirs(OUTPUT_CHUNKS_DIR, exist_ok=True)
     ipc_chunks, crpc_chunks = [], []
-    chunk_id = 0
 
     for file in sorted(os.listdir(CLEANED_DIR)):
         if not file.endswith(".txt"):
@@ -143,22 +204,11 @@ def run_chunking():
         with open(path, "r", encoding="utf-8") as f:
             text = f.read()
 
-        # Skip TOC / index pages
-        if is_structural_page(text) or is_section_index_page(text):
-            continue
-
-        sections = extract_sections(text,law)
-
-        for sec in sections:
-            sec_chunks = chunk_section(sec, law, file)
-            for ch in sec_chunks:
-                ch["chunk_id"] = chunk_id
-                chunk_id += 1
-
-                if law == "IPC":
-                    ipc_chunks.append(ch)
-                else:
-                    crpc_chunks.append(ch)
+        for ch in chunk_page(text, law, file):
+            if law == "IPC":
+                ipc_chunks.append(ch)
+            else:
+                crpc_chunks.append(ch)
 
     # Write output
     os.makedirs(os.path.join(OUTPUT_CHUNKS_DIR, "ipc"), exist_ok=True)
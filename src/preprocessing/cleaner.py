@@ -1,6 +1,24 @@
 import re
 import os
-from typing import List
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+#Compiled once at import and shared by every cleaner instance / worker process
+PAGE_NUMBER_PATTERN = re.compile(r"\bPage\s+\d+\b",re.IGNORECASE)
+# (a lazy ".*?" at the end of the IPC alternative always matches empty, so it is left out)
+HEADER_FOOTER_PATTERN = re.compile(r"(THE\s+INDIAN\s+PENAL\s+CODE|CODE\s+OF\s+CRIMINAL\s+PROCEDURE.*?1973)",
+        re.IGNORECASE)
+ARRANGEMENT_PATTERN = re.compile(r"ARRANGEMENT\s+OF\s+SECTIONS.*?(?=\n\s*\d+\.)",
+        re.IGNORECASE | re.DOTALL)
+#Page number + section number collision at a line start: '58 217. Public...' -> '217. Public...'
+SECTION_COLLISION_PATTERN = re.compile(r"(?:^|\n)\s*\d+\s+(\d+[A-Z]*(?:\(\d+\))?)\.")
+#Every section starts on a new line: 'text 217. Public...' -> 'text\n217. Public...'
+# (folding both into one alternation was measured slower than two passes)
+SECTION_START_PATTERN = re.compile(r"\s+(\d+[A-Z]*(?:\(\d+\))?)\.")
+MULTIPLE_SPACES = re.compile(r"[ \t]{2,}")
+MULTIPLE_NEWLINES = re.compile(r"\n\n\n+")
+
 
 class LegalTextCleaner:
   """
@@ -12,13 +30,13 @@ class LegalTextCleaner:
   
   def __init__(self):
     #common and unwanted pattern in legal pdfs
-    self.page_number_pattern = re.compile(r"\bPage\s+\d+\b",re.IGNORECASE)
-    self.header_footer_pattern = re.compile( r"(THE\s+INDIAN\s+PENAL\s+CODE.*?|CODE\s+OF\s+CRIMINAL\s+PROCEDURE.*?1973)",
-            re.IGNORECASE)
-    self.arrangement_pattern = re.compile(r"ARRANGEMENT\s+OF\s+SECTIONS.*?(?=\n\s*\d+\.)",
-            re.IGNORECASE | re.DOTALL)
-    self.multiple_spaces = re.compile(r"[ \t]{2,}")
-    self.multiple_newlines = re.compile(r"\n{3,}")
+    self.page_number_pattern = PAGE_NUMBER_PATTERN
+    self.header_footer_pattern = HEADER_FOOTER_PATTERN
+    self.arrangement_pattern = ARRANGEMENT_PATTERN
+    self.section_collision_pattern = SECTION_COLLISION_PATTERN
+    self.section_start_pattern = SECTION_START_PATTERN
+    self.multiple_spaces = MULTIPLE_SPACES
+    self.multiple_newlines = MULTIPLE_NEWLINES
     
   
   def clean_text(self, text:str) -> str:
@@ -36,18 +54,20 @@ class LegalTextCleaner:
     return text.strip()
   
   def _remove_headers_and_toc(self,text:str) -> str:
+    # the keyword checks skip a whole regex scan on most pages (both patterns need the word)
+    lower = text.lower()
     #Remove the headers like IPC/Crpc titles
-    text =self.header_footer_pattern.sub("",text)
+    if "code" in lower:
+      text, removed = self.header_footer_pattern.subn("",text)
+      if removed:
+        lower = text.lower()
     #Remove arrangement of sections
-    text = re.sub(
-              r"ARRANGEMENT\s+OF\s+SECTIONS.*?(?=\n\s*\d+\.)",
-        "",
-        text,
-        flags=re.IGNORECASE | re.DOTALL
-
-    )
+    if "arrangement" in lower:
+      text = self.arrangement_pattern.sub("",text)
     return text
   def _remove_page_numbers(self,text:str)-> str:
+    if "page" not in text.lower():
+      return text
     return self.page_number_pattern.sub("",text)
   
   def _remove_headers_and_footers(self,text:str)->str:
@@ -58,23 +78,10 @@ class LegalTextCleaner:
         Fix OCR issues like:
         '58 217. Public servant disobeying...'
         → '217. Public servant disobeying...'
+        and ensure every section starts on a new line.
         """
-
-        # Remove page-number + section-number collision
-        text = re.sub(
-            r"(?:^|\n)\s*\d+\s+(\d+[A-Z]*(?:\(\d+\))?)\.",
-            r"\n\1.",
-            text
-        )
-
-        # Ensure every section starts on a new line
-        text = re.sub(
-            r"\s+(\d+[A-Z]*(?:\(\d+\))?)\.",
-            r"\n\1.",
-
-            text
-        )
-        return text
+        text = self.section_collision_pattern.sub(r"\n\1.", text)
+        return self.section_start_pattern.sub(r"\n\1.", text)
   def _normalize_whitespace(self,text:str)->str:
     text = self.multiple_spaces.sub(" ", text)
     text = self.multiple_newlines.sub("\n\n",text)
@@ -82,6 +89,52 @@ class LegalTextCleaner:
   
   
 
+_worker_cleaner: Optional[LegalTextCleaner] = None
+
+
+def _clean_path(path: str) -> str:
+  "Runs in a worker process: one cleaner per process, reused for every file."
+  global _worker_cleaner
+  if _worker_cleaner is None:
+    _worker_cleaner = LegalTextCleaner()
+  with open(path,"r", encoding="utf-8") as f:
+    return _worker_cleaner.clean_text(f.read())
+
+
+def _clean_to_file(paths: Tuple[str, str]) -> str:
+  input_path, output_path = paths
+  with open(output_path,"w", encoding="utf-8") as f:
+    f.write(_clean_path(input_path))
+  return output_path
+
+
+def _chunksize(n: int, workers: int) -> int:
+  # pages are small: hand each worker a few big batches instead of one file at a time
+  return max(1, n // (workers * 4))
+
+
+def clean_many(paths: List[str], workers: int = 1) -> List[str]:
+  "Cleaned text of every file, in input order; workers > 1 cleans across a process pool."
+  if workers <= 1:
+    return [_clean_path(p) for p in paths]
+  with ProcessPoolExecutor(max_workers=workers) as pool:
+    return list(pool.map(_clean_path, paths, chunksize=_chunksize(len(paths), workers)))
+
+
+def clean_dir(input_dir: str, output_dir: str, workers: int = 1) -> List[str]:
+  "Clean every .txt in input_dir into output_dir/<name>_cleaned.txt; returns the files written."
+  os.makedirs(output_dir, exist_ok=True)
+  jobs = [
+    (os.path.join(input_dir, name), os.path.join(output_dir, name.replace(".txt","_cleaned.txt")))
+    for name in sorted(os.listdir(input_dir))
+    if name.endswith(".txt")
+  ]
+  if workers <= 1:
+    return [_clean_to_file(job) for job in jobs]
+  with ProcessPoolExecutor(max_workers=workers) as pool:
+    return list(pool.map(_clean_to_file, jobs, chunksize=_chunksize(len(jobs), workers)))
+
+
 def clean_file(input_path: str, output_path:str):
   cleaner = LegalTextCleaner()
   
@@ -99,19 +152,12 @@ def clean_file(input_path: str, output_path:str):
   
 
 if __name__ == "__main__":
-  input_dir = os.path.join("data","extracted")
-  output_dir = os.path.join("data","cleaned_text")
+  parser = argparse.ArgumentParser(description="Clean data/extracted pages into data/cleaned_text")
+  parser.add_argument("--input-dir", default=os.path.join("data","extracted"))
+  parser.add_argument("--output-dir", default=os.path.join("data","cleaned_text"))
+  parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes (1 = serial)")
+  args = parser.parse_args()
   
-  os.makedirs(output_dir, exist_ok=True)
-  
-  for file_name in os.listdir(input_dir):
-    if file_name.endswith(".txt"):
-      input_path = os.path.join(input_dir, file_name)
-      output_path = os.path.join(output_dir, file_name.replace(".txt","_cleaned.txt"))
-      clean_file(input_path, output_path)
+  written = clean_dir(args.input_dir, args.output_dir, workers=args.workers)
       
-  print("All extracted files cleaned successfully")
-  
-    
-
-
+  print(f"All extracted files cleaned successfully ({len(written)} files)")
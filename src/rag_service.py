@@ -1,19 +1,28 @@
 import re
-from typing import Dict, Any, List
+import asyncio
+import hashlib
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
 
-from langchain_groq import ChatGroq
-from dotenv import load_dotenv
-import os
-
-from src.retrieval.retriever import hybrid_retrieve
+from src.answer_cache import AnswerCache, SQLiteAnswerStore, make_key
+from src.config import ANSWER_CACHE_PATH, LLM_BATCH_CONCURRENCY, LLM_MODEL, SECTION_ANSWERS_PATH, SECTION_FAST_PATH
+from src.llm import get_gateway
+from src.retrieval.context import group_by_section, pack_context
+from src.retrieval.engine import RetrievalEngine, get_engine
+from src.retrieval.retriever import (
+  hybrid_retrieve,
+  ahybrid_retrieve,
+  batch_hybrid_retrieve,
+  direct_section_lookup,
+  parse_law_and_section,
+)
+from src.retrieval.section_index import lookup_section
+from src.section_answers import SectionAnswerStore, prompt_hash, section_question
+from src.telemetry import span
 
-load_dotenv()
+# Bump when the prompt layout in prepare_answer changes so cached answers are not reused
+PROMPT_TEMPLATE_VERSION = "3"
 
-llm = ChatGroq(
-    model_name="llama-3.1-8b-instant",
-    groq_api_key=os.getenv("GROQ_API_KEY"),
-    temperature=0.0
-)
 
 SYSTEM_PROMPT = """
 You are a legal information retrieval assistant.
@@ -26,16 +35,176 @@ STRICT RULES:
    "Answer not found in the provided legal documents."
 """
 
+PROMPT_VERSION = hashlib.sha256(
+    f"{LLM_MODEL}|{PROMPT_TEMPLATE_VERSION}|{SYSTEM_PROMPT}".encode("utf-8")
+).hexdigest()[:12]
+
+
+@lru_cache(maxsize=None)
+def get_answer_cache() -> AnswerCache:
+    "Process-wide answer cache; the SQLite tier is skipped when ANSWER_CACHE_PATH is empty."
+    disk = SQLiteAnswerStore(ANSWER_CACHE_PATH) if ANSWER_CACHE_PATH else None
+    return AnswerCache(disk=disk)
+
+
+def answer_cache_key(query: str, citations: List[Dict], engine: RetrievalEngine) -> str:
+    chunk_keys = [(c.get("source_file"), c.get("chunk_id")) for c in citations]
+    return make_key(query, chunk_keys, f"{PROMPT_VERSION}:{engine.index_version}")
+
+
+def cached_answer(key: str, use_cache: bool) -> Optional[Dict[str, Any]]:
+    cache = get_answer_cache()
+    if not use_cache:
+        # bypass skips the lookup only; the fresh answer still refreshes the cache
+        cache.record_bypass()
+        return None
+    return cache.get(key)
+
+
+@lru_cache(maxsize=None)
+def get_section_answers() -> Optional[SectionAnswerStore]:
+    "Read-only view of the precomputed section answers; None when SECTION_ANSWERS_PATH is empty."
+    return SectionAnswerStore(SECTION_ANSWERS_PATH, readonly=True) if SECTION_ANSWERS_PATH else None
+
+
 def extract_section_from_query(query: str):
-    import re
-    match = re.search(r"section\s*(\d+[A-Z]*)", query.lower())
+    # case-insensitive so "section 120b" keeps its letter
+    match = re.search(r"section\s*(\d+[A-Z]*)", query, re.IGNORECASE)
     return match.group(1).upper() if match else None
 
 
+def doc_citation(doc) -> Dict[str, Any]:
+    return {
+        "law": doc.metadata.get("law"),
+        "section": doc.metadata.get("section"),
+        "section_title": doc.metadata.get("section_title"),
+        "source_file": doc.metadata.get("source_file"),
+        "chunk_id": doc.metadata.get("chunk_id")
+    }
+
+
+_SECTION_NUMBER = re.compile(r"\d+[A-Z]*(?:\(\d+\))?")
+
+
+def section_target(query: str, engine: RetrievalEngine) -> Optional[list]:
+    """
+    Chunks of the one section a query targets ("IPC 302", "explain CrPC section 41"),
+    in order, straight from the section index. None when the query does not name
+    exactly one section that exists.
+    """
+    if len(set(_SECTION_NUMBER.findall(query.upper()))) > 1:
+        # "difference between 302 and 304": several sections are a question for the LLM
+        return None
+    # only a number marked as a section counts: "IPC theft of 500 rupees" is a topical question
+    law, section = parse_law_and_section(query)
+    if not section:
+        return None
+
+    # unknown section, or it exists under the other law: the normal path explains that
+    return direct_section_lookup(engine, law, section) or None
+
+
+def section_law_mismatch(query: str, engine: RetrievalEngine) -> Optional[str]:
+    """
+    The other law, when the query names a law and a section that only exists
+    under the other one ("CrPC Section 27"). Checked on the section index
+    before retrieval: with a sharded index a law-scoped query only searches
+    that law's shard, so the retrieved docs never show the other law.
+    Only a number marked as a section counts (parse_law_and_section).
+    """
+    law, section = parse_law_and_section(query)
+    if law is None:
+        return None
+    if not section or lookup_section(engine.section_index, law, section):
+        return None
+    others = [name for name in sorted(engine.section_index) if name != law and lookup_section(engine.section_index, name, section)]
+    return others[0] if others else None
+
+
+def verbatim_section_answer(query: str, engine: RetrievalEngine) -> Optional[Dict[str, Any]]:
+    """
+    Zero-LLM answer for exact section lookups: the section's statute text.
+    None if the fast path is off, or when the query names no law and the
+    section exists in both ("section 302"): that is left to the normal path.
+    """
+    if not SECTION_FAST_PATH:
+        return None
+    docs = section_target(query, engine)
+    if docs is None or len({d.metadata.get("law") for d in docs}) > 1:
+        return None
+    texts = dict.fromkeys(doc.page_content.strip() for doc in docs)
+    return {
+        "answer": "\n\n".join(texts),
+        "citations": [doc_citation(doc) for doc in docs],
+        "verbatim": True,
+    }
+
+
+def precomputed_section_answer(query: str, engine: RetrievalEngine) -> Optional[Dict[str, Any]]:
+    """
+    The batch job's explanation of the section a query targets (src/precompute_answers.py).
+    Served only if it was generated from the prompt this index would give now;
+    None otherwise, or when the query matches sections of both laws.
+    """
+    store = get_section_answers()
+    if store is None:
+        return None
+    docs = section_target(query, engine)
+    if docs is None:
+        return None
+    keys = {(d.metadata.get("law"), (d.metadata.get("section") or "").upper()) for d in docs}
+    if len(keys) != 1:
+        return None
+    law, section = keys.pop()
+    _, prompt, _ = prepare_answer(section_question(law, section), docs)
+    answer = store.get(law, section, PROMPT_VERSION, prompt_hash(prompt)) if prompt else None
+    return dict(answer, precomputed=True) if answer is not None else None
+
+
+def instant_answer(
+    query: str,
+    engine: RetrievalEngine,
+    use_cache: bool = True,
+    enrich: bool = False,
+) -> Optional[Dict[str, Any]]:
+    """
+    Answers for section lookups that need neither retrieval nor an LLM call:
+    the hint for a section asked under the wrong law, the verbatim text unless
+    enrich is asked for, then the precomputed explanation unless the cache is
+    bypassed.
+    """
+    answer = in_memory_answer(query, engine, enrich)
+    if answer is not None:
+        return answer
+    return precomputed_section_answer(query, engine) if use_cache else None
+
+
+async def ainstant_answer(
+    query: str,
+    engine: RetrievalEngine,
+    use_cache: bool = True,
+    enrich: bool = False,
+) -> Optional[Dict[str, Any]]:
+    "instant_answer for the async paths: the precomputed answer is read from SQLite in a worker thread."
+    answer = in_memory_answer(query, engine, enrich)
+    if answer is not None:
+        return answer
+    return await asyncio.to_thread(precomputed_section_answer, query, engine) if use_cache else None
+
+
+def in_memory_answer(query: str, engine: RetrievalEngine, enrich: bool = False) -> Optional[Dict[str, Any]]:
+    "The instant answers served from the section index alone: the law-mismatch hint, the verbatim text."
+    law_hint = section_law_mismatch(query, engine)
+    if law_hint:
+        return law_mismatch_response(law_hint)
+    return None if enrich else verbatim_section_answer(query, engine)
+
+
 def clean_text(text: str) -> str:
-    text = re.sub(r"\*\*(.*?)\*\*", r"\1", text)
-    text = re.sub(r"\n{3,}", "\n\n", text)
-    return text.strip()
+    with span("clean_text"):
+        text = re.sub(r"\*\*(.*?)\*\*", r"\1", text)
+        text = re.sub(r"\n{3,}", "\n\n", text)
+        return text.strip()
 
 def detect_section_law_mismatch(query: str, docs: list) -> str | None:
     """
@@ -57,30 +226,40 @@ def detect_section_law_mismatch(query: str, docs: list) -> str | None:
 
     return None
 
-def generate_answer(query: str, top_k:int = 5) -> Dict[str, Any]:
-    docs = hybrid_retrieve(query, top_k=top_k)
-    
+def law_mismatch_response(law_hint: str) -> Dict[str, Any]:
+    return {
+        "answer": (
+            f"The requested section does not exist under the specified law. "
+            f"However, this section exists under the {law_hint}. "
+            f"Please confirm if you want the explanation under {law_hint}."
+        ),
+        "citations": []
+    }
+
+def prepare_answer(query: str, docs: list) -> Tuple[Optional[Dict[str, Any]], str, List[Dict]]:
+    """
+    Everything between retrieval and the LLM call.
+    Returns (response, prompt, citations); response is set when the answer
+    is known without the LLM (law mismatch, nothing retrieved, missing section).
+    """
+    with span("prompt_build"):
+        return _prepare_answer(query, docs)
+
+
+def _prepare_answer(query: str, docs: list) -> Tuple[Optional[Dict[str, Any]], str, List[Dict]]:
     #detect IPC/ CRPC
     law_hint = detect_section_law_mismatch(query,docs)
     
     if law_hint:
-        return {
-            "answer":(
-                  f"The requested section does not exist under the specified law. "
-            f"However, this section exists under the {law_hint}. "
-            f"Please confirm if you want the explanation under {law_hint}."
-            ),
-            "citations": []
-        }
+        return law_mismatch_response(law_hint), "", []
     if not docs:
         return {
             "answer": "Answer not found in the provided legal documents.",
             "citations": []
-        }
+        }, "", []
 
-    # Section-aware filtering
+    # Section-aware filtering (on the same retrieval, no second hybrid_retrieve)
     section_asked = extract_section_from_query(query)
-    docs = hybrid_retrieve(query, top_k=5)
     if section_asked:
         filtered = [
             d for d in docs
@@ -92,25 +271,16 @@ def generate_answer(query: str, top_k:int = 5) -> Dict[str, Any]:
             return {
                 "answer": f"Section {section_asked} is not found in the provided legal documents.",
                 "citations": []
-            }
-
-    # Build context
-    context_blocks = []
-    citations = []
-
-    for doc in docs:
-        citations.append({
-            "law": doc.metadata.get("law"),
-            "section": doc.metadata.get("section"),
-            "section_title": doc.metadata.get("section_title"),
-            "source_file": doc.metadata.get("source_file"),
-            "chunk_id": doc.metadata.get("chunk_id")
-        })
-
-        context_blocks.append(
-            f"[{doc.metadata.get('law')} Section {doc.metadata.get('section')}]\n"
-            f"{doc.page_content}"
-        )
+            }, "", []
+
+    # Build context: the best chunks that fit the token budget, one block per section
+    docs = pack_context(docs)
+    citations = [doc_citation(doc) for doc in docs]
+    context_blocks = [
+        f"[{run[0].metadata.get('law')} Section {run[0].metadata.get('section')}]\n"
+        + "\n".join(doc.page_content for doc in run)
+        for run in group_by_section(docs)
+    ]
 
     context = "\n\n---\n\n".join(context_blocks)
 
@@ -125,16 +295,190 @@ QUESTION:
 
 ANSWER:
 """
+    return None, prompt, citations
 
-    response = llm.invoke(prompt)
 
-    return {
+def generate_answer(
+    query: str,
+    top_k:int = 5,
+    engine: Optional[RetrievalEngine] = None,
+    use_cache: bool = True,
+    enrich: bool = False,
+) -> Dict[str, Any]:
+    "enrich: have the LLM explain a section even when its verbatim text could be returned."
+    engine = engine or get_engine()
+    instant = instant_answer(query, engine, use_cache, enrich)
+    if instant is not None:
+        return instant
+    docs = hybrid_retrieve(query, top_k=top_k, engine=engine)
+
+    response, prompt, citations = prepare_answer(query, docs)
+    if response is not None:
+        return response
+
+    key = answer_cache_key(query, citations, engine)
+    cached = cached_answer(key, use_cache)
+    if cached is not None:
+        return cached
+
+    response = get_gateway().invoke(prompt)
+
+    result = {
         "answer": clean_text(response.content),
         "citations": citations
     }
+    get_answer_cache().put(key, result)
+    return result
+
 
+async def acomplete_answer(
+    query: str,
+    docs: list,
+    engine: RetrievalEngine,
+    use_cache: bool = True,
+) -> Dict[str, Any]:
+    "Everything after retrieval: checks, answer cache (SQLite, in a worker thread), async LLM call."
+    response, prompt, citations = prepare_answer(query, docs)
+    if response is not None:
+        return response
+
+    key = answer_cache_key(query, citations, engine)
+    cached = await asyncio.to_thread(cached_answer, key, use_cache)
+    if cached is not None:
+        return cached
+
+    response = await get_gateway().ainvoke(prompt)
+
+    result = {
+        "answer": clean_text(response.content),
+        "citations": citations
+    }
+    await asyncio.to_thread(get_answer_cache().put, key, result)
+    return result
 
-  
-  
-  
- 
\ No newline at end of file
+
+async def agenerate_answer(
+    query: str,
+    top_k:int = 5,
+    engine: Optional[RetrievalEngine] = None,
+    use_cache: bool = True,
+    enrich: bool = False,
+) -> Dict[str, Any]:
+    "Async generate_answer: concurrent vector/BM25 retrieval and a non-blocking Groq call."
+    engine = engine or await asyncio.to_thread(get_engine)
+    instant = await ainstant_answer(query, engine, use_cache, enrich)
+    if instant is not None:
+        return instant
+    docs = await ahybrid_retrieve(query, top_k=top_k, engine=engine)
+    return await acomplete_answer(query, docs, engine, use_cache)
+
+
+async def agenerate_answers_batch(
+    items: List[Tuple[str, int, bool, bool]],
+    engine: Optional[RetrievalEngine] = None,
+    max_concurrency: int = LLM_BATCH_CONCURRENCY,
+) -> List[Dict[str, Any]]:
+    """
+    Answer many (query, top_k, use_cache, enrich) items. Identical items are
+    answered once; exact section lookups are answered by instant_answer; the rest
+    are retrieved in one batch (one embedding call, one FAISS search over a
+    query matrix, blocked BM25 products) and LLM calls run with at most
+    max_concurrency in flight.
+
+    Returns one dict per input item, in order: {"answer": ...} or {"error": ...}.
+    """
+    engine = engine or await asyncio.to_thread(get_engine)
+    outcomes: Dict[Tuple[str, int, bool, bool], Dict[str, Any]] = {}
+    unique = []
+
+    def answer_instantly():
+        # one worker thread for the whole batch: precomputed answers are SQLite reads
+        for item in dict.fromkeys(items):
+            try:
+                instant = instant_answer(item[0], engine, item[2], item[3])
+            except Exception as e:
+                outcomes[item] = {"error": str(e)}
+                continue
+            if instant is not None:
+                outcomes[item] = {"answer": instant}
+            else:
+                unique.append(item)
+
+    await asyncio.to_thread(answer_instantly)
+    if not unique:
+        return [outcomes[item] for item in items]
+
+    # one batched retrieval pass for every distinct (query, top_k)
+    pairs = list(dict.fromkeys((item[0], item[1]) for item in unique))
+    docs_for: Dict[Tuple[str, int, bool, bool], list] = {}
+    try:
+        retrieved = await asyncio.to_thread(
+            batch_hybrid_retrieve, [q for q, _ in pairs], [k for _, k in pairs], engine
+        )
+    except Exception as e:
+        return [outcomes.get(item) or {"error": f"retrieval failed: {e}"} for item in items]
+    by_pair = dict(zip(pairs, retrieved))
+    for item in unique:
+        docs_for[item] = by_pair[(item[0], item[1])]
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def answer(item):
+        query, _, use_cache, _ = item
+        async with semaphore:
+            try:
+                outcomes[item] = {"answer": await acomplete_answer(query, docs_for[item], engine, use_cache)}
+            except Exception as e:
+                outcomes[item] = {"error": str(e)}
+
+    await asyncio.gather(*(answer(item) for item in unique))
+    return [outcomes[item] for item in items]
+
+
+async def astream_answer(
+    query: str,
+    top_k:int = 5,
+    engine: Optional[RetrievalEngine] = None,
+    use_cache: bool = True,
+    enrich: bool = False,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Streaming generate_answer. Yields (event, data) pairs:
+      "retrieval" - citations, as soon as hybrid retrieval finishes
+      "token"     - raw LLM output as it arrives
+      "done"      - final cleaned answer + citations (same shape as generate_answer)
+    A verbatim or precomputed section answer comes as "retrieval" then "done", with no tokens.
+    """
+    engine = engine or await asyncio.to_thread(get_engine)
+    instant = await ainstant_answer(query, engine, use_cache, enrich)
+    if instant is not None:
+        yield "retrieval", {"citations": instant["citations"]}
+        yield "done", instant
+        return
+    docs = await ahybrid_retrieve(query, top_k=top_k, engine=engine)
+
+    response, prompt, citations = prepare_answer(query, docs)
+    yield "retrieval", {"citations": citations}
+
+    if response is not None:
+        yield "done", response
+        return
+
+    key = answer_cache_key(query, citations, engine)
+    cached = await asyncio.to_thread(cached_answer, key, use_cache)
+    if cached is not None:
+        yield "done", cached
+        return
+
+    parts = []
+    async for chunk in get_gateway().astream(prompt):
+        if chunk.content:
+            parts.append(chunk.content)
+            yield "token", {"text": chunk.content}
+
+    result = {
+        "answer": clean_text("".join(parts)),
+        "citations": citations
+    }
+    await asyncio.to_thread(get_answer_cache().put, key, result)
+    yield "done", result
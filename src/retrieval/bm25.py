@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import os
+import struct
+import zipfile
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.config import VECTOR_STORE_PATH, INDEX_NAME
+
+if TYPE_CHECKING:
+    from scipy import sparse
+
+BM25_FILE = f"{INDEX_NAME}_bm25.npz"
+
+
+def bm25_path(vector_store_path: str = VECTOR_STORE_PATH) -> str:
+    return os.path.join(vector_store_path, BM25_FILE)
+
+
+def mapped_npz(path: str) -> Dict[str, np.ndarray]:
+    """
+    Memory-map every array of an uncompressed .npz (np.savez) read-only, in
+    place: np.load ignores mmap_mode for archives.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path}: {info.filename} is compressed and cannot be memory-mapped")
+            # local file header: 30 fixed bytes, then the file name and extra field, then the .npy
+            f.seek(info.header_offset + 26)
+            name_len, extra_len = struct.unpack("<HH", f.read(4))
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if not np.prod(shape):
+                arrays[name] = np.zeros(shape, dtype=dtype)  # np.memmap cannot map zero bytes
+            else:
+                arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=f.tell(), shape=shape, order="F" if fortran else "C")
+    return arrays
+
+
+def tokenize(text: str) -> List[str]:
+    "Same tokenization the retriever has always used for BM25."
+    return text.lower().split()
+
+
+class SparseBM25:
+    """
+    BM25 (Okapi variant, same idf/epsilon rules as rank_bm25.BM25Okapi) over a
+    precomputed CSR term-document matrix.
+
+    Every non-zero holds the full BM25 term weight for (term, doc), so scoring
+    a query is one sparse product and top-k is an argpartition.
+    """
+
+    def __init__(
+        self,
+        matrix: sparse.csr_matrix,
+        vocab: Sequence[str],
+        doc_ids: np.ndarray,
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25,
+        tf: Optional[np.ndarray] = None,
+        doc_len: Optional[np.ndarray] = None,
+    ):
+        self.matrix = matrix  # terms x docs
+        self.vocab = {term: i for i, term in enumerate(vocab)}
+        self.doc_ids = doc_ids
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        # raw term frequencies (same sparsity as matrix) + doc lengths, kept so
+        # update() can add/remove documents without re-tokenizing the corpus
+        self.tf = tf
+        self.doc_len = doc_len
+
+    @property
+    def corpus_size(self) -> int:
+        return self.matrix.shape[1]
+
+    @staticmethod
+    def _count(tokenized_docs: Iterable[List[str]], vocab: dict, first_col: int = 0):
+        rows, cols, tfs, doc_len = [], [], [], []
+        for d, tokens in enumerate(tokenized_docs, start=first_col):
+            doc_len.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                rows.append(vocab.setdefault(term, len(vocab)))
+                cols.append(d)
+                tfs.append(tf)
+        return rows, cols, tfs, doc_len
+
+    @classmethod
+    def from_tf(
+        cls,
+        tf: "sparse.csr_matrix",
+        terms: Sequence[str],
+        doc_len: np.ndarray,
+        doc_ids: np.ndarray,
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25,
+    ) -> "SparseBM25":
+        "Compute BM25 weights from a terms x docs term-frequency matrix."
+        from scipy import sparse
+
+        n_docs = tf.shape[1]
+        if n_docs == 0:
+            raise ValueError("Cannot build BM25 over an empty corpus")
+
+        tf = sparse.csr_matrix(tf)
+        tf.sort_indices()
+        df = np.diff(tf.indptr).astype(np.float64)
+        if (df == 0).any():
+            # terms whose documents were all removed: drop them, like a fresh build would
+            keep = np.flatnonzero(df)
+            tf = tf[keep]
+            tf.sort_indices()
+            terms = [terms[i] for i in keep]
+            df = df[keep]
+
+        doc_len = np.asarray(doc_len, dtype=np.float64)
+        avgdl = doc_len.sum() / n_docs
+
+        # idf exactly as BM25Okapi: negative idfs are floored to epsilon * mean idf
+        idf = np.log(n_docs - df + 0.5) - np.log(df + 0.5)
+        eps = epsilon * idf.mean()
+        idf[idf < 0] = eps
+
+        rows = np.repeat(np.arange(tf.shape[0]), np.diff(tf.indptr))
+        cols = tf.indices
+        tfs = tf.data.astype(np.float64)
+        norm = k1 * (1 - b + b * doc_len[cols] / avgdl)
+        weights = idf[rows] * tfs * (k1 + 1) / (tfs + norm)
+
+        matrix = sparse.csr_matrix((weights, tf.indices, tf.indptr), shape=tf.shape)
+        return cls(
+            matrix, list(terms), np.asarray(doc_ids), k1=k1, b=b, epsilon=epsilon,
+            tf=tf.data.astype(np.int32), doc_len=doc_len,
+        )
+
+    @classmethod
+    def build(
+        cls,
+        tokenized_docs: Iterable[List[str]],
+        doc_ids: Optional[Sequence[int]] = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25,
+    ) -> "SparseBM25":
+        from scipy import sparse
+
+        vocab: dict = {}
+        rows, cols, tfs, doc_len = cls._count(tokenized_docs, vocab)
+        n_docs = len(doc_len)
+        tf = sparse.csr_matrix((tfs, (rows, cols)), shape=(len(vocab), n_docs), dtype=np.int32)
+        terms = sorted(vocab, key=vocab.get)
+        ids = np.arange(n_docs) if doc_ids is None else np.asarray(doc_ids)
+        return cls.from_tf(tf, terms, doc_len, ids, k1=k1, b=b, epsilon=epsilon)
+
+    def update(
+        self,
+        add_docs: List[List[str]],
+        add_ids: Sequence[int],
+        remove_ids: Iterable[int] = (),
+    ) -> "SparseBM25":
+        """
+        Return a new model with remove_ids dropped and add_docs appended.
+        Only the added documents are tokenized/counted; idf and length
+        normalization are recomputed vectorially from the stored frequencies.
+        """
+        from scipy import sparse
+
+        if self.tf is None or self.doc_len is None:
+            raise ValueError("BM25 artifact has no term frequencies; rebuild it")
+
+        tf = sparse.csr_matrix((self.tf, self.matrix.indices, self.matrix.indptr), shape=self.matrix.shape)
+        removed = set(remove_ids)
+        keep = np.fromiter((i not in removed for i in self.doc_ids.tolist()), dtype=bool, count=len(self.doc_ids))
+        tf = tf[:, np.flatnonzero(keep)]
+        doc_len = self.doc_len[keep]
+        doc_ids = self.doc_ids[keep]
+
+        vocab = dict(self.vocab)
+        rows, cols, tfs, new_len = self._count(add_docs, vocab)
+        new_tf = sparse.csr_matrix((tfs, (rows, cols)), shape=(len(vocab), len(new_len)), dtype=np.int32)
+        tf.resize((len(vocab), tf.shape[1]))  # room for terms first seen in add_docs
+        tf = sparse.hstack([tf, new_tf], format="csr")
+
+        terms = sorted(vocab, key=vocab.get)
+        return self.from_tf(
+            tf, terms,
+            np.concatenate([doc_len, np.asarray(new_len, dtype=np.float64)]),
+            np.concatenate([doc_ids, np.asarray(list(add_ids), dtype=doc_ids.dtype)]),
+            k1=self.k1, b=self.b, epsilon=self.epsilon,
+        )
+
+    def _query_terms(self, tokens: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        counts = Counter(t for t in tokens if t in self.vocab)
+        rows = np.fromiter((self.vocab[t] for t in counts), dtype=np.int64, count=len(counts))
+        weights = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        return rows, weights
+
+    def get_scores(self, tokens: List[str]) -> np.ndarray:
+        "Score every document for one tokenized query (repeated terms count again, like BM25Okapi)."
+        rows, weights = self._query_terms(tokens)
+        if rows.size == 0:
+            return np.zeros(self.corpus_size)
+        return self.matrix[rows].T @ weights
+
+    def get_scores_batch(self, queries: List[List[str]]) -> np.ndarray:
+        "Score many queries at once: (n_queries x terms) @ (terms x docs)."
+        from scipy import sparse
+
+        data, indices, indptr = [], [], [0]
+        for tokens in queries:
+            rows, weights = self._query_terms(tokens)
+            indices.append(rows)
+            data.append(weights)
+            indptr.append(indptr[-1] + rows.size)
+        q = sparse.csr_matrix(
+            (
+                np.concatenate(data) if data else np.zeros(0),
+                np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64),
+                np.asarray(indptr),
+            ),
+            shape=(len(queries), self.matrix.shape[0]),
+        )
+        return (q @ self.matrix).toarray()
+
+    @staticmethod
+    def top_k_from_scores(scores: np.ndarray, k: int) -> np.ndarray:
+        "Indices of the k best scores, best first (ties broken by lower index)."
+        k = min(k, scores.shape[0])
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64)
+        if k < scores.shape[0]:
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(scores.shape[0])
+        order = np.lexsort((candidates, -scores[candidates]))
+        return candidates[order]
+
+    def top_k(self, tokens: List[str], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        "Return (row indices, scores) of the k best documents."
+        scores = self.get_scores(tokens)
+        idx = self.top_k_from_scores(scores, k)
+        return idx, scores[idx]
+
+    def save(self, path: Optional[str] = None) -> str:
+        path = path or bm25_path()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        terms = np.array(sorted(self.vocab, key=self.vocab.get), dtype=str)
+        # uncompressed (so load(mmap=True) can map it) and swapped in whole
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                data=self.matrix.data,
+                indices=self.matrix.indices,
+                indptr=self.matrix.indptr,
+                shape=np.asarray(self.matrix.shape),
+                vocab=terms,
+                doc_ids=self.doc_ids,
+                params=np.asarray([self.k1, self.b, self.epsilon]),
+                **({"tf": self.tf, "doc_len": self.doc_len} if self.tf is not None else {}),
+            )
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def _from_arrays(cls, f) -> "SparseBM25":
+        from scipy import sparse
+
+        matrix = sparse.csr_matrix(
+            (f["data"], f["indices"], f["indptr"]), shape=tuple(f["shape"])
+        )
+        k1, b, epsilon = f["params"].tolist()
+        return cls(
+            matrix, f["vocab"].tolist(), f["doc_ids"], k1=k1, b=b, epsilon=epsilon,
+            tf=f["tf"] if "tf" in f else None,
+            doc_len=f["doc_len"] if "doc_len" in f else None,
+        )
+
+    @classmethod
+    def load(cls, path: Optional[str] = None, mmap: bool = False) -> Optional["SparseBM25"]:
+        "With mmap the weight / frequency arrays stay in the file, shared by every process that maps it."
+        path = path or bm25_path()
+        if not os.path.exists(path):
+            return None
+        if mmap:
+            return cls._from_arrays(mapped_npz(path))
+        with np.load(path, allow_pickle=False) as f:
+            return cls._from_arrays(f)
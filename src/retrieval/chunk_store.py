@@ -0,0 +1,196 @@
+"""
+Binary chunk table, written next to the section index at index build time.
+
+  legal_chunks.npy   structured array, one fixed-width row per chunk
+                     (chunk_id, law, section, page, source_file, blob offsets)
+  legal_chunks.bin   every section title and chunk text, UTF-8, back to back
+
+Both files are opened memory-mapped and read-only, so every process serving
+the same vector store (uvicorn workers) shares one copy through the OS page
+cache, and a text or title is only decoded when a hit is returned.
+"""
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import VECTOR_STORE_PATH, INDEX_NAME
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+CHUNK_TABLE_FILE = f"{INDEX_NAME}_chunks.npy"
+CHUNK_TEXT_FILE = f"{INDEX_NAME}_chunks.bin"
+
+
+def chunk_store_paths(vector_store_path: str = VECTOR_STORE_PATH) -> Tuple[str, str]:
+    return (
+        os.path.join(vector_store_path, CHUNK_TABLE_FILE),
+        os.path.join(vector_store_path, CHUNK_TEXT_FILE),
+    )
+
+
+def chunk_to_document(chunk: Dict, position: Optional[int] = None) -> Document:
+    "position: the chunk's row in the chunk table, i.e. its place in statute order (chunk ids are hashes)."
+    from langchain_core.documents import Document
+
+    metadata = {
+        "law": chunk.get("law"),
+        "section": chunk.get("section"),
+        "section_title": chunk.get("section_title"),
+        "page": chunk.get("page"),
+        "source_file": chunk.get("source_file"),
+        "chunk_id": chunk.get("chunk_id"),
+    }
+    if position is not None:
+        metadata["position"] = position
+    return Document(page_content=chunk["text"], metadata=metadata)
+
+
+def _encoded(values: List[Optional[str]]) -> np.ndarray:
+    # fixed width = the longest value; None is stored as b"" and read back as None
+    return np.array([(v or "").encode("utf-8") for v in values] or [b""], dtype=bytes)
+
+
+class ChunkStore:
+    """
+    Read-only chunk table keyed by chunk_id. Rows keep the order the chunks
+    were given in (page order), so it can stand in for the chunk list.
+    """
+
+    def __init__(self, table: np.ndarray, blob: np.ndarray):
+        self.table = table
+        self.blob = blob
+        # plain views of the same pages: slicing a np.memmap per hit is several times slower
+        self._rows = table.view(np.ndarray)
+        self._text = memoryview(blob.view(np.ndarray))
+        self.ids = table["chunk_id"]
+        # id -> row lookup: per process, 16 bytes a chunk, the only part not shared through the mapping
+        self._by_id = np.argsort(self.ids, kind="stable")
+        self._sorted_ids = self.ids[self._by_id]
+
+    @classmethod
+    def from_chunks(cls, chunks: List[Dict]) -> "ChunkStore":
+        "Build the table in memory (also the fallback for vector stores written before it existed)."
+        parts: List[bytes] = []
+        offsets = np.zeros((len(chunks), 3), dtype=np.int64)
+        pos = 0
+        for i, chunk in enumerate(chunks):
+            title = (chunk.get("section_title") or "").encode("utf-8")
+            text = chunk["text"].encode("utf-8")
+            offsets[i] = (pos, pos + len(title), pos + len(title) + len(text))
+            parts += (title, text)
+            pos = offsets[i, 2]
+
+        laws = _encoded([c.get("law") for c in chunks])
+        sections = _encoded([c.get("section") for c in chunks])
+        sources = _encoded([c.get("source_file") for c in chunks])
+        table = np.zeros(len(chunks), dtype=[
+            ("chunk_id", "<i8"),
+            ("law", laws.dtype),
+            ("section", sections.dtype),
+            ("page", "<i4"),  # -1 = unknown
+            ("source_file", sources.dtype),
+            ("title_start", "<i8"),  # title is blob[title_start:text_start]
+            ("text_start", "<i8"),
+            ("text_end", "<i8"),
+        ])
+        if chunks:
+            table["chunk_id"] = [c["chunk_id"] for c in chunks]
+            table["law"], table["section"], table["source_file"] = laws, sections, sources
+            table["page"] = [-1 if c.get("page") is None else c["page"] for c in chunks]
+            table["title_start"], table["text_start"], table["text_end"] = offsets.T
+        return cls(table, np.frombuffer(b"".join(parts), dtype=np.uint8))
+
+    def save(self, vector_store_path: str = VECTOR_STORE_PATH) -> str:
+        table_path, blob_path = chunk_store_paths(vector_store_path)
+        os.makedirs(vector_store_path, exist_ok=True)
+        # text first: a table on disk never points past the end of its blob
+        with open(blob_path + ".tmp", "wb") as f:
+            f.write(self.blob.tobytes())
+        os.replace(blob_path + ".tmp", blob_path)
+        with open(table_path + ".tmp", "wb") as f:
+            np.save(f, self.table, allow_pickle=False)
+        os.replace(table_path + ".tmp", table_path)
+        return table_path
+
+    @classmethod
+    def load(cls, vector_store_path: str = VECTOR_STORE_PATH) -> Optional["ChunkStore"]:
+        "Memory-map both files read-only; None if this vector store has no chunk table."
+        table_path, blob_path = chunk_store_paths(vector_store_path)
+        if not (os.path.exists(table_path) and os.path.exists(blob_path)):
+            return None
+        table = np.load(table_path, mmap_mode="r", allow_pickle=False)
+        # np.memmap cannot map an empty file
+        if os.path.getsize(blob_path):
+            blob = np.memmap(blob_path, dtype=np.uint8, mode="r")
+        else:
+            blob = np.zeros(0, dtype=np.uint8)
+        return cls(table, blob)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def row(self, chunk_id: int) -> int:
+        "Row of chunk_id, or -1."
+        i = int(self._sorted_ids.searchsorted(chunk_id))
+        if i < len(self._sorted_ids) and self._sorted_ids[i] == chunk_id:
+            return int(self._by_id[i])
+        return -1
+
+    def __contains__(self, chunk_id: int) -> bool:
+        return self.row(chunk_id) >= 0
+
+    def text(self, row: int) -> str:
+        *_, start, end = self._rows[row].item()
+        return str(self._text[start:end], "utf-8")
+
+    def chunk(self, row: int) -> Dict:
+        "Materialize one row as the chunk dict the JSON files hold."
+        chunk_id, law, section, page, source_file, title_start, text_start, text_end = self._rows[row].item()
+        return {
+            "law": law.decode("utf-8") or None,
+            "section": section.decode("utf-8") or None,
+            "section_title": str(self._text[title_start:text_start], "utf-8") or None,
+            "text": str(self._text[text_start:text_end], "utf-8"),
+            "page": None if page < 0 else page,
+            "source_file": source_file.decode("utf-8") or None,
+            "chunk_id": chunk_id,
+        }
+
+    def get(self, chunk_id: int) -> Optional[Dict]:
+        row = self.row(chunk_id)
+        return self.chunk(row) if row >= 0 else None
+
+    def __getitem__(self, chunk_id: int) -> Dict:
+        row = self.row(chunk_id)
+        if row < 0:
+            raise KeyError(chunk_id)
+        return self.chunk(row)
+
+    def document(self, chunk_id: int) -> Document:
+        "The chunk as a Document, with its row as metadata['position']."
+        row = self.row(chunk_id)
+        if row < 0:
+            raise KeyError(chunk_id)
+        return chunk_to_document(self.chunk(row), position=row)
+
+    def _law_mask(self, law: Optional[str]) -> Optional[np.ndarray]:
+        return None if law is None else self.table["law"] == law.encode("utf-8")
+
+    def ids_for(self, law: Optional[str] = None) -> np.ndarray:
+        "chunk_ids of one law (every chunk for None), in row order."
+        mask = self._law_mask(law)
+        return np.asarray(self.ids if mask is None else self.ids[mask])
+
+    def iter_chunks(self, law: Optional[str] = None) -> Iterator[Dict]:
+        "Materialize every row (of one law), in row order: only for rebuilds, not per query."
+        mask = self._law_mask(law)
+        rows = range(len(self)) if mask is None else np.flatnonzero(mask).tolist()
+        for row in rows:
+            yield self.chunk(row)
+
+    def nbytes(self) -> int:
+        return self.table.nbytes + self.blob.nbytes
@@ -0,0 +1,90 @@
+"""
+Context packing: which retrieved chunks go into the LLM prompt, and in what order.
+
+Prompt size is most of the LLM's latency and cost, so instead of passing every
+retrieved chunk the packer fills a token budget with the best candidates and
+skips weak (low fixed-scale relevance, see fusion.relevance) and repeated ones. Chunks of one section end up next to each
+other, in statute order, so a prompt builder writes one header per section
+(group_by_section).
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from src.config import CONTEXT_MIN_SCORE, CONTEXT_TOKEN_BUDGET
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English statute text (llama tokenizers); no tokenizer needed
+    return len(text) // 4 + 1
+
+
+def _section_key(doc: Document) -> Tuple:
+    law, section = doc.metadata.get("law"), doc.metadata.get("section")
+    # section-less chunks (chapter headings) never share a header
+    return (law, section) if section else (law, None, doc.metadata.get("chunk_id"))
+
+
+def statute_order(docs: List[Document]) -> List[Document]:
+    """
+    Sort by chunk-table row (metadata "position", set by ChunkStore.document).
+    chunk_ids are content hashes and say nothing about order; docs without a
+    position (vector hits from a store not backed by the chunk table) keep
+    the order they came in.
+    """
+    if any(doc.metadata.get("position") is None for doc in docs):
+        return list(docs)
+    return sorted(docs, key=lambda d: d.metadata["position"])
+
+
+def pack_context(
+    docs: List[Document],
+    token_budget: int = CONTEXT_TOKEN_BUDGET,
+    min_score: float = CONTEXT_MIN_SCORE,
+) -> List[Document]:
+    """
+    Take docs best first (fusion order), skipping ones whose relevance is
+    under min_score (docs without one qualify),
+    repeated texts, and any that would take the estimated tokens past
+    token_budget. The best doc always goes in. The kept docs come back
+    grouped by section (sections in order of their best doc, chunks in
+    statute order).
+    """
+    chosen: List[Document] = []
+    seen = set()
+    used = 0
+    for doc in docs:
+        text = doc.page_content.strip()
+        if text in seen:
+            continue
+        score = doc.metadata.get("relevance")
+        if chosen and score is not None and score < min_score:
+            continue
+        cost = estimate_tokens(text)
+        if chosen and used + cost > token_budget:
+            continue
+        chosen.append(doc)
+        seen.add(text)
+        used += cost
+
+    groups: Dict[Tuple, List[Document]] = {}
+    for doc in chosen:
+        groups.setdefault(_section_key(doc), []).append(doc)
+    packed = []
+    for group in groups.values():
+        packed += statute_order(group)
+    return packed
+
+
+def group_by_section(docs: List[Document]) -> List[List[Document]]:
+    "Runs of consecutive docs from the same section (one prompt block each)."
+    runs: List[List[Document]] = []
+    for doc in docs:
+        if runs and _section_key(runs[-1][-1]) == _section_key(doc):
+            runs[-1].append(doc)
+        else:
+            runs.append([doc])
+    return runs
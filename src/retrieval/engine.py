@@ -0,0 +1,318 @@
+import os
+import glob
+import json
+import hashlib
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import List, Dict, Optional
+
+import numpy as np
+
+from src.config import VECTOR_STORE_PATH, INDEX_NAME, CHUNKS_DIR, EMBED_MODEL, INDEX_MMAP
+from src.retrieval.query_encoder import QueryEncoder
+from src.retrieval.bm25 import SparseBM25, bm25_path, tokenize
+from src.retrieval.chunk_store import ChunkStore
+from src.retrieval.section_index import build_section_index, load_section_index, section_index_path
+from src.retrieval.shards import Shard, ShardRouter, store_dirs
+
+WARMUP_QUERY = "IPC Section 420 cheating"
+
+
+class StartupTimings:
+    "Thread-safe record of how long each import / load / build step took."
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.steps: Dict[str, float] = {}
+
+    @contextmanager
+    def step(self, kind: str, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.steps[f"{kind}:{name}"] = time.perf_counter() - start
+
+    def total(self, kind: str) -> float:
+        return sum(v for k, v in self.steps.items() if k.startswith(f"{kind}:"))
+
+
+# Heavy libraries (langchain, sentence-transformers, faiss) are imported on first use only
+#Load langchain Embedding model
+def load_embedding_model(timings: Optional[StartupTimings] = None):
+    timings = timings or StartupTimings()
+    with timings.step("import", "sentence_transformers"):
+        import sentence_transformers  # noqa: F401
+    with timings.step("import", "langchain_huggingface"):
+        from langchain_huggingface import HuggingFaceEmbeddings
+    with timings.step("load", "embedding_model"):
+        return HuggingFaceEmbeddings(model_name=EMBED_MODEL)
+
+
+# Load Faiss vector store
+def load_vector_store(
+    embedder,
+    vector_store_path: str = VECTOR_STORE_PATH,
+    index_name: str = INDEX_NAME,
+    timings: Optional[StartupTimings] = None,
+    mmap: bool = False,
+):
+    "With mmap the index codes are memory-mapped read-only instead of read into process memory."
+    timings = timings or StartupTimings()
+    with timings.step("import", "faiss"):
+        from langchain_community.vectorstores import FAISS
+    from src.retrieval.faiss_index import apply_search_params, load_index_meta, read_flags
+
+    absolute_path = os.path.abspath(vector_store_path)
+    with timings.step("load", "vector_store"):
+        vector_db = FAISS.load_local(
+        folder_path=absolute_path,
+        index_name=index_name,
+        embeddings=embedder,
+        allow_dangerous_deserialization=True,
+        io_flags=read_flags(mmap),
+    )
+    apply_search_params(vector_db.index, load_index_meta(vector_store_path, index_name)["type"])
+    return vector_db
+
+
+def load_all_chunks(chunks_dir: str = CHUNKS_DIR) -> List[Dict]:
+    all_chunks = []
+    files = glob.glob(os.path.join(chunks_dir, "**", "*.json"), recursive=True)
+    for file in files:
+        with open(file, "r", encoding="utf-8") as f:
+            all_chunks.extend(json.load(f))
+    return all_chunks
+
+
+def build_bm25(chunks: List[Dict]) -> SparseBM25:
+    return SparseBM25.build(
+        (tokenize(chunk["text"]) for chunk in chunks),
+        doc_ids=[chunk["chunk_id"] for chunk in chunks],
+    )
+
+
+def load_chunks(
+    chunks_dir: str = CHUNKS_DIR,
+    vector_store_path: str = VECTOR_STORE_PATH,
+    timings: Optional[StartupTimings] = None,
+) -> ChunkStore:
+    "Memory-map the chunk table written with the index; built from the chunk JSON for older vector stores."
+    timings = timings or StartupTimings()
+    with timings.step("load", "chunks"):
+        store = ChunkStore.load(vector_store_path)
+    if store is not None:
+        return store
+    with timings.step("build", "chunks"):
+        return ChunkStore.from_chunks(load_all_chunks(chunks_dir))
+
+
+def load_bm25(
+    chunks: ChunkStore,
+    law: Optional[str] = None,
+    vector_store_path: str = VECTOR_STORE_PATH,
+    timings: Optional[StartupTimings] = None,
+    mmap: bool = False,
+) -> SparseBM25:
+    "Load the prebuilt BM25 artifact (one law's, or every chunk's), rebuilding it if missing or built from other chunks."
+    timings = timings or StartupTimings()
+    with timings.step("import", "scipy"):
+        import scipy.sparse  # noqa: F401
+    with timings.step("load", "bm25"):
+        bm25 = SparseBM25.load(bm25_path(vector_store_path), mmap=mmap)
+    ids = chunks.ids_for(law)
+    if bm25 is not None and np.array_equal(np.sort(bm25.doc_ids), np.sort(ids)):
+        return bm25
+    with timings.step("build", "bm25"):
+        return build_bm25(list(chunks.iter_chunks(law)))
+
+
+def load_sections(
+    chunks: ChunkStore,
+    vector_store_path: str = VECTOR_STORE_PATH,
+    timings: Optional[StartupTimings] = None,
+) -> Dict[str, Dict[str, List[int]]]:
+    "Prebuilt at embedding time; rebuilt in memory for older vector stores."
+    timings = timings or StartupTimings()
+    with timings.step("load", "section_index"):
+        section_index = load_section_index(section_index_path(vector_store_path))
+    if section_index is not None:
+        return section_index
+    with timings.step("build", "section_index"):
+        return build_section_index(list(chunks.iter_chunks()))
+
+
+def index_fingerprint(
+    vector_store_path: str = VECTOR_STORE_PATH,
+    index_name: str = INDEX_NAME,
+    chunks_dir: str = CHUNKS_DIR,
+) -> str:
+    "Changes whenever the vector store (or a shard of it) or chunk files are rebuilt (name, size, mtime)."
+    files = glob.glob(os.path.join(vector_store_path, f"{index_name}*"))
+    files += glob.glob(os.path.join(vector_store_path, "shards", "*", f"{index_name}*"))
+    files += glob.glob(os.path.join(chunks_dir, "**", "*.json"), recursive=True)
+    h = hashlib.sha1()
+    for path in sorted(files):
+        st = os.stat(path)
+        h.update(f"{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return h.hexdigest()[:16]
+
+
+class RetrievalEngine:
+    """
+    Holds everything retrieval needs for the lifetime of the process:
+    the embedding model, the FAISS vector store, the BM25 model and the
+    memory-mapped chunk table they were built from. Searches go through `router`, which holds
+    one shard per law for a sharded store (vector_db / bm25 are then None).
+
+    Create it once (FastAPI lifespan), call load() and warm_up(), then pass
+    it to hybrid_retrieve / generate_answer.
+
+    With mmap (INDEX_MMAP) the FAISS codes and BM25 arrays are memory-mapped
+    read-only and vector hits are read from the chunk table, so worker
+    processes share the index pages instead of each holding a copy.
+    """
+
+    def __init__(
+        self,
+        vector_store_path: str = VECTOR_STORE_PATH,
+        index_name: str = INDEX_NAME,
+        chunks_dir: str = CHUNKS_DIR,
+        mmap: bool = INDEX_MMAP,
+    ):
+        self.vector_store_path = vector_store_path
+        self.index_name = index_name
+        self.chunks_dir = chunks_dir
+        self.mmap = mmap
+
+        self.embedder = None
+        self.encoder: Optional[QueryEncoder] = None
+        self.vector_db = None
+        self.bm25 = None
+        self.router: Optional[ShardRouter] = None
+        self.chunks: Optional[ChunkStore] = None
+        self.section_index: Dict[str, Dict[str, List[int]]] = {}
+        self.index_version = ""
+
+        self.timings = StartupTimings()
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._warm = False
+        self.error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._loaded and self._warm
+
+    def status(self) -> Dict:
+        return {
+            "loaded": self._loaded,
+            "warm": self._warm,
+            "chunks": len(self.chunks) if self.chunks is not None else 0,
+            "index_version": self.index_version,
+            "mmap": self.mmap,
+            "shards": self.router.stats() if self.router else None,
+            "query_encoder": self.encoder.stats() if self.encoder else None,
+            "error": self.error,
+        }
+
+    def load(self) -> "RetrievalEngine":
+        "Load model, vector store, chunk table and BM25. Safe to call more than once."
+        with self._lock:
+            if self._loaded:
+                return self
+
+            timings = self.timings
+            start = time.perf_counter()
+            # {None: vector_store_path} for a combined store, one entry per law if sharded
+            stores = store_dirs(self.vector_store_path, self.index_name)
+
+            def load_dense():
+                embedder = load_embedding_model(timings)
+                return embedder, {
+                    law: load_vector_store(embedder, path, self.index_name, timings, self.mmap)
+                    for law, path in stores.items()
+                }
+
+            def load_sparse():
+                chunks = load_chunks(self.chunks_dir, self.vector_store_path, timings)
+                if not len(chunks):
+                    raise ValueError("NO chunks found for BM25. Check CHUNKS_DIR path.")
+                bm25s = {law: load_bm25(chunks, law, path, timings, self.mmap) for law, path in stores.items()}
+                return chunks, bm25s, load_sections(chunks, self.vector_store_path, timings)
+
+            # The model/FAISS path and the chunk/BM25 path are independent: load them side by side
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="engine-load") as pool:
+                dense = pool.submit(load_dense)
+                sparse = pool.submit(load_sparse)
+                chunks, bm25s, section_index = sparse.result()
+                embedder, vector_dbs = dense.result()
+
+            timings.steps["wall:load"] = time.perf_counter() - start
+
+            self.chunks = chunks
+            self.section_index = section_index
+            self.embedder = embedder
+            self.encoder = QueryEncoder(embedder)
+            self.vector_db = vector_dbs.get(None)
+            self.bm25 = bm25s.get(None)
+            self.router = ShardRouter(
+                [Shard(law, vector_dbs[law], bm25s[law], chunks, drop_docstore=self.mmap) for law in stores]
+            )
+            self.index_version = index_fingerprint(self.vector_store_path, self.index_name, self.chunks_dir)
+            self._loaded = True
+        return self
+
+    def warm_up(self) -> "RetrievalEngine":
+        "Run one query through every component so the first real request is not slow."
+        self.load()
+        with self._lock:
+            if self._warm:
+                return self
+            with self.timings.step("warm", "engine"):
+                self.router.vector_search([self.encoder.encode(WARMUP_QUERY)], k=1)
+                self.router.bm25_search([tokenize(WARMUP_QUERY)], [1])
+            self._warm = True
+        return self
+
+
+_ENGINE: Optional[RetrievalEngine] = None
+_ENGINE_LOCK = threading.Lock()
+
+
+def set_engine(engine: Optional[RetrievalEngine]) -> None:
+    "Install the process-wide engine (done by the API at startup)."
+    global _ENGINE
+    with _ENGINE_LOCK:
+        _ENGINE = engine
+
+
+def current_engine() -> Optional[RetrievalEngine]:
+    "The process-wide engine if one is installed (e.g. preloaded before fork), without loading one."
+    with _ENGINE_LOCK:
+        return _ENGINE
+
+
+def preload_engine() -> RetrievalEngine:
+    """
+    Load the process-wide engine in a server's master process, before it
+    forks workers (gunicorn --preload, see app/gunicorn_conf.py). Workers
+    inherit the loaded model and indexes copy-on-write and warm up on their
+    own: threads (query encoder, torch) do not survive a fork.
+    """
+    engine = RetrievalEngine().load()
+    set_engine(engine)
+    return engine
+
+
+def get_engine() -> RetrievalEngine:
+    "Return the process-wide engine, creating and loading it on first use."
+    global _ENGINE
+    with _ENGINE_LOCK:
+        if _ENGINE is None:
+            _ENGINE = RetrievalEngine()
+        engine = _ENGINE
+    return engine.load()
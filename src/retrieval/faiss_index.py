@@ -0,0 +1,162 @@
+"""
+FAISS index types for the vector store.
+
+  flat      exact IndexFlatL2 (what FAISS.from_documents builds)
+  hnsw      HNSW graph over full vectors
+  ivf_flat  inverted lists, full vectors
+  ivf_pq    inverted lists, product-quantized codes
+  sq8       flat scan over 8-bit scalar-quantized vectors
+
+The type a store was built with is saved next to it as legal_index.json.
+Search-time knobs (nprobe, efSearch) come from config so they can be tuned
+without a rebuild.
+"""
+import os
+import json
+import math
+from typing import Dict, Optional
+
+import numpy as np
+
+from src.config import (
+    VECTOR_STORE_PATH,
+    INDEX_NAME,
+    FAISS_INDEX_TYPE,
+    FAISS_HNSW_M,
+    FAISS_HNSW_EF_SEARCH,
+    FAISS_IVF_NLIST,
+    FAISS_IVF_NPROBE,
+    FAISS_PQ_M,
+    FAISS_PQ_BITS,
+)
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq", "sq8")
+
+# faiss remove_ids compacts these the way LangChain's FAISS.delete expects;
+# HNSW cannot remove at all and IVF keeps the old ids, so those are rebuilt
+REMOVE_SUPPORTED = ("flat", "sq8")
+
+
+def index_meta_path(vector_store_path: str = VECTOR_STORE_PATH, index_name: str = INDEX_NAME) -> str:
+    return os.path.join(vector_store_path, f"{index_name}_index.json")
+
+
+def ivf_nlist(n: int) -> int:
+    "~4*sqrt(n) lists, but keep >= 39 training points per list (faiss warns below that)."
+    if FAISS_IVF_NLIST:
+        return FAISS_IVF_NLIST
+    return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+
+def pq_params(n: int, dim: int):
+    m = FAISS_PQ_M or dim // 8
+    while dim % m:
+        m -= 1
+    bits = FAISS_PQ_BITS
+    # k-means needs at least 2**bits training points per sub-quantizer
+    while bits > 1 and (1 << bits) > n:
+        bits -= 1
+    return m, bits
+
+
+def index_spec(kind: str, n: int, dim: int) -> str:
+    "faiss.index_factory string for an index type sized for n vectors."
+    if kind == "flat":
+        return "Flat"
+    if kind == "hnsw":
+        return f"HNSW{FAISS_HNSW_M}"
+    if kind == "ivf_flat":
+        return f"IVF{ivf_nlist(n)},Flat"
+    if kind == "ivf_pq":
+        m, bits = pq_params(n, dim)
+        return f"IVF{ivf_nlist(n)},PQ{m}x{bits}"
+    if kind == "sq8":
+        return "SQ8"
+    raise ValueError(f"Unknown FAISS index type {kind!r}; expected one of {INDEX_TYPES}")
+
+
+def apply_search_params(index, kind: str, nprobe: int = FAISS_IVF_NPROBE, ef_search: int = FAISS_HNSW_EF_SEARCH):
+    import faiss
+
+    if kind == "hnsw":
+        faiss.downcast_index(index).hnsw.efSearch = ef_search
+    elif kind.startswith("ivf"):
+        faiss.extract_index_ivf(index).nprobe = nprobe
+    return index
+
+
+def build_index(kind: str, vectors: np.ndarray, add: bool = True):
+    "Create, train and (optionally) fill an L2 index of the given type."
+    import faiss
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    index = faiss.index_factory(dim, index_spec(kind, n, dim), faiss.METRIC_L2)
+    if not index.is_trained:
+        index.train(vectors)
+    if add:
+        index.add(vectors)
+    return apply_search_params(index, kind)
+
+
+def index_bytes(index) -> int:
+    "Serialized size, a close proxy for the index's resident memory."
+    import faiss
+
+    return int(faiss.serialize_index(index).size)
+
+
+def reconstruct_all(index, kind: str) -> Optional[np.ndarray]:
+    "All stored vectors in position order, or None if the index only keeps lossy codes."
+    import faiss
+
+    if kind == "ivf_pq" or kind == "sq8":
+        return None
+    if kind.startswith("ivf"):
+        faiss.extract_index_ivf(index).make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def read_flags(mmap: bool) -> int:
+    "faiss.read_index flags; with mmap the codes stay in the file, read-only, shared by every process mapping it."
+    import faiss
+
+    if not mmap:
+        return 0
+    # IO_FLAG_MMAP_IFC (faiss >= 1.8) also maps flat / HNSW storage, not just IVF lists
+    return getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def save_vector_store(vector_db, folder_path: str, index_name: str = INDEX_NAME) -> None:
+    """
+    FAISS.save_local, but both files are written under a temporary name and
+    swapped in with os.replace: a server that memory-mapped the old index
+    keeps reading the old file instead of one truncated under it.
+    """
+    tmp_name = f"{index_name}.tmp"
+    vector_db.save_local(folder_path=folder_path, index_name=tmp_name)
+    for ext in (".faiss", ".pkl"):
+        os.replace(os.path.join(folder_path, tmp_name + ext), os.path.join(folder_path, index_name + ext))
+
+
+def save_index_meta(kind: str, index, vector_store_path: str = VECTOR_STORE_PATH, index_name: str = INDEX_NAME) -> str:
+    path = index_meta_path(vector_store_path, index_name)
+    meta = {"type": kind, "ntotal": int(index.ntotal), "dim": int(index.d)}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return path
+
+
+def load_index_meta(vector_store_path: str = VECTOR_STORE_PATH, index_name: str = INDEX_NAME) -> Dict:
+    "Stores built before index types were selectable have no meta file: they are flat."
+    path = index_meta_path(vector_store_path, index_name)
+    if not os.path.exists(path):
+        return {"type": "flat"}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def default_index_type() -> str:
+    if FAISS_INDEX_TYPE not in INDEX_TYPES:
+        raise ValueError(f"FAISS_INDEX_TYPE={FAISS_INDEX_TYPE!r}; expected one of {INDEX_TYPES}")
+    return FAISS_INDEX_TYPE
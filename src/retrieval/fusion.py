@@ -0,0 +1,135 @@
+"""
+Hybrid fusion: one ranked candidate pool from the vector and BM25 hit lists.
+
+Raw scores are kept on every returned Document (metadata "vector_distance",
+"bm25_score") next to the fused "score" that ranks them. Each list is
+normalized so its best hit scores 1 before the two are combined, so the
+fused score only compares hits of the same query:
+
+  weighted  min-max normalized scores (distances inverted), weighted sum
+  rrf       reciprocal-rank fusion, sum of w / (rrf_k + rank), scaled so
+            rank 1 in both lists scores 1
+
+The weights are vector_weight and 1 - vector_weight. Exact section matches
+(direct_section_lookup, no distances) all rank first in the vector list and
+come out ahead of every other candidate, in the order they were given
+(statute order), whatever their BM25 scores, and are all kept even past
+top_k. Chunks with a real section sort before section-less ones (chapter
+headings, arrangement tables) at any score.
+
+For dropping weak candidates, metadata "relevance" scores each hit on a fixed
+0-1 scale that means the same for every query (see relevance()).
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+from src.config import CONTEXT_BM25_SCALE, FUSION_METHOD, FUSION_RRF_K, FUSION_VECTOR_WEIGHT
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+FUSION_METHODS = ("weighted", "rrf")
+
+
+def _min_max(values: List[float]) -> List[float]:
+    "Best (largest) value -> 1, worst -> 0; all equal -> 1."
+    if not values:
+        return []
+    lo, hi = min(values), max(values)
+    if hi == lo:
+        return [1.0] * len(values)
+    return [(v - lo) / (hi - lo) for v in values]
+
+
+def relevance(
+    vector_distance: Optional[float],
+    bm25_score: Optional[float],
+    exact: bool = False,
+    bm25_scale: float = CONTEXT_BM25_SCALE,
+) -> float:
+    """
+    1 for an exact section match, else the better of the vector hit's cosine
+    similarity (1 - d/2: the embeddings are unit length and FAISS reports
+    squared L2 distances) and the BM25 score s squashed to s / (s + bm25_scale).
+    A missing score counts as 0.
+    """
+    if exact:
+        return 1.0
+    best = 0.0
+    if vector_distance is not None:
+        best = max(best, 1.0 - vector_distance / 2)
+    if bm25_score is not None and bm25_score > 0:
+        best = max(best, bm25_score / (bm25_score + bm25_scale))
+    return min(best, 1.0)
+
+
+def _doc_key(doc: Document) -> Tuple:
+    return (doc.metadata.get("source_file"), doc.metadata.get("chunk_id"))
+
+
+def fuse(
+    vector_hits: Sequence[Tuple[Optional[float], Document]],
+    bm25_hits: Sequence[Tuple[float, Document]],
+    top_k: int = 5,
+    method: str = FUSION_METHOD,
+    vector_weight: float = FUSION_VECTOR_WEIGHT,
+    rrf_k: int = FUSION_RRF_K,
+) -> List[Document]:
+    """
+    Fuse (distance, doc) vector hits, nearest first (distance None = exact section
+    match), and (score, doc) BM25 hits, best first, into the top_k candidates,
+    or more when an exact match has more chunks. BM25 hits scoring 0 matched
+    no query term and are left out.
+    """
+    if method not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method {method!r}; expected one of {FUSION_METHODS}")
+    bm25_hits = [(score, doc) for score, doc in bm25_hits if score > 0]
+    weights = (vector_weight, 1.0 - vector_weight)
+
+    if method == "rrf":
+        vector_ranks = [1 if dist is None else rank for rank, (dist, _) in enumerate(vector_hits, 1)]
+        normalized = (
+            [(rrf_k + 1) / (rrf_k + rank) for rank in vector_ranks],
+            [(rrf_k + 1) / (rrf_k + rank) for rank in range(1, len(bm25_hits) + 1)],
+        )
+    else:
+        normalized = (
+            _min_max([0.0 if dist is None else -dist for dist, _ in vector_hits]),
+            _min_max([score for score, _ in bm25_hits]),
+        )
+
+    pool: Dict[Tuple, List] = {}  # key -> [fused, doc, vector_distance, bm25_score]
+    for channel, (hits, norms) in enumerate(zip((vector_hits, bm25_hits), normalized)):
+        for (raw, doc), norm in zip(hits, norms):
+            entry = pool.setdefault(_doc_key(doc), [0.0, doc, None, None])
+            entry[0] += weights[channel] * float(norm)
+            entry[2 + channel] = None if raw is None else float(raw)
+
+    from langchain_core.documents import Document
+
+    # sort is stable: on equal keys vector hits stay ahead of BM25-only ones
+    exact = {_doc_key(doc): i for i, (dist, doc) in enumerate(vector_hits) if dist is None}
+    ranked = sorted(
+        pool.values(),
+        key=lambda e: (
+            e[1].metadata.get("section") is None,
+            # exact matches by their input position, everything else by fused score
+            (0, exact[_doc_key(e[1])]) if _doc_key(e[1]) in exact else (1, -e[0]),
+        ),
+    )
+    return [
+        # a copy: vector hits can be the docstore's own Documents
+        Document(
+            page_content=doc.page_content,
+            metadata={
+                **doc.metadata,
+                "score": fused,
+                "vector_distance": distance,
+                "bm25_score": bm25_score,
+                "relevance": relevance(distance, bm25_score, _doc_key(doc) in exact),
+            },
+        )
+        # every chunk of an exact section match, then the best others up to top_k
+        for fused, doc, distance, bm25_score in ranked[:max(top_k, len(exact))]
+    ]
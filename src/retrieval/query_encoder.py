@@ -0,0 +1,143 @@
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.config import QUERY_EMBED_CACHE_SIZE, EMBED_BATCH_MAX, EMBED_BATCH_WAIT_MS
+
+
+def normalize_for_embedding(query: str) -> str:
+    # all-MiniLM-L6-v2 is uncased and whitespace-tokenized, so this does not change the vector
+    return " ".join(query.lower().split())
+
+
+class QueryEncoder:
+    """
+    Query embeddings for the vector path.
+
+    - bounded LRU of query vectors, so repeated / templated queries skip MiniLM
+    - micro-batching: encode() calls from concurrent requests that queue up
+      while a batch is running are encoded together in one embed_documents call
+    - encode_many() encodes a whole list of queries in a single call
+    """
+
+    def __init__(
+        self,
+        embedder,
+        cache_size: int = QUERY_EMBED_CACHE_SIZE,
+        max_batch: int = EMBED_BATCH_MAX,
+        max_wait_ms: float = EMBED_BATCH_WAIT_MS,
+    ):
+        self.embedder = embedder
+        self.cache_size = cache_size
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+        self.encoded = 0
+
+    # ---- cache
+    def _get_cached(self, key: str) -> Optional[List[float]]:
+        with self._cache_lock:
+            vec = self._cache.get(key)
+            if vec is not None:
+                self._cache.move_to_end(key)
+            return vec
+
+    def _put_cached(self, key: str, vec: List[float]) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = vec
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _count(self, **deltas) -> None:
+        with self._stats_lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    # ---- encoding
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.embedder.embed_documents(texts)
+        self._count(batches=1, encoded=len(texts))
+        for text, vec in zip(texts, vectors):
+            self._put_cached(text, vec)
+        return vectors
+
+    def encode_many(self, queries: Sequence[str]) -> List[List[float]]:
+        "Encode many queries: cache hits are reused, all misses go in one embed_documents call."
+        keys = [normalize_for_embedding(q) for q in queries]
+        found: Dict[str, List[float]] = {}
+        for key in keys:
+            vec = self._get_cached(key)
+            if vec is not None:
+                found[key] = vec
+
+        missing = list(dict.fromkeys(k for k in keys if k not in found))
+        self._count(hits=len(keys) - len(missing), misses=len(missing))
+        if missing:
+            found.update(zip(missing, self._embed_batch(missing)))
+        return [found[key] for key in keys]
+
+    def encode(self, query: str) -> List[float]:
+        "Encode one query, batched together with any other queries pending at the same time."
+        key = normalize_for_embedding(query)
+        vec = self._get_cached(key)
+        if vec is not None:
+            self._count(hits=1)
+            return vec
+        self._count(misses=1)
+
+        future: Future = Future()
+        self._ensure_worker()
+        self._queue.put((key, future))
+        return future.result()
+
+    def _ensure_worker(self) -> None:
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="query-encoder", daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            pending = [self._queue.get()]
+            # take whatever else queued up (optionally waiting a moment for stragglers)
+            while len(pending) < self.max_batch:
+                try:
+                    pending.append(self._queue.get(timeout=self.max_wait) if self.max_wait else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            texts = list(dict.fromkeys(key for key, _ in pending))
+            try:
+                vectors = dict(zip(texts, self._embed_batch(texts)))
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            for key, future in pending:
+                future.set_result(vectors[key])
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "batches": self.batches,
+            "avg_batch_size": self.encoded / self.batches if self.batches else 0.0,
+            "cached": len(self._cache),
+        }
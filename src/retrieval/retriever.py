@@ -1,145 +1,215 @@
-import os
-import re
-from typing import List,Optional,Tuple
-import json
-import glob
-
-
-from rank_bm25 import BM25Okapi
-
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS  
-from langchain_core.documents import Document   
+from __future__ import annotations
 
-VECTOR_STORE_PATH = os.path.join("data","vector_store")
-INDEX_NAME = "legal"
-CHUNKS_DIR = os.path.join("data","chunks_v2")
-
-def direct_section_lookup(vector_db, law: str, section: str) -> List[Document]:
-    filters = {"section": section}
-    if law:
-        filters["law"] = law
-
-    return vector_db.similarity_search(
-        query=f"{law} Section {section}",
-        k=2,
-        filter=filters
-    )
+import asyncio
+import re
+from typing import TYPE_CHECKING, List,Optional,Tuple,Union
+
+if TYPE_CHECKING:
+  from langchain_core.documents import Document
+
+from src.retrieval.bm25 import tokenize
+from src.retrieval.fusion import fuse
+from src.retrieval.section_index import lookup_section
+from src.telemetry import span
+from src.retrieval.engine import (
+  RetrievalEngine,
+  get_engine,
+  load_all_chunks,
+  load_embedding_model,
+  load_vector_store,
+  VECTOR_STORE_PATH,
+  INDEX_NAME,
+  CHUNKS_DIR,
+)
+
+# Exact (law, section) lookup from the precomputed index: no embedding, no vector scan
+def direct_section_lookup(engine: RetrievalEngine, law: Optional[str], section: str) -> List[Document]:
+    with span("section_lookup"):
+      chunk_ids = lookup_section(engine.section_index, law, section)
+      # texts are decoded from the mapped chunk table only for the chunks returned
+      return [engine.chunks.document(cid) for cid in chunk_ids if cid in engine.chunks]
+
+# A number is a section only when it is marked as one: after "section" / "sec." / "s." / "u/s",
+# next to the law name ("IPC 302", "302 IPC"), or when the query is just a law and a number.
+# Other numbers are quantities: "child under 10 years", "within 24 hours", "500 rupees".
+_LAW_NAME = r"(?:ipc|crpc|criminal\s+procedure)"
+_SECTION_NUMBER = r"(\d+[A-Z]*(?:\(\d+\))?)(?!\w)"
+SECTION_MARKED = re.compile(rf"(?:\bsections?|\bsec\.?|\bu/s\.?|\bs\.)\s*{_SECTION_NUMBER}", re.IGNORECASE)
+SECTION_BY_LAW = re.compile(rf"\b{_LAW_NAME}\s*{_SECTION_NUMBER}|\b{_SECTION_NUMBER}\s*{_LAW_NAME}\b", re.IGNORECASE)
+SECTION_ONLY = re.compile(rf"\W*{_LAW_NAME}\W*{_SECTION_NUMBER}\W*|\W*{_SECTION_NUMBER}\W*{_LAW_NAME}\W*", re.IGNORECASE)
+
+def parse_section(query: str) -> Optional[str]:
+  "The section number a query clearly refers to (upper-cased: '120b' -> '120B'), else None."
+  match = SECTION_MARKED.search(query) or SECTION_BY_LAW.search(query) or SECTION_ONLY.fullmatch(query)
+  return next(group for group in match.groups() if group).upper() if match else None
 
 def parse_law_and_section(query:str)  ->Tuple[Optional[str],Optional[str]]:
-  q=query.lower()
-  
-  law=None
-  if "ipc" in q:
-    law="IPC"
-  elif "crpc" in q or "criminal procedure" in q:
-    law = "CRPC"
+  with span("parse"):
+    q=query.lower()
   
-  section_match = re.search(r"\b(\d+[A-Z]*(?:\(\d+\))?)\b",query)
-  section = section_match.group(1) if section_match else None
+    law=None
+    if "ipc" in q:
+      law="IPC"
+    elif "crpc" in q or "criminal procedure" in q:
+      law = "CRPC"
   
-  return law, section
-
-def load_all_chunks():
-  all_chunks =[]
-  files = glob.glob(os.path.join(CHUNKS_DIR,"**","*.json"),recursive=True)
-  for file in files:
-    with open(file,"r", encoding="utf-8") as f:
-      all_chunks.extend(json.load(f))
-  return all_chunks
-  
-ALL_CHUNKS = load_all_chunks()
-
-if not ALL_CHUNKS:
-  raise ValueError("NO chunks found for BM25. Check CHUNKS_DIR path.")
-
-## BM25 
-BM25_CORPUS = [chunk["text"] for chunk in ALL_CHUNKS]
-BM25_TOKENIZED = [doc.lower().split() for doc in BM25_CORPUS]
-BM25 = BM25Okapi(BM25_TOKENIZED)
-
-
-
-
-#Load langchain Embedding model
-def load_embedding_model() ->HuggingFaceEmbeddings:
-    return HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    section = parse_section(query)
   
-
-# Load Faiss vector store
-def load_vector_store(embedder):
-    absolute_path = os.path.abspath(VECTOR_STORE_PATH)
-    return FAISS.load_local(
-      folder_path = absolute_path,
-      index_name=INDEX_NAME,
-      embeddings=embedder,
-      allow_dangerous_deserialization=True
-    )
-
+    return law, section
 
 # Vector Retriever Function
-def retrieve(query: str,top_k:int=5) -> List[Document]:
-  
-    embedder = load_embedding_model()
-    vector_db = load_vector_store(embedder)
+def vector_hits(query: str, top_k: int=5, engine: Optional[RetrievalEngine]=None) -> List[Tuple[Optional[float], Document]]:
+    "(L2 distance, doc) nearest first; an exact section match gives (None, doc) for each of its chunks instead."
+    engine = engine or get_engine()
    
     law, section = parse_law_and_section(query)
    
     if section:
-      docs = direct_section_lookup(vector_db, law, section)
+      docs = direct_section_lookup(engine, law, section)
       if docs :
-        return docs
+        return [(None, doc) for doc in docs]
   
    
-    docs = vector_db.similarity_search(query,k=top_k)
-    return docs
+    # cached / micro-batched query embedding instead of re-encoding inside similarity_search
+    with span("embed"):
+      embedding = engine.encoder.encode(query)
+    # a law-scoped query only searches that law's shard
+    with span("faiss"):
+      return engine.router.vector_search([embedding], top_k, [law])[0]
+
+def retrieve(query: str,top_k:int=5, engine: Optional[RetrievalEngine]=None) -> List[Document]:
+    return [doc for _, doc in vector_hits(query, top_k, engine)]
 
 # BM25 Retriever
-def bm25_retrieve(query: str, top_k: int=5) -> List[Document]:
-    tokens = query.lower().split()
-    scores = BM25.get_scores(tokens)
+def bm25_hits(query: str, top_k: int=5, engine: Optional[RetrievalEngine]=None) -> List[Tuple[float, Document]]:
+    "(BM25 score, doc) best first."
+    engine = engine or get_engine()
+    law, _ = parse_law_and_section(query)
+    with span("bm25"):
+      hits = engine.router.bm25_search([tokenize(query)], [top_k], [law])[0]
     
-    top_indices = sorted(range(len(scores)),key=lambda i: scores[i],reverse=True)[:top_k]
-    
-    docs = [] 
-    for idx in top_indices:
-        chunk = ALL_CHUNKS[idx]
-        docs.append(
-          Document(
-            page_content = chunk["text"],
-            metadata = {
-              "law":chunk.get("law"),
-              "section":chunk.get("section"),
-              "section_title":chunk.get("section_title"),
-              "page":chunk.get("page"),
-              "source_file":chunk.get("source_file"),
-              "chunk_id": chunk.get("chunk_id")
-            }
-          )
-        )
-    return docs
-  
-#Hybrid retriever
-def hybrid_retrieve(query:str, top_k: int=5)->List[Document]:
-  vector_docs  = retrieve(query,top_k)
-  bm25_docs = bm25_retrieve(query, top_k)
-  
-  if vector_docs is None:
-    vector_docs=[]
-  if bm25_docs is None:
-     bm25_docs=[]
-  
-  combined = {}
-  for doc in vector_docs + bm25_docs:
-    key = (doc.metadata.get("source_file"),doc.metadata.get("chunk_id"))
-    combined[key] = doc
-  results = list(combined.values())
+      return [(score, engine.chunks.document(cid)) for score, cid in hits]
+
+def bm25_retrieve(query: str, top_k: int=5, engine: Optional[RetrievalEngine]=None) -> List[Document]:
+    return [doc for _, doc in bm25_hits(query, top_k, engine)]
   
-  # prefer chunks with real sections (avoid chapters/TOC)
-  results.sort(key=lambda d: doc.metadata.get("section") is None)
-  return results[:top_k]
+#Hybrid retriever: one candidate pool, ranked by the fused vector + BM25 score (src/retrieval/fusion.py)
+def hybrid_retrieve(query:str, top_k: int=5, engine: Optional[RetrievalEngine]=None)->List[Document]:
+  engine = engine or get_engine()
+  vectors, keywords = vector_hits(query, top_k, engine), bm25_hits(query, top_k, engine)
+  with span("fusion"):
+    return fuse(vectors, keywords, top_k)
+
+# Async hybrid retriever: vector search and BM25 scoring run side by side in worker threads
+async def ahybrid_retrieve(query:str, top_k: int=5, engine: Optional[RetrievalEngine]=None)->List[Document]:
+  engine = engine or await asyncio.to_thread(get_engine)
+  vectors, keywords = await asyncio.gather(
+    asyncio.to_thread(vector_hits, query, top_k, engine),
+    asyncio.to_thread(bm25_hits, query, top_k, engine),
+  )
+  with span("fusion"):
+    return fuse(vectors, keywords, top_k)
+
+# Batch retrieval: one embedding call, one FAISS search over a query matrix, one BM25 product
+BM25_BATCH_BLOCK = 256
+
+def vector_hits_batch(
+  engine: RetrievalEngine, embeddings: List[List[float]], k: int, laws: Optional[List[Optional[str]]] = None
+) -> List[List[Tuple[float, Document]]]:
+  return engine.router.vector_search(embeddings, k, laws)
+
+def bm25_hits_batch(
+  queries: List[str], top_ks: List[int], engine: RetrievalEngine, laws: Optional[List[Optional[str]]] = None
+) -> List[List[Tuple[float, Document]]]:
+  laws = laws or [parse_law_and_section(q)[0] for q in queries]
+  results = []
+  for start in range(0, len(queries), BM25_BATCH_BLOCK):
+    end = start + BM25_BATCH_BLOCK
+    with span("bm25"):
+      hits = engine.router.bm25_search([tokenize(q) for q in queries[start:end]], top_ks[start:end], laws[start:end])
+      for row in hits:
+        results.append([(score, engine.chunks.document(cid)) for score, cid in row])
+  return results
+
+def batch_hybrid_retrieve(
+  queries: List[str], top_k: Union[int, List[int]]=5, engine: Optional[RetrievalEngine]=None
+) -> List[List[Document]]:
+  "hybrid_retrieve for many queries at once (top_k may be per query); results are in input order."
+  engine = engine or get_engine()
+  top_ks = [top_k] * len(queries) if isinstance(top_k, int) else list(top_k)
+
+  vector_results: List[list] = [[] for _ in queries]
+  needs_vector = []
+  laws = []
+  for i, query in enumerate(queries):
+    law, section = parse_law_and_section(query)
+    laws.append(law)
+    docs = direct_section_lookup(engine, law, section) if section else []
+    if docs:
+      vector_results[i] = [(None, doc) for doc in docs]
+    else:
+      needs_vector.append(i)
+
+  if needs_vector:
+    # FAISS returns hits best-first, so searching with the largest k and slicing is exact
+    with span("embed"):
+      embeddings = engine.encoder.encode_many([queries[i] for i in needs_vector])
+    with span("faiss"):
+      searched = vector_hits_batch(
+        engine, embeddings, max(top_ks[i] for i in needs_vector), [laws[i] for i in needs_vector]
+      )
+    for i, hits in zip(needs_vector, searched):
+      vector_results[i] = hits[:top_ks[i]]
+
+  bm25_results = bm25_hits_batch(queries, top_ks, engine, laws)
+  with span("fusion"):
+    return [fuse(v, b, k) for v, b, k in zip(vector_results, bm25_results, top_ks)]
+
+def startup_profile() -> None:
+  "Print a cold-start breakdown: module import vs. artifact load vs. in-memory build."
+  import subprocess
+  import sys
+  import time
+
+  code = (
+    "import time; t = time.perf_counter(); "
+    "import src.retrieval.retriever; print(time.perf_counter() - t)"
+  )
+  import_s = float(subprocess.run(
+    [sys.executable, "-c", code], capture_output=True, text=True, check=True
+  ).stdout.strip())
+
+  engine = RetrievalEngine()
+  start = time.perf_counter()
+  engine.load()
+  engine.warm_up()
+  total = time.perf_counter() - start
+
+  steps = engine.timings.steps
+  print("\nStartup profile")
+  print(f"  {'import src.retrieval.retriever (fresh process)':<48}{import_s:8.3f}s")
+  for kind in ("import", "load", "build", "warm"):
+    for key, seconds in sorted(steps.items()):
+      if key.startswith(f"{kind}:"):
+        print(f"  {key:<48}{seconds:8.3f}s")
+  print(f"  {'-' * 56}")
+  for kind in ("import", "load", "build"):
+    print(f"  {kind + ' total (summed across threads)':<48}{engine.timings.total(kind):8.3f}s")
+  print(f"  {'load wall clock (parallel)':<48}{steps.get('wall:load', 0.0):8.3f}s")
+  print(f"  {'engine ready (load + warm-up)':<48}{total:8.3f}s")
+
 #Test 
 if __name__ == "__main__":
+  import argparse
+
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--startup-profile", action="store_true", help="report import/load/build time and exit")
+  args = parser.parse_args()
+
+  if args.startup_profile:
+    startup_profile()
+    raise SystemExit(0)
+
   test_query = "Explain IPC section 499"
   
   results = hybrid_retrieve(test_query, top_k=3)
@@ -0,0 +1,64 @@
+import os
+import re
+import json
+from typing import Dict, List, Optional
+
+from src.config import VECTOR_STORE_PATH, INDEX_NAME
+
+SECTION_INDEX_FILE = f"{INDEX_NAME}_sections.json"
+
+
+def section_index_path(vector_store_path: str = VECTOR_STORE_PATH) -> str:
+    return os.path.join(vector_store_path, SECTION_INDEX_FILE)
+
+
+def build_section_index(chunks: List[Dict]) -> Dict[str, Dict[str, List[int]]]:
+    """
+    Map law -> section -> [chunk_id, ...].
+
+    chunk_ids keep the order of `chunks` (page order, then the order
+    chunk_section produced the splits), so stitching them back is a simple join.
+    """
+    index: Dict[str, Dict[str, List[int]]] = {}
+    for chunk in chunks:
+        law = chunk.get("law")
+        section = chunk.get("section")
+        if not law or not section:
+            continue
+        index.setdefault(law, {}).setdefault(section.upper(), []).append(chunk["chunk_id"])
+    return index
+
+
+def save_section_index(index: Dict, path: Optional[str] = None) -> str:
+    path = path or section_index_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    return path
+
+
+def load_section_index(path: Optional[str] = None) -> Optional[Dict[str, Dict[str, List[int]]]]:
+    path = path or section_index_path()
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def lookup_section(index: Dict, law: Optional[str], section: str) -> List[int]:
+    """
+    Return chunk ids for a section, in original order.
+
+    With no law, every statute that has the section contributes its chunks.
+    '41(1)' falls back to '41' when the sub-section itself is not indexed.
+    """
+    section = section.upper()
+    laws = [law] if law else sorted(index)
+
+    ids: List[int] = []
+    for name in laws:
+        ids.extend(index.get(name, {}).get(section, []))
+
+    if not ids and "(" in section:
+        return lookup_section(index, law, re.sub(r"\(.*$", "", section))
+    return ids
@@ -0,0 +1,176 @@
+"""
+Per-law index shards.
+
+With INDEX_LAYOUT=sharded the build writes one FAISS store + BM25 artifact
+per statute under <vector_store>/shards/<law>/, and the top-level
+legal_index.json lists the shards. A combined store is served as a single
+shard with law None, so retrieval always goes through a ShardRouter:
+
+- a law-scoped query (parse_law_and_section found IPC / CRPC) only searches
+  that law's shard
+- other queries fan out to every shard in parallel and the hits are merged
+  by score (L2 distance for vectors, BM25 score for keywords)
+
+Note BM25 idf is per shard, so merged BM25 scores are comparable only
+approximately; vector distances are in one embedding space and merge exactly.
+
+Given the engine's chunk table, every vector hit carries its chunk-table row
+(metadata "position", statute order). With drop_docstore (INDEX_MMAP) a
+shard whose docstore ids are chunk ids reads its hits from the
+(memory-mapped, shared) table and drops the pickled docstore, the last
+per-process copy of every chunk text.
+"""
+import heapq
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.config import VECTOR_STORE_PATH, INDEX_NAME
+from src.retrieval.chunk_store import ChunkStore
+from src.retrieval.faiss_index import index_meta_path, load_index_meta
+
+
+def shard_dir(vector_store_path: str, law: str) -> str:
+    return os.path.join(vector_store_path, "shards", law.lower())
+
+
+def store_dirs(vector_store_path: str = VECTOR_STORE_PATH, index_name: str = INDEX_NAME) -> Dict[Optional[str], str]:
+    "law -> store directory for the layout the vector store was built with ({None: path} if combined)."
+    meta = load_index_meta(vector_store_path, index_name)
+    if meta.get("layout") != "sharded":
+        return {None: vector_store_path}
+    return {law: shard_dir(vector_store_path, law) for law in meta["shards"]}
+
+
+def save_shard_layout(laws: Sequence[str], kind: str, vector_store_path: str = VECTOR_STORE_PATH, index_name: str = INDEX_NAME) -> str:
+    "Mark the vector store as sharded; each shard dir keeps its own legal_index.json."
+    path = index_meta_path(vector_store_path, index_name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"type": kind, "layout": "sharded", "shards": sorted(laws)}, f, indent=2)
+    return path
+
+
+def position_chunk_ids(vector_db, chunks: ChunkStore) -> Optional[np.ndarray]:
+    "FAISS row -> chunk_id, or None for stores whose docstore ids are not chunk ids in the table."
+    mapping = vector_db.index_to_docstore_id
+    ids = np.full(vector_db.index.ntotal, -1, dtype=np.int64)
+    for position, ds_id in mapping.items():
+        if not ds_id.isdigit() or int(ds_id) not in chunks:
+            return None
+        ids[position] = int(ds_id)
+    return ids
+
+
+class Shard:
+    "One FAISS store + BM25 model; law None means it holds every statute."
+
+    def __init__(
+        self, law: Optional[str], vector_db, bm25, chunks: Optional[ChunkStore] = None, drop_docstore: bool = True
+    ):
+        self.law = law
+        self.vector_db = vector_db
+        self.bm25 = bm25
+        self.chunks = chunks
+        self.position_ids = None
+        if chunks is not None and drop_docstore:
+            self.position_ids = position_chunk_ids(vector_db, chunks)
+        if self.position_ids is not None:
+            vector_db.docstore = type(vector_db.docstore)()
+            vector_db.index_to_docstore_id = {}
+
+    def _with_position(self, doc):
+        "A docstore hit with its chunk-table row added (a copy: the docstore keeps its own Document)."
+        chunk_id = doc.metadata.get("chunk_id")
+        row = self.chunks.row(chunk_id) if self.chunks is not None and chunk_id is not None else -1
+        if row < 0:
+            return doc
+        return type(doc)(page_content=doc.page_content, metadata={**doc.metadata, "position": row})
+
+    def vector_search(self, matrix: np.ndarray, k: int) -> List[List[Tuple[float, object]]]:
+        "(distance, Document) hits per query row, nearest first."
+        vector_db = self.vector_db
+        if getattr(vector_db, "_normalize_L2", False):
+            import faiss
+            matrix = matrix.copy()
+            faiss.normalize_L2(matrix)
+
+        distances, indices = vector_db.index.search(matrix, k)
+        results = []
+        for dist_row, row in zip(distances, indices):
+            hits = []
+            for dist, i in zip(dist_row, row):
+                if i == -1:
+                    continue
+                if self.position_ids is not None:
+                    hits.append((float(dist), self.chunks.document(int(self.position_ids[i]))))
+                    continue
+                # InMemoryDocstore returns an error string for unknown ids
+                doc = vector_db.docstore.search(vector_db.index_to_docstore_id[int(i)])
+                if not isinstance(doc, str):
+                    hits.append((float(dist), self._with_position(doc)))
+            results.append(hits)
+        return results
+
+    def bm25_search(self, token_lists: List[List[str]], ks: Sequence[int]) -> List[List[Tuple[float, int]]]:
+        "(score, chunk_id) hits per query, best first."
+        scores = self.bm25.get_scores_batch(token_lists)
+        results = []
+        for row, k in zip(scores, ks):
+            top = self.bm25.top_k_from_scores(row, k)
+            results.append([(float(row[i]), int(self.bm25.doc_ids[i])) for i in top])
+        return results
+
+    def __len__(self) -> int:
+        return len(self.bm25.doc_ids)
+
+
+class ShardRouter:
+    def __init__(self, shards: List[Shard]):
+        self.shards: Dict[Optional[str], Shard] = {shard.law: shard for shard in shards}
+        self._pool = ThreadPoolExecutor(max_workers=len(shards), thread_name_prefix="shard") if len(shards) > 1 else None
+
+    def route(self, law: Optional[str]) -> List[Shard]:
+        if law in self.shards:
+            return [self.shards[law]]
+        return list(self.shards.values())
+
+    def _fan_out(self, laws: Sequence[Optional[str]], search: Callable[[Shard, List[int]], List[list]]) -> List[list]:
+        "Run search(shard, rows) for every shard some query routes to, in parallel; hits concatenated per query."
+        plan: Dict[Optional[str], List[int]] = {}
+        for i, law in enumerate(laws):
+            for shard in self.route(law):
+                plan.setdefault(shard.law, []).append(i)
+
+        if self._pool is None or len(plan) == 1:
+            found = {law: search(self.shards[law], rows) for law, rows in plan.items()}
+        else:
+            futures = {law: self._pool.submit(search, self.shards[law], rows) for law, rows in plan.items()}
+            found = {law: future.result() for law, future in futures.items()}
+
+        merged: List[list] = [[] for _ in laws]
+        for law, rows in plan.items():
+            for i, hits in zip(rows, found[law]):
+                merged[i].extend(hits)
+        return merged
+
+    def vector_search(self, embeddings, k: int, laws: Optional[Sequence[Optional[str]]] = None) -> List[List[Tuple[float, object]]]:
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        laws = laws or [None] * len(matrix)
+        merged = self._fan_out(laws, lambda shard, rows: shard.vector_search(matrix[rows], k))
+        return [heapq.nsmallest(k, hits, key=itemgetter(0)) for hits in merged]
+
+    def bm25_search(
+        self, token_lists: List[List[str]], ks: Sequence[int], laws: Optional[Sequence[Optional[str]]] = None
+    ) -> List[List[Tuple[float, int]]]:
+        laws = laws or [None] * len(token_lists)
+        merged = self._fan_out(
+            laws, lambda shard, rows: shard.bm25_search([token_lists[i] for i in rows], [ks[i] for i in rows])
+        )
+        return [heapq.nlargest(k, hits, key=itemgetter(0)) for hits, k in zip(merged, ks)]
+
+    def stats(self) -> Dict[str, int]:
+        return {shard.law or "all": len(shard) for shard in self.shards.values()}
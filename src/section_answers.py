@@ -0,0 +1,125 @@
+"""
+Precomputed LLM explanations, one per statute section (filled by python -m src.precompute_answers).
+
+Each row holds the answer generate_answer gives to "Explain <law> Section <s>",
+the prompt version it was generated under and a hash of the exact prompt.
+The prompt embeds the section's text from the index, so a row is only served
+while the index holds the same text for that section and the prompt/model are
+unchanged: an index rebuild invalidates just the sections whose text changed.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+from src.config import SECTION_ANSWERS_PATH
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def section_question(law: str, section: str) -> str:
+    "The question every precomputed answer is generated for."
+    return f"Explain {law} Section {section}"
+
+
+class SectionAnswerStore:
+    """
+    SQLite table keyed by (law, section), written by the batch job and read by
+    every API worker (WAL mode, so the job can run against a live server).
+    The connection is opened on first use, after any fork; until the file
+    exists every lookup is a miss.
+    """
+
+    def __init__(self, path: str = SECTION_ANSWERS_PATH, readonly: bool = False):
+        self.path = path
+        self.readonly = readonly
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._conn is not None:
+            return self._conn
+        if self.readonly:
+            if not os.path.exists(self.path):
+                return None
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False, timeout=5.0)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS section_answers ("
+                " law TEXT NOT NULL, section TEXT NOT NULL,"
+                " prompt_version TEXT NOT NULL, prompt_hash TEXT NOT NULL,"
+                " value TEXT NOT NULL, index_version TEXT NOT NULL, created REAL NOT NULL,"
+                " PRIMARY KEY (law, section))"
+            )
+            conn.commit()
+        self._conn = conn
+        return conn
+
+    def _row(self, law: str, section: str) -> Optional[tuple]:
+        conn = self._connect()
+        if conn is None:
+            return None
+        return conn.execute(
+            "SELECT prompt_version, prompt_hash, value FROM section_answers WHERE law = ? AND section = ?",
+            (law, section),
+        ).fetchone()
+
+    def get(self, law: str, section: str, prompt_version: str, hash_: str) -> Optional[Dict[str, Any]]:
+        "The stored answer if it was generated from exactly this prompt, else None."
+        with self._lock:
+            row = self._row(law, section)
+            if row is None:
+                self.misses += 1
+                return None
+            if row[0] != prompt_version or row[1] != hash_:
+                self.stale += 1
+                return None
+            self.hits += 1
+        return json.loads(row[2])
+
+    def is_fresh(self, law: str, section: str, prompt_version: str, hash_: str) -> bool:
+        with self._lock:
+            row = self._row(law, section)
+        return row is not None and row[0] == prompt_version and row[1] == hash_
+
+    def put(
+        self,
+        law: str,
+        section: str,
+        prompt_version: str,
+        hash_: str,
+        value: Dict[str, Any],
+        index_version: str = "",
+    ) -> None:
+        data = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO section_answers"
+                " (law, section, prompt_version, prompt_hash, value, index_version, created)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (law, section, prompt_version, hash_, data, index_version, time.time()),
+            )
+            conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return 0
+            return conn.execute("SELECT COUNT(*) FROM section_answers").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses, "stale": self.stale}
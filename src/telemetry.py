@@ -0,0 +1,135 @@
+"""
+Per-stage latency spans and the Prometheus metrics served at /metrics.
+
+  with span("faiss"):
+      hits = engine.router.vector_search(...)
+
+Stages: parse, section_lookup, embed, faiss, bm25, fusion, prompt_build,
+llm, clean_text. Each span is observed into the rag_stage_seconds histogram
+and, for a request that asked for a breakdown (X-Debug-Timings), added to
+that request's timings. Timings follow the request into asyncio.to_thread
+workers through contextvars.
+
+With METRICS_ENABLED=0 prometheus_client is never imported, and unless a
+breakdown was asked for, span() returns one shared no-op context manager.
+
+Under gunicorn, PROMETHEUS_MULTIPROC_DIR (set by app/gunicorn_conf.py)
+makes /metrics report the sum over every worker.
+"""
+import os
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from src.config import METRICS_ENABLED
+
+STAGES = ("parse", "section_lookup", "embed", "faiss", "bm25", "fusion", "prompt_build", "llm", "clean_text")
+# 100us .. 30s: section lookups and BM25 sit at the low end, LLM calls at the high end
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+
+if METRICS_ENABLED:
+    from prometheus_client import Counter, Histogram
+
+    STAGE_SECONDS = Histogram("rag_stage_seconds", "Time spent in each pipeline stage", ["stage"], buckets=BUCKETS)
+    REQUEST_SECONDS = Histogram("rag_request_seconds", "End-to-end request time", ["endpoint"], buckets=BUCKETS)
+    REQUESTS = Counter("rag_requests", "Requests served", ["endpoint", "status"])
+    LLM_TOKENS = Counter("rag_llm_tokens", "LLM tokens used", ["kind"])
+    LLM_RETRIES = Counter("rag_llm_retries", "LLM call attempts retried")
+    LLM_FAILURES = Counter("rag_llm_failures", "LLM calls that failed after retries")
+    # labels() is a dict lookup per call: resolve the children once
+    _STAGE = {stage: STAGE_SECONDS.labels(stage) for stage in STAGES}
+
+
+def observe(stage: str, seconds: float) -> None:
+    if METRICS_ENABLED:
+        child = _STAGE.get(stage)
+        (child or STAGE_SECONDS.labels(stage)).observe(seconds)
+    timings = _timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(stage: str):
+    "Time the with-block as one stage (repeated stages in a request add up)."
+    if METRICS_ENABLED or _timings.get() is not None:
+        return _Span(stage)
+    return _NO_SPAN
+
+
+def collect_timings() -> Dict[str, float]:
+    "Start a per-request breakdown in the current context; spans fill the returned dict."
+    timings: Dict[str, float] = {}
+    _timings.set(timings)
+    return timings
+
+
+def format_timings(timings: Dict[str, float], total: Optional[float] = None) -> str:
+    "Server-Timing syntax, in milliseconds: 'embed;dur=3.10, faiss;dur=0.42, total;dur=9.87'."
+    parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items()]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+def record_request(endpoint: str, status: int, seconds: float) -> None:
+    if METRICS_ENABLED:
+        REQUEST_SECONDS.labels(endpoint).observe(seconds)
+        REQUESTS.labels(endpoint, str(status)).inc()
+
+
+def record_llm(usage: Optional[Dict[str, int]], failed: bool = False) -> None:
+    if not METRICS_ENABLED:
+        return
+    if failed:
+        LLM_FAILURES.inc()
+    for kind in ("input_tokens", "output_tokens"):
+        if usage and usage.get(kind):
+            LLM_TOKENS.labels(kind.split("_")[0]).inc(usage[kind])
+
+
+def record_llm_retry() -> None:
+    if METRICS_ENABLED:
+        LLM_RETRIES.inc()
+
+
+def metrics_payload() -> Tuple[bytes, str]:
+    "Prometheus text exposition of this process, or of every worker in multiprocess mode."
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,72 @@
+"""
+SparseBM25 must score exactly like rank_bm25.BM25Okapi, the implementation
+it replaced, and an incremental update() must give the same model as a
+fresh build over the resulting corpus.
+"""
+import numpy as np
+import pytest
+from rank_bm25 import BM25Okapi
+
+from src.retrieval.bm25 import SparseBM25, tokenize
+
+CORPUS = [
+    "Whoever commits murder of any person shall be punished with death or imprisonment for life",
+    "Whoever commits theft shall be punished with imprisonment which may extend to three years",
+    "Theft in dwelling house, tent or vessel",
+    "Whoever cheats and thereby dishonestly induces the person deceived to deliver any property",
+    "Any police officer may without an order from a Magistrate and without a warrant arrest any person",
+    "When any person accused of any non-bailable offence is arrested he may be released on bail",
+    "Punishment for defamation: simple imprisonment for a term which may extend to two years",
+    "Every person has a right to defend his own body and the body of any other person",
+]
+# "any" and "person" are in more than half the documents (negative idf, floored to
+# epsilon * mean idf) and "may" in exactly half (idf 0)
+QUERIES = [
+    "punishment for murder",
+    "theft theft in dwelling house",
+    "arrest without warrant by police officer",
+    "any person may",
+    "bail in non-bailable offence",
+    "no such words here",
+]
+
+
+def _docs(texts):
+    return [tokenize(text) for text in texts]
+
+
+def _scores_by_id(model, query):
+    return dict(zip(model.doc_ids.tolist(), model.get_scores(tokenize(query)).tolist()))
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_scores_match_rank_bm25(query):
+    docs = _docs(CORPUS)
+    expected = BM25Okapi(docs).get_scores(tokenize(query))
+    np.testing.assert_allclose(SparseBM25.build(docs).get_scores(tokenize(query)), expected, rtol=0, atol=1e-9)
+
+
+def test_batch_scores_match_single_queries():
+    model = SparseBM25.build(_docs(CORPUS))
+    batch = model.get_scores_batch([tokenize(q) for q in QUERIES])
+    for query, row in zip(QUERIES, batch):
+        np.testing.assert_allclose(row, model.get_scores(tokenize(query)), rtol=0, atol=1e-9)
+
+
+def test_update_equals_fresh_build():
+    ids = list(range(100, 100 + len(CORPUS)))
+    base = SparseBM25.build(_docs(CORPUS[:6]), ids[:6])
+    # drop two documents, add two new ones: one brings terms the base model never saw
+    added = CORPUS[6:] + ["Criminal breach of trust by public servant or by banker"]
+    updated = base.update(_docs(added), ids[6:] + [200], remove_ids=[ids[1], ids[4]])
+
+    kept = [i for i in range(6) if i not in (1, 4)]
+    fresh = SparseBM25.build(_docs([CORPUS[i] for i in kept] + added), [ids[i] for i in kept] + ids[6:] + [200])
+
+    assert updated.doc_ids.tolist() == fresh.doc_ids.tolist()
+    assert set(updated.vocab) == set(fresh.vocab)
+    for query in QUERIES + ["breach of trust by banker"]:
+        updated_scores, fresh_scores = _scores_by_id(updated, query), _scores_by_id(fresh, query)
+        assert updated_scores.keys() == fresh_scores.keys()
+        for doc_id, score in fresh_scores.items():
+            assert updated_scores[doc_id] == pytest.approx(score, rel=0, abs=1e-9)
@@ -0,0 +1,71 @@
+"""
+LegalTextCleaner and clean_many must clean every page exactly like the
+original cleaner, kept below as the golden reference.
+"""
+import re
+
+import pytest
+
+from src.preprocessing.cleaner import LegalTextCleaner, clean_many
+
+
+class LegacyLegalTextCleaner:
+    "LegalTextCleaner before the precompiled, keyword-guarded passes."
+
+    def __init__(self):
+        self.page_number_pattern = re.compile(r"\bPage\s+\d+\b", re.IGNORECASE)
+        self.header_footer_pattern = re.compile(
+            r"(THE\s+INDIAN\s+PENAL\s+CODE.*?|CODE\s+OF\s+CRIMINAL\s+PROCEDURE.*?1973)", re.IGNORECASE
+        )
+        self.multiple_spaces = re.compile(r"[ \t]{2,}")
+        self.multiple_newlines = re.compile(r"\n{3,}")
+
+    def clean_text(self, text: str) -> str:
+        if not text or not text.strip():
+            return ""
+        text = self.header_footer_pattern.sub("", text)
+        text = re.sub(r"ARRANGEMENT\s+OF\s+SECTIONS.*?(?=\n\s*\d+\.)", "", text, flags=re.IGNORECASE | re.DOTALL)
+        text = self.page_number_pattern.sub("", text)
+        text = re.sub(r"(?:^|\n)\s*\d+\s+(\d+[A-Z]*(?:\(\d+\))?)\.", r"\n\1.", text)
+        text = re.sub(r"\s+(\d+[A-Z]*(?:\(\d+\))?)\.", r"\n\1.", text)
+        text = self.multiple_spaces.sub(" ", text)
+        text = self.multiple_newlines.sub("\n\n", text)
+        return text.strip()
+
+PAGES = [
+    "",
+    "   \n\t ",
+    # IPC running header, then text on the same line (the legacy pattern ended in a lazy ".*?")
+    "THE INDIAN PENAL CODE  Page 12\n58 217. Public servant disobeying direction of law. Whoever, being a public servant...",
+    "the indian   penal\ncode, 1860\n\n\n\n302. Punishment for murder.--Whoever commits murder shall be punished with death.",
+    # CrPC header up to the year, and one with no year on the page
+    "THE CODE OF CRIMINAL PROCEDURE, 1973\nPage 3\n41. When police may arrest without warrant.-- (1) Any police officer may...",
+    "CODE OF CRIMINAL PROCEDURE (Act 2)\n 154. Information in cognizable cases.--(1) Every information...",
+    "code of criminal procedure 1973 ... code of criminal procedure, 1973 twice 437A. Bail to require accused.",
+    # arrangement of sections table up to the first numbered line
+    "ARRANGEMENT OF SECTIONS\nCHAPTER I\nPRELIMINARY\nSECTIONS\n1. Title and extent of operation of the Code.\n2. Punishment of offences.",
+    "arrangement of sections  CHAPTER XVI\n\n 299. Culpable homicide.  300. Murder.",
+    # section numbers with letters and sub-sections, collisions with page numbers
+    "12 120B. Punishment of criminal conspiracy.--(1) Whoever is a party... 120A. Definition of criminal conspiracy.",
+    "The court may, under section 41(1). direct   the arrest.\t\tSee sections 53 and 54.\n\n\n\n 498A. Husband or relative.",
+    "Page 7 of the report: page 8 PAGE 9 pages 10 and 2 304. Punishment for culpable homicide not amounting to murder.",
+    "continued from page 4 53. Punishments.--The punishments to which offenders are liable...",
+    "No keyword on this page, only text about the penal code without the title. 5. Saving.",
+    "(a) by words, either spoken or intended to be read; (b) by signs 499. Defamation.—Whoever, by words...",
+]
+
+
+@pytest.mark.parametrize("page", PAGES)
+def test_clean_text_matches_legacy(page):
+    assert LegalTextCleaner().clean_text(page) == LegacyLegalTextCleaner().clean_text(page)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_clean_many_matches_legacy(tmp_path, workers):
+    paths = []
+    for i, page in enumerate(PAGES):
+        path = tmp_path / f"page_{i:03d}.txt"
+        path.write_text(page, encoding="utf-8")
+        paths.append(str(path))
+    legacy = LegacyLegalTextCleaner()
+    assert clean_many(paths, workers=workers) == [legacy.clean_text(page) for page in PAGES]
@@ -0,0 +1,115 @@
+"""
+A section split over several chunks must reach the prompt in statute order.
+chunk_ids are content hashes (chunker1.stable_chunk_id), so their numeric
+order is unrelated to the order of the text.
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.rag_service import prepare_answer
+from src.retrieval.chunk_store import ChunkStore, chunk_to_document
+from src.retrieval.context import pack_context
+from src.retrieval.fusion import fuse
+from src.retrieval.shards import Shard
+
+# hash-like ids, deliberately not ascending in statute order
+SECTION_24 = [
+    {"law": "CRPC", "section": "24", "section_title": "Public Prosecutors", "text": f"Section 24 part {i}.",
+     "page": 10 + i // 3, "source_file": "crpc_page_010_cleaned.txt", "chunk_id": chunk_id}
+    for i, chunk_id in enumerate([9_113_402_911, 1_208_337_005, 7_540_118_263, 3_906_551_178, 5_002_871_440])
+]
+OTHER = {"law": "CRPC", "section": "25", "section_title": "Assistant Public Prosecutors", "text": "Section 25 text.",
+         "page": 12, "source_file": "crpc_page_012_cleaned.txt", "chunk_id": 4_411_009_352}
+
+
+def _store():
+    return ChunkStore.from_chunks(SECTION_24 + [OTHER])
+
+
+def _texts(docs):
+    return [doc.page_content for doc in docs]
+
+
+def test_pack_context_keeps_statute_order():
+    store = _store()
+    expected = [chunk["text"] for chunk in SECTION_24]
+    # BM25-style ranking: best hits first, unrelated to statute order
+    shuffled = [store.document(SECTION_24[i]["chunk_id"]) for i in (3, 0, 4, 1, 2)]
+    packed = pack_context(shuffled, token_budget=10_000, min_score=0.0)
+    assert _texts(packed) == expected
+
+
+def test_fuse_keeps_exact_section_hits_in_input_order():
+    store = _store()
+    exact = [(None, store.document(chunk["chunk_id"])) for chunk in SECTION_24]
+    # BM25 prefers the last chunks; the exact hits must not be reordered by it
+    bm25 = [(5.0 - i, store.document(SECTION_24[j]["chunk_id"])) for i, j in enumerate((4, 3, 2))]
+    bm25.append((0.5, store.document(OTHER["chunk_id"])))
+    for method in ("weighted", "rrf"):
+        fused = fuse(exact, bm25, top_k=6, method=method)
+        assert _texts(fused) == [chunk["text"] for chunk in SECTION_24] + [OTHER["text"]]
+
+
+def test_fuse_keeps_every_exact_chunk_past_top_k():
+    store = _store()
+    exact = [(None, store.document(chunk["chunk_id"])) for chunk in SECTION_24]
+    bm25 = [(3.0, store.document(OTHER["chunk_id"]))]
+    fused = fuse(exact, bm25, top_k=3)
+    assert _texts(fused) == [chunk["text"] for chunk in SECTION_24]
+    fused = fuse(exact[:2], bm25, top_k=3)
+    assert _texts(fused) == [chunk["text"] for chunk in SECTION_24[:2]] + [OTHER["text"]]
+
+
+def test_min_score_uses_relevance_not_rank():
+    store = _store()
+    # two strong vector hits and a trailing one that is still close (cosine 0.6):
+    # per-query min-max would score the last one 0 and drop it
+    vector = [(0.2, store.document(SECTION_24[0]["chunk_id"])),
+              (0.3, store.document(SECTION_24[1]["chunk_id"])),
+              (0.8, store.document(OTHER["chunk_id"]))]
+    fused = fuse(vector, [], top_k=3)
+    assert fused[-1].metadata["score"] == 0.0
+    assert fused[-1].metadata["relevance"] == pytest.approx(0.6)
+    assert len(pack_context(fused, token_budget=10_000, min_score=0.2)) == 3
+    # a far hit (cosine 0.05) is dropped whatever its rank
+    far = [(1.9, store.document(OTHER["chunk_id"]))]
+    assert fuse(far, [], top_k=1)[0].metadata["relevance"] == pytest.approx(0.05)
+    best = store.document(SECTION_24[0]["chunk_id"])
+    assert _texts(pack_context([best] + fuse(far, [], top_k=1), token_budget=10_000, min_score=0.2)) == [best.page_content]
+
+
+def test_docstore_hits_carry_their_position():
+    import faiss
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+
+    store = _store()
+    chunks = SECTION_24 + [OTHER]
+    vectors = np.eye(len(chunks), dtype=np.float32)
+    index = faiss.IndexFlatL2(len(chunks))
+    index.add(vectors)
+    vector_db = SimpleNamespace(
+        index=index,
+        docstore=InMemoryDocstore({str(c["chunk_id"]): chunk_to_document(c) for c in chunks}),
+        index_to_docstore_id={i: str(c["chunk_id"]) for i, c in enumerate(chunks)},
+    )
+    # without INDEX_MMAP the docstore is kept and serves the hits
+    shard = Shard(None, vector_db, None, store, drop_docstore=False)
+    assert shard.position_ids is None
+    (hits,) = shard.vector_search(vectors[[3, 0, 4, 1, 2]].sum(axis=0, keepdims=True), len(SECTION_24))
+    docs = [doc for _, doc in hits]
+    assert [doc.metadata["position"] for doc in docs] == [store.row(doc.metadata["chunk_id"]) for doc in docs]
+    assert _texts(pack_context(docs, token_budget=10_000, min_score=0.0)) == [c["text"] for c in SECTION_24]
+
+
+def test_prompt_has_section_in_statute_order():
+    store = _store()
+    exact = [(None, store.document(chunk["chunk_id"])) for chunk in SECTION_24]
+    bm25 = [(5.0 - i, store.document(SECTION_24[j]["chunk_id"])) for i, j in enumerate((4, 3, 2))]
+    docs = fuse(exact, bm25, top_k=5)
+    response, prompt, citations = prepare_answer("Explain CrPC section 24", docs)
+    assert response is None
+    positions = [prompt.index(chunk["text"]) for chunk in SECTION_24]
+    assert positions == sorted(positions)
+    assert [c["chunk_id"] for c in citations] == [chunk["chunk_id"] for chunk in SECTION_24]
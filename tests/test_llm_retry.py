@@ -0,0 +1,69 @@
+"""
+The gateway counts every timeout, whichever layer raised it: asyncio.wait_for
+on the async path, the HTTP client (httpx, groq) on the sync one.
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from src.llm import LLMGateway, is_retryable, is_timeout
+
+
+class APITimeoutError(Exception):
+    "Stands in for groq.APITimeoutError, matched by name like the real one."
+
+
+class APIStatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class FailingBackend:
+    "Raises the given errors in turn, then answers."
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+
+    def invoke(self, prompt):
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+    async def ainvoke(self, prompt):
+        return self.invoke(prompt)
+
+
+TIMEOUTS = [
+    TimeoutError(),
+    asyncio.TimeoutError(),
+    httpx.ReadTimeout("read timed out"),
+    httpx.PoolTimeout("no free connection"),
+    APITimeoutError(),
+]
+
+
+@pytest.mark.parametrize("error", TIMEOUTS, ids=lambda e: type(e).__name__)
+def test_timeouts_are_classified_and_retried(error):
+    assert is_timeout(error)
+    assert is_retryable(error)
+    gateway = LLMGateway(FailingBackend(error), max_retries=2, backoff_base=0, backoff_max=0)
+    assert gateway.invoke("prompt") == "ok"
+    stats = gateway.stats()
+    assert (stats["timeouts"], stats["retries"]) == (1, 1)
+
+
+@pytest.mark.parametrize(
+    "error",
+    [httpx.ConnectError("refused"), APIStatusError(503), APIStatusError(400), ValueError("bad prompt")],
+    ids=lambda e: type(e).__name__,
+)
+def test_other_errors_are_not_timeouts(error):
+    assert not is_timeout(error)
+
+
+def test_async_path_counts_client_timeouts():
+    gateway = LLMGateway(FailingBackend(httpx.ReadTimeout("read timed out")), backoff_base=0, backoff_max=0)
+    assert asyncio.run(gateway.ainvoke("prompt")) == "ok"
+    assert gateway.stats()["timeouts"] == 1
@@ -0,0 +1,37 @@
+"""
+A section asked under the wrong law gets the other-law hint from the section
+index, whatever the retrieved docs hold (a sharded index only searches the
+named law's shard).
+"""
+from types import SimpleNamespace
+
+from src.rag_service import instant_answer, section_law_mismatch
+
+ENGINE = SimpleNamespace(section_index={
+    "IPC": {"27": [11], "302": [12]},
+    "CRPC": {"41B": [21], "302": [22]},
+})
+
+
+def test_mismatch_names_the_other_law():
+    assert section_law_mismatch("CrPC Section 27", ENGINE) == "IPC"
+    assert section_law_mismatch("explain ipc section 41b", ENGINE) == "CRPC"
+
+
+def test_no_mismatch():
+    assert section_law_mismatch("IPC section 302", ENGINE) is None
+    assert section_law_mismatch("section 27", ENGINE) is None  # no law named
+    assert section_law_mismatch("CrPC section 999", ENGINE) is None  # in neither law
+    assert section_law_mismatch("punishment for theft", ENGINE) is None
+
+
+def test_numbers_that_are_not_sections():
+    # 27 is an IPC-only section, but here it is a number of days
+    assert section_law_mismatch("Under CrPC can police hold someone for 27 days", ENGINE) is None
+    assert instant_answer("Under CrPC can police hold someone for 27 days", ENGINE) is None
+
+
+def test_instant_answer_returns_the_hint():
+    answer = instant_answer("CrPC Section 27", ENGINE)
+    assert "exists under the IPC" in answer["answer"]
+    assert answer["citations"] == []
@@ -0,0 +1,77 @@
+"""
+extract_sections (single-pass scanner) must return exactly what the original
+DOTALL/lookahead regex returned. The original is kept below as the reference.
+"""
+import re
+from typing import Dict, List
+
+import pytest
+
+from src.preprocessing.chunker1 import extract_sections
+
+
+def extract_sections_regex(text: str, law: str) -> List[Dict]:
+    "extract_sections as it was before the single-pass scanner."
+    sections = []
+    text = re.sub(r"[ \t]+", " ", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    text = re.sub(
+        r"^\s*\d+\.\s+(Subs\.|Ins\.|Amended|Omitted|Added).*?$",
+        "",
+        text,
+        flags=re.MULTILINE | re.IGNORECASE
+    )
+    pattern = re.compile(
+        r"^\s*(\d+[A-Z]*(?:\(\d+\))?)\.\s*(.*?)\n"
+        r"(.*?)(?=^\s*\d+[A-Z]*(?:\(\d+\))?\.|\Z)",
+        re.MULTILINE | re.DOTALL
+    )
+    for m in pattern.finditer(text):
+        section_no = m.group(1).strip()
+        title = m.group(2).strip()
+        body = m.group(3).strip()
+        if len(body) < 40:
+            continue
+        sections.append({
+            "section": section_no,
+            "section_title": title if title else f"Section {section_no}",
+            "text": f"{law} Section {section_no}. {title}: {body}".strip()
+        })
+    return sections
+
+
+BODY = "Whoever commits the offence shall be punished with imprisonment of either description."
+
+TEXTS = [
+    "",
+    "No section numbers on this page at all, only running text about the code.",
+    f"302. Punishment for murder.\n{BODY}\n303. Punishment for murder by life-convict.\n{BODY}",
+    # indented headers, tabs and space runs, blank lines between and inside sections
+    f"  120A.\tDefinition of \t criminal\tconspiracy.\n\n\n\n{BODY}\n\n\n  120B. Punishment.\n\t{BODY}\n",
+    # header with no title, and a title on the line after blank lines
+    f"41.\n{BODY}\n41A.\n\n\nNotice of appearance before police officer.\n{BODY}",
+    # short bodies are dropped as fragments
+    "10. Short.\nToo short.\n11. Also short.\n\n11A. Almost.\nThirty-nine characters of body text...\n12. Gender.\n" + BODY,
+    # amendment footnotes inside and between sections
+    f"498A. Husband or relative.\n{BODY}\n1. Subs. by Act 25 of 2005, s. 2.\n{BODY}\n2. Ins. by Act 46 of 1983.\n"
+    f"499. Defamation.\n{BODY}\n 3. omitted by Act 10 of 1990.\n 4. Added by Act 2 of 1991.\n{BODY}",
+    # numbered sub-clauses inside a body start a new match, like the old lookahead
+    f"154. Information in cognizable cases.\n(1) Every information.\n2. Every such information.\n{BODY}",
+    # numbers mid-line are not boundaries
+    f"53. Punishments.\nThe punishments under section 53. and 54. are: {BODY} See 2. above.",
+    # trailing whitespace only / no newline after the last header
+    f"437. When bail may be taken.\n{BODY}   \n\t\n",
+    "438. Direction for grant of bail to person apprehending arrest.",
+    f"420. Cheating and dishonestly inducing delivery of property.\n{BODY}",
+]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+@pytest.mark.parametrize("law", ["IPC", "CRPC"])
+def test_extract_sections_matches_regex(text, law):
+    assert extract_sections(text, law) == extract_sections_regex(text, law)
+
+
+def test_whole_text_matches_regex():
+    text = "\n".join(TEXTS)
+    assert extract_sections(text, "IPC") == extract_sections_regex(text, "IPC")
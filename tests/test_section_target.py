@@ -0,0 +1,90 @@
+"""
+Only a number marked as a section ("section 10", "IPC 10") takes the
+zero-LLM section paths (verbatim text, precomputed explanations); numbers in
+topical questions are quantities.
+"""
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from src import rag_service
+from src.rag_service import section_target, verbatim_section_answer
+from src.retrieval.chunk_store import ChunkStore
+from src.retrieval.section_index import build_section_index
+from src.section_answers import SectionAnswerStore, prompt_hash, section_question
+
+CHUNKS = [
+    {"law": law, "section": section, "section_title": f"{law} {section}", "text": f"{law} section {section} text.",
+     "page": i, "source_file": f"{law.lower()}_page_{i:03d}_cleaned.txt", "chunk_id": 7_000_000_000 - i * 104_729}
+    for i, (law, section) in enumerate([("IPC", "10"), ("IPC", "500"), ("IPC", "302"), ("CRPC", "24"), ("CRPC", "90")])
+]
+ENGINE = SimpleNamespace(chunks=ChunkStore.from_chunks(CHUNKS), section_index=build_section_index(CHUNKS))
+
+TOPICAL = [
+    "Under IPC what is the criminal liability of a child under 10 years",
+    "Under CrPC must an arrested person be produced before a magistrate within 24 hours",
+    "CrPC bail when the chargesheet is not filed within 90 days",
+    "IPC punishment for theft of 500 rupees",
+]
+
+
+@pytest.mark.parametrize("query", TOPICAL)
+def test_numbers_in_topical_questions_are_not_sections(query):
+    assert section_target(query, ENGINE) is None
+    assert verbatim_section_answer(query, ENGINE) is None
+
+
+@pytest.mark.parametrize("query, law, section", [
+    ("IPC 302", "IPC", "302"),
+    ("302 IPC", "IPC", "302"),
+    ("Explain IPC section 10", "IPC", "10"),
+    ("what does s. 500 of the ipc say", "IPC", "500"),
+    ("CrPC: 24", "CRPC", "24"),
+    ("crpc sec. 90", "CRPC", "90"),
+])
+def test_marked_sections(query, law, section):
+    docs = section_target(query, ENGINE)
+    assert [(d.metadata["law"], d.metadata["section"]) for d in docs] == [(law, section)]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = SectionAnswerStore(str(tmp_path / "section_answers.sqlite"))
+    for law, sections in ENGINE.section_index.items():
+        for section in sections:
+            docs = rag_service.direct_section_lookup(ENGINE, law, section)
+            _, prompt, citations = rag_service.prepare_answer(section_question(law, section), docs)
+            answer = {"answer": f"{law} {section} explained.", "citations": citations}
+            store.put(law, section, rag_service.PROMPT_VERSION, prompt_hash(prompt), answer)
+    monkeypatch.setattr(rag_service, "get_section_answers", lambda: store)
+    return store
+
+
+def test_named_section_is_served(store):
+    answer = rag_service.precomputed_section_answer("Explain IPC section 10", ENGINE)
+    assert answer["answer"] == "IPC 10 explained." and answer["precomputed"]
+
+
+@pytest.mark.parametrize("query", TOPICAL)
+def test_numbers_in_topical_questions_get_no_stored_answer(store, query):
+    assert rag_service.precomputed_section_answer(query, ENGINE) is None
+
+
+def test_async_lookup_runs_off_the_event_loop(store, monkeypatch):
+    threads = []
+    lookup = rag_service.precomputed_section_answer
+
+    def spy(query, engine):
+        threads.append(threading.get_ident())
+        return lookup(query, engine)
+
+    monkeypatch.setattr(rag_service, "precomputed_section_answer", spy)
+
+    async def run():
+        return threading.get_ident(), await rag_service.ainstant_answer("CrPC section 24", ENGINE, enrich=True)
+
+    loop_thread, answer = asyncio.run(run())
+    assert answer["answer"] == "CRPC 24 explained."
+    assert threads and loop_thread not in threads
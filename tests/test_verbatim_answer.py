@@ -0,0 +1,27 @@
+"""
+The zero-LLM verbatim answer returns one section's statute text, never two
+statutes' sections merged into one answer.
+"""
+from types import SimpleNamespace
+
+from src.rag_service import verbatim_section_answer
+from src.retrieval.chunk_store import ChunkStore
+from src.retrieval.section_index import build_section_index
+
+CHUNKS = [
+    {"law": "IPC", "section": "302", "section_title": "Punishment for murder", "text": "IPC 302 text.",
+     "page": 1, "source_file": "ipc_page_001_cleaned.txt", "chunk_id": 8_201_554_613},
+    {"law": "CRPC", "section": "302", "section_title": "Permission to conduct prosecution", "text": "CrPC 302 text.",
+     "page": 2, "source_file": "crpc_page_002_cleaned.txt", "chunk_id": 2_990_107_342},
+]
+ENGINE = SimpleNamespace(chunks=ChunkStore.from_chunks(CHUNKS), section_index=build_section_index(CHUNKS))
+
+
+def test_named_law_is_verbatim():
+    answer = verbatim_section_answer("IPC section 302", ENGINE)
+    assert answer["answer"] == "IPC 302 text."
+    assert [c["law"] for c in answer["citations"]] == ["IPC"]
+
+
+def test_section_in_both_laws_without_a_law_is_not_merged():
+    assert verbatim_section_answer("section 302", ENGINE) is None